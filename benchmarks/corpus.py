@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# Copyright 2021 Katteli Inc.
+# TestFlows.com Open-Source Software Testing Framework (http://testflows.com)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import random
+import argparse
+
+parser = argparse.ArgumentParser(description="TestFlows - Texts synthetic document corpus generator")
+parser.add_argument("-o", "--output", metavar="path", type=str,
+    help="output directory, default: '.'", default=".")
+parser.add_argument("--count", metavar="N", type=int,
+    help="number of documents to generate, default: 1", default=1)
+parser.add_argument("--sections", metavar="N", type=int,
+    help="number of sections in each document, default: 50", default=50)
+parser.add_argument("--depth", metavar="N", type=int,
+    help="maximum nesting depth of the sections, default: 3", default=3)
+parser.add_argument("--paragraphs", metavar="N", type=int,
+    help="number of paragraphs in each section, default: 3", default=3)
+parser.add_argument("--code-blocks", metavar="N", type=int,
+    help="number of code blocks in each section, default: 1", default=1)
+parser.add_argument("--fstring-density", metavar="ratio", type=float,
+    help="ratio of paragraph lines that contain f-string expressions, default: 0.5", default=0.5)
+parser.add_argument("--output-size", metavar="bytes", type=int,
+    help="approximate size of the output of each document, default: 65536", default=65536)
+parser.add_argument("--seed", metavar="N", type=int,
+    help="random seed, default: 0", default=0)
+
+words = ("document text section value output block paragraph example "
+    "check result expected command shell query table column").split()
+
+def paragraph(rnd, size, fstring_density):
+    """Return paragraph of approximately the specified size.
+
+    :param rnd: random generator
+    :param size: paragraph size in characters
+    :param fstring_density: ratio of lines with f-string expressions
+    """
+    lines = []
+    length = 0
+    while length < size or not lines:
+        line = " ".join(rnd.choice(words) for _ in range(8))
+        if rnd.random() < fstring_density:
+            line += " {value} and {len(values)}"
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines) + "\n"
+
+def code_block(rnd, n):
+    """Return code block.
+
+    :param rnd: random generator
+    :param n: section number
+    """
+    return (
+        "```python:testflows\n"
+        f"value = {n}\n"
+        f"values = [i * i for i in range({rnd.randint(1, 100)})]\n"
+        "total = sum(values)\n"
+        "```\n"
+    )
+
+def generate(sections=50, depth=3, paragraphs=3, code_blocks=1, fstring_density=0.5,
+        output_size=65536, seed=0):
+    """Generate synthetic executable document.
+
+    :param sections: number of sections, default: 50
+    :param depth: maximum nesting depth of the sections, default: 3
+    :param paragraphs: number of paragraphs in each section, default: 3
+    :param code_blocks: number of code blocks in each section, default: 1
+    :param fstring_density: ratio of paragraph lines that contain
+        f-string expressions, default: 0.5
+    :param output_size: approximate size of the output, default: 65536
+    :param seed: random seed, default: 0
+    """
+    rnd = random.Random(seed)
+    paragraph_size = output_size // max(1, (sections + 1) * max(1, paragraphs))
+
+    parts = ["# Synthetic Document\n\n", code_block(rnd, 0), "\n"]
+    for i in range(paragraphs):
+        parts.append(paragraph(rnd, paragraph_size, fstring_density) + "\n")
+
+    level = 1
+    for n in range(1, sections + 1):
+        level = rnd.randint(2, min(level + 1, depth + 1)) if depth > 0 else 1
+        parts.append(f"{'#' * level} Section {n}\n\n")
+        for i in range(max(paragraphs, code_blocks)):
+            if i < code_blocks:
+                parts.append(code_block(rnd, n) + "\n")
+            if i < paragraphs:
+                parts.append(paragraph(rnd, paragraph_size, fstring_density) + "\n")
+
+    return "".join(parts)
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    for i in range(args.count):
+        path = os.path.join(args.output, f"synthetic_{i}.tfd")
+        with open(path, "w", encoding="utf-8") as fd:
+            fd.write(generate(sections=args.sections, depth=args.depth, paragraphs=args.paragraphs,
+                code_blocks=args.code_blocks, fstring_density=args.fstring_density,
+                output_size=args.output_size, seed=args.seed + i))
+        print(path)
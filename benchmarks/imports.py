@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# Copyright 2021 Katteli Inc.
+# TestFlows.com Open-Source Software Testing Framework (http://testflows.com)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import sys
+import argparse
+import subprocess
+
+parser = argparse.ArgumentParser(description="TestFlows - Texts import time benchmark")
+parser.add_argument("--case", metavar="name", type=str, nargs="+",
+    help="benchmark cases to run, default: all")
+parser.add_argument("--repeat", metavar="count", type=int,
+    help="number of fresh interpreters used for each measurement, default: 10", default=10)
+parser.add_argument("--compare", metavar="path", type=str,
+    help="compare against the source tree at the path, for example, a 'git worktree' of another commit")
+
+#: benchmark cases with the statements that are timed in a fresh interpreter
+cases = {
+    "cli": "from testflows._core.cli.arg.parser import parser",
+    "run": "import testflows.texts.run",
+    "package": "import testflows.texts",
+    "executable": "import testflows.texts.executable",
+}
+
+#: program that times the statement and prints the time
+timer = (
+    "import time\n"
+    "start_time = time.perf_counter()\n"
+    "{statement}\n"
+    "print(time.perf_counter() - start_time)\n"
+)
+
+def measure(statement, path, repeat):
+    """Return the best time of the statement each executed
+    in a fresh interpreter.
+
+    :param statement: statement
+    :param path: source tree path
+    :param repeat: number of interpreters
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([path] + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else []))
+    # do not let bytecode compilation of the first run skew the results
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+
+    times = []
+    for i in range(repeat + 1):
+        output = subprocess.run([sys.executable, "-c", timer.format(statement=statement)],
+            env=env, cwd=path, check=True, capture_output=True, text=True).stdout
+        times.append(float(output.strip().splitlines()[-1]))
+
+    return min(times[1:])
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    names = args.case or list(cases)
+
+    for name in names:
+        if name not in cases:
+            parser.error(f"unknown case '{name}', available cases: {', '.join(cases)}")
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+    print(f"{'case':<12} {'time (ms)':>10}" + (f" {'compare (ms)':>13} {'change':>8}" if args.compare else ""))
+    for name in names:
+        value = measure(cases[name], path, args.repeat)
+        row = f"{name:<12} {value * 1000:>10.1f}"
+        if args.compare:
+            base = measure(cases[name], os.path.abspath(args.compare), args.repeat)
+            row += f" {base * 1000:>13.1f} {(value / base - 1) * 100:>+7.0f}%"
+        print(row)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# Copyright 2021 Katteli Inc.
+# TestFlows.com Open-Source Software Testing Framework (http://testflows.com)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from testflows.texts.executable import parse
+
+parser = argparse.ArgumentParser(description="TestFlows - Texts parser benchmark")
+parser.add_argument("--lines", metavar="count", type=int, nargs="+",
+    help="number of lines in the generated documents, default: 10000 50000 100000",
+    default=[10000, 50000, 100000])
+parser.add_argument("--engine", metavar="engine", type=str, nargs="+", choices=["peg", "scanner"],
+    help="parser engines to benchmark, default: peg scanner", default=["peg", "scanner"])
+parser.add_argument("--repeat", metavar="count", type=int,
+    help="number of times to repeat each measurement, default: 3", default=3)
+
+section = """
+## Section {n}
+
+Paragraph of section {n} that has
+an f-string expression {{value}}
+and some more text.
+
+```python:testflows
+value = {n}
+```
+
+* list item
+* another list item
+
+"""
+
+def document(lines):
+    """Generate document with at least the specified number of lines.
+
+    :param lines: number of lines
+    """
+    parts = ["# Benchmark\n"]
+    count, n = 1, 0
+    while count < lines:
+        part = section.format(n=n)
+        parts.append(part)
+        count += part.count("\n")
+        n += 1
+    return "".join(parts)
+
+def benchmark(source_data, engine, repeat):
+    """Return best parse time in seconds.
+
+    :param source_data: source document
+    :param engine: parser engine
+    :param repeat: number of repetitions
+    """
+    times = []
+    for i in range(repeat):
+        start_time = time.perf_counter()
+        parse(source_data, engine=engine)
+        times.append(time.perf_counter() - start_time)
+    return min(times)
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+
+    print(f"{'lines':>10} " + " ".join(f"{engine + ' (s)':>14}" for engine in args.engine))
+    for lines in args.lines:
+        source_data = document(lines)
+        results = [benchmark(source_data, engine, args.repeat) for engine in args.engine]
+        print(f"{source_data.count(chr(10)):>10} " + " ".join(f"{result:>14.3f}" for result in results))
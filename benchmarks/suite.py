@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# Copyright 2021 Katteli Inc.
+# TestFlows.com Open-Source Software Testing Framework (http://testflows.com)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from corpus import generate
+
+from testflows.texts.core import Document, Module
+from testflows.texts.compiler import compile_document
+from testflows.texts.executable import parse, run_program
+from testflows.texts.writer import DocumentWriter
+from testflows._core.funcs import current
+
+parser = argparse.ArgumentParser(description="TestFlows - Texts benchmark suite")
+parser.add_argument("--case", metavar="name", type=str, nargs="+",
+    help="benchmark cases to run, default: all")
+parser.add_argument("--engine", metavar="engine", type=str, choices=["peg", "scanner"],
+    help="parser engine, default: peg", default="peg")
+parser.add_argument("--repeat", metavar="count", type=int,
+    help="number of times to repeat each measurement, default: 3", default=3)
+parser.add_argument("--save", metavar="path", type=str,
+    help="save results as the baseline into the file")
+parser.add_argument("--baseline", metavar="path", type=str,
+    help="compare results against the baseline file and exit with 1 if any phase regressed")
+parser.add_argument("--threshold", metavar="ratio", type=float,
+    help="relative slowdown that is flagged as a regression, default: 0.1", default=0.1)
+parser.add_argument("--min-delta", metavar="seconds", type=float,
+    help="ignore slowdowns smaller than this, default: 0.005", default=0.005)
+
+#: benchmark cases with the corpus generator knobs
+cases = {
+    "small": dict(sections=10, depth=2, paragraphs=2, code_blocks=1, fstring_density=0.5, output_size=8192),
+    "wide": dict(sections=500, depth=1, paragraphs=2, code_blocks=1, fstring_density=0.5, output_size=131072),
+    "deep": dict(sections=200, depth=6, paragraphs=2, code_blocks=1, fstring_density=0.5, output_size=65536),
+    "code": dict(sections=100, depth=2, paragraphs=1, code_blocks=10, fstring_density=0.1, output_size=32768),
+    "fstrings": dict(sections=100, depth=2, paragraphs=5, code_blocks=1, fstring_density=1.0, output_size=262144),
+    "output": dict(sections=50, depth=2, paragraphs=5, code_blocks=1, fstring_density=0.05, output_size=8388608),
+}
+
+#: measured phases
+phases = ("parse", "compile", "execute", "write")
+
+def measure(name, source_data, engine, directory):
+    """Run document once and return the time of each phase.
+
+    :param name: case name
+    :param source_data: source document
+    :param engine: parser engine
+    :param directory: output directory
+    """
+    filename = os.path.join(directory, f"{name}.tfd")
+    times = {}
+
+    start_time = time.perf_counter()
+    blocks = parse(source_data, engine=engine)
+    times["parse"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    program = compile_document(blocks, filename)
+    times["compile"] = time.perf_counter() - start_time
+
+    output = DocumentWriter(os.path.join(directory, f"{name}.md"))
+    with Document(name):
+        current().context.file = output
+        start_time = time.perf_counter()
+        run_program(program)
+        times["execute"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    output.close()
+    times["write"] = time.perf_counter() - start_time
+
+    return times
+
+def run(names, engine, repeat):
+    """Run benchmark cases and return the best time of each phase.
+
+    :param names: case names
+    :param engine: parser engine
+    :param repeat: number of repetitions
+    """
+    results = {}
+
+    # the suite runs as a single top level test
+    sys.argv = sys.argv[:1] + ["--output", "quiet"]
+
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            with Module("benchmarks"):
+                for name in names:
+                    source_data = generate(**cases[name])
+                    for i in range(repeat):
+                        times = measure(name, source_data, engine, directory)
+                        # remove output so that each write is a full write
+                        os.unlink(os.path.join(directory, f"{name}.md"))
+                        best = results.setdefault(name, times)
+                        for phase in phases:
+                            best[phase] = min(best[phase], times[phase])
+        except SystemExit as exc:
+            if exc.code:
+                raise
+
+    return results
+
+def compare(results, baseline, threshold, min_delta):
+    """Return list of regressions of the results against the baseline.
+
+    :param results: results
+    :param baseline: baseline results
+    :param threshold: relative slowdown that is a regression
+    :param min_delta: minimum absolute slowdown in seconds
+    """
+    regressions = []
+    for name, times in results.items():
+        for phase in phases:
+            base = baseline.get(name, {}).get(phase)
+            if base is None:
+                continue
+            if times[phase] > base * (1 + threshold) and times[phase] - base > min_delta:
+                regressions.append((name, phase, base, times[phase]))
+    return regressions
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    names = args.case or list(cases)
+
+    for name in names:
+        if name not in cases:
+            parser.error(f"unknown case '{name}', available cases: {', '.join(cases)}")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fd:
+            baseline = json.load(fd)["results"]
+
+    results = run(names, args.engine, args.repeat)
+
+    print(f"{'case':<10} " + " ".join(f"{phase + ' (s)':>12}" for phase in phases))
+    for name, times in results.items():
+        row = f"{name:<10} " + " ".join(f"{times[phase]:>12.4f}" for phase in phases)
+        if baseline and name in baseline:
+            row += "  baseline: " + " ".join(f"{baseline[name].get(phase, float('nan')):.4f}" for phase in phases)
+        print(row)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fd:
+            json.dump({"engine": args.engine, "repeat": args.repeat, "results": results}, fd, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold, args.min_delta)
+        for name, phase, base, value in regressions:
+            print(f"regression: {name} {phase} {base:.4f}s -> {value:.4f}s (+{(value / base - 1) * 100:.0f}%)")
+        if regressions:
+            sys.exit(1)
+        print("no regressions")
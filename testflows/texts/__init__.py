@@ -33,16 +33,27 @@ limitations under the License
 import os
 import sys
 
-from testflows.connect import Shell
-from testflows.asserts import error, errors
+from importlib import import_module
 
-from .core import *
-from .executable import execute
+# names are loaded on first use so that importing the package,
+# for example by the `tfs` command, does not import the test framework
+# all other names are loaded from `testflows.texts.core`
+_modules = {
+    "execute": "testflows.texts.executable",
+    "ShellPool": "testflows.texts.shells",
+    "lease_shell": "testflows.texts.shells",
+    "MemoCache": "testflows.texts.memo",
+    "cached": "testflows.texts.memo",
+    "stream_text": "testflows.texts.streams",
+    "Shell": "testflows.connect",
+    "error": "testflows.asserts",
+    "errors": "testflows.asserts",
+}
 
 __all__ = [
         "execute",
         "os", "sys",
-        "Shell", "error", "errors",
+        "Shell", "ShellPool", "lease_shell", "error", "errors",
         "TextBook", "TextChapter", "TextDocument", "TextPage", "TextSection", "TextParagraph",
         "TextBackground", "TextOutline", "TextStep", "TextModule",
         "Book", "Chapter", "Document", "Page", "Section", "Paragraph", "Background", "Example", "Outline",
@@ -63,9 +74,9 @@ __all__ = [
         "Secret",
         "Table",
         "The",
-        "load", "append_path", "cleanup",
+        "load", "append_path", "cleanup", "depends", "export", "cached", "MemoCache",
         "main", "args", "private_key",
-        "metric", "ticket", "value", "note", "debug", "trace", "text",
+        "metric", "ticket", "value", "note", "debug", "trace", "text", "stream_text",
         "attribute", "requirement", "tag",
         "input", "current_time",
         "message", "exception", "ok", "fail", "skip", "err",
@@ -90,3 +101,20 @@ __all__ = [
         # common utilities
         "triple_quotes"
     ]
+
+
+def __getattr__(name):
+    """Load name on first use.
+    """
+    if name.startswith("__"):
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    try:
+        value = getattr(import_module(_modules.get(name, "testflows.texts.core")), name)
+    except AttributeError:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'") from None
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,123 @@
+# Copyright 2021 Katteli Inc.
+# TestFlows.com Open-Source Software Testing Framework (http://testflows.com)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import sys
+import marshal
+import hashlib
+
+from importlib.util import MAGIC_NUMBER
+
+from testflows.texts import __version__
+from testflows.texts.compiler import Chunk, Block, Program
+from testflows.texts.writer import atomic_write
+
+#: cache file magic
+MAGIC = b"TFDC"
+#: cache format version that must be incremented whenever the code generated
+#: by `compiler.Generator` or the layout of the cache file changes
+FORMAT_VERSION = 1
+
+
+def cache_path(filename):
+    """Return path of the cache file for the document
+    using the same layout as `__pycache__`.
+
+    :param filename: absolute path of the source document
+    """
+    directory, name = os.path.split(filename)
+    cache_name = f"{name}.{sys.implementation.cache_tag}.tfdc"
+
+    if sys.pycache_prefix:
+        return os.path.join(sys.pycache_prefix, directory.lstrip(os.sep), cache_name)
+
+    return os.path.join(directory, "__pycache__", cache_name)
+
+
+def cache_key(filename, source_data):
+    """Return cache key for the document that is the hash
+    of its path, content, cache format version, `testflows.texts` version
+    and bytecode magic number.
+
+    :param filename: absolute path of the source document
+    :param source_data: source document
+    """
+    key = hashlib.sha256()
+    key.update(MAGIC_NUMBER)
+    key.update(f"{FORMAT_VERSION}".encode("utf-8") + b"\0")
+    key.update(__version__.encode("utf-8") + b"\0")
+    key.update(filename.encode("utf-8") + b"\0")
+    key.update(source_data.encode("utf-8", "surrogateescape"))
+    return key.hexdigest()
+
+
+def load(filename, source_data):
+    """Load compiled document program from the cache.
+    Returns None if cache does not exist or it is stale.
+
+    :param filename: absolute path of the source document
+    :param source_data: source document
+    """
+    if not sys.implementation.cache_tag:
+        return None
+
+    try:
+        with open(cache_path(filename), "rb") as fd:
+            data = fd.read()
+    except OSError:
+        return None
+
+    if not data.startswith(MAGIC):
+        return None
+
+    try:
+        key, blocks, source, code = marshal.loads(data[len(MAGIC):])
+    except (EOFError, ValueError, TypeError):
+        return None
+
+    if key != cache_key(filename, source_data):
+        return None
+
+    blocks = [Block(level, name, [Chunk(*chunk) for chunk in chunks]) for level, name, chunks in blocks]
+
+    program = Program(filename, blocks, source, code)
+    program.register()
+
+    return program
+
+
+def dump(program, source_data):
+    """Write compiled document program into the cache.
+
+    The cache file is written into a temporary file first
+    and then it is atomically renamed so that concurrent writers
+    and readers always see a complete file.
+
+    :param program: compiled program
+    :param source_data: source document
+    """
+    if not sys.implementation.cache_tag:
+        return
+
+    path = cache_path(program.filename)
+
+    blocks = tuple((block.level, block.name, tuple(tuple(chunk) for chunk in block.chunks)) for block in program.blocks)
+    data = MAGIC + marshal.dumps((cache_key(program.filename, source_data), blocks, program.source, program.code))
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with atomic_write(path, "wb") as temp_file:
+            temp_file.write(data)
+    except OSError:
+        pass
@@ -0,0 +1,112 @@
+# Copyright 2021 Katteli Inc.
+# TestFlows.com Open-Source Software Testing Framework (http://testflows.com)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+
+from .compiler import Program, parse, chunk_line, compile_chunk, compile_document
+from .inputs import open_input
+
+# only the compiler is used to check documents so that
+# the test framework and the document runtime are not imported
+
+
+def syntax_error(name, program, e):
+    """Return error message for the syntax error showing
+    the text of the document where the error has occurred.
+
+    :param name: document name
+    :param program: program of the document blocks
+    :param e: syntax error
+    """
+    chunk = getattr(e, "chunk", None)
+    lineno = e.lineno or (chunk or program.chunks[0]).lineno
+    if chunk is not None:
+        lineno = chunk_line(chunk, lineno)
+    return (f"{name}:{lineno}: {type(e).__name__}: {e.msg}\n\n"
+        + program.numbered_text(lineno, chunk) + "\n")
+
+
+def check_document(path, engine="peg"):
+    """Return list of errors of the document found by parsing it
+    and compiling each of its chunks without running it.
+
+    :param path: document path, '-' for stdin
+    :param engine: parser engine either 'peg' or 'scanner', default: 'peg'
+    """
+    name = path if path != "-" else "<stdin>"
+
+    try:
+        with open_input(path) as source:
+            source_data = source.read()
+    except (OSError, UnicodeDecodeError) as e:
+        return [f"{name}: {e}"]
+
+    if not source_data:
+        return [f"{name}: source file is empty"]
+
+    blocks = parse(source_data, engine=engine)
+    if blocks is None:
+        return [f"{name}: parsing failed"]
+
+    filename = os.path.abspath(path) if path != "-" else name
+
+    try:
+        compile_document(blocks, filename, register=False)
+        return []
+    except SyntaxError as e:
+        error = e
+
+    # compile each chunk on its own to find all the errors
+    program = Program(filename, blocks, None, None)
+    errors = []
+    for block in blocks:
+        for chunk in block.chunks:
+            try:
+                compile_chunk(filename, block, chunk)
+            except SyntaxError as e:
+                errors.append(syntax_error(name, program, e))
+
+    return errors or [syntax_error(name, program, error)]
+
+
+def check_documents(paths, engine="peg"):
+    """Return list of (path, errors) of the documents.
+
+    :param paths: document paths
+    :param engine: parser engine either 'peg' or 'scanner', default: 'peg'
+    """
+    return [(path, check_document(path, engine=engine)) for path in paths]
+
+
+def check(paths, engine="peg", jobs=1):
+    """Check documents using the specified number of worker processes
+    where each worker checks a batch of documents and return
+    list of (path, errors) of the documents in the same order as the paths.
+
+    :param paths: document paths
+    :param engine: parser engine either 'peg' or 'scanner', default: 'peg'
+    :param jobs: number of worker processes, default: 1
+    """
+    from .forkserver import ForkServer
+
+    jobs = min(jobs, len(paths))
+    # stdin can only be read by this process
+    if jobs < 2 or "-" in paths:
+        return check_documents(paths, engine=engine)
+
+    with ForkServer(jobs) as pool:
+        futures = [pool.submit(check_documents, paths[i::jobs], engine) for i in range(jobs)]
+        results = dict(result for future in futures for result in future.result())
+
+    return [(path, results[path]) for path in paths]
@@ -0,0 +1,123 @@
+# Copyright 2021 Katteli Inc.
+# TestFlows.com Open-Source Software Testing Framework (http://testflows.com)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+
+from textwrap import dedent
+
+from testflows._core.cli.arg.common import epilog
+from testflows._core.cli.arg.common import HelpFormatter
+from testflows._core.cli.arg.handlers.handler import Handler as HandlerBase
+
+#: metrics with the time it took to run each document and section
+time_metrics = ("document time", "section time")
+
+
+def read_times(log):
+    """Return dictionary of the times in seconds of the documents
+    and sections in the test log by their full name.
+
+    Sections that have the same full name, such as sibling sections
+    with the same heading, are told apart by the number of the occurrence
+    of the name in the test log, for example, '/doc.tfd/Notes #2'.
+
+    :param log: open test log file
+    """
+    from testflows._core.name import unclean
+
+    times = {}
+    occurrences = {}
+    for line in log:
+        message = json.loads(line)
+        if message["message_keyword"] != "METRIC" or message["metric_name"] not in time_metrics:
+            continue
+        name = unclean(message["test_name"])
+        occurrences[name] = occurrences.get(name, 0) + 1
+        if occurrences[name] > 1:
+            name = f"{name} #{occurrences[name]}"
+        times[name] = message["metric_value"]
+    return times
+
+
+def compare(old, new, threshold, min_delta):
+    """Return list of (name, old time, new time) of the documents
+    and sections that became slower, largest slowdown first.
+
+    :param old: old times
+    :param new: new times
+    :param threshold: relative slowdown that is a regression
+    :param min_delta: minimum absolute slowdown in seconds
+    """
+    regressions = []
+    for name, value in new.items():
+        base = old.get(name)
+        if base is None:
+            continue
+        if value > base * (1 + threshold) and value - base > min_delta:
+            regressions.append((name, base, value))
+    return sorted(regressions, key=lambda regression: (regression[1] - regression[2], regression[0]))
+
+
+class Handler(HandlerBase):
+    @classmethod
+    def add_command(cls, commands):
+        parser = commands.add_parser("compare", help="compare document run times of two runs", epilog=epilog(),
+            description=(dedent("""
+            Compare the times of the documents and their sections
+            recorded in the test logs of two runs of 'tfs document run'
+            and show the ones that became slower. Exits with an error
+            if there are any regressions.
+
+            For example:
+               tfs document compare before.log after.log --threshold 0.2
+            """).strip()),
+            formatter_class=HelpFormatter)
+
+        parser.add_argument("old", metavar="old", type=str,
+                            help="test log of the previous run")
+        parser.add_argument("new", metavar="new", type=str,
+                            help="test log of the current run")
+        parser.add_argument("--threshold", metavar="ratio", type=float,
+                            help="relative slowdown that is flagged as a regression, default: 0.1", default=0.1)
+        parser.add_argument("--min-delta", metavar="seconds", type=float,
+                            help="ignore slowdowns smaller than this, default: 0.01", default=0.01)
+        parser.add_argument("--all", action="store_true",
+                            help="show the times of all the documents and sections found in both logs",
+                            default=False)
+
+        parser.set_defaults(func=cls())
+
+    def handle(self, args):
+        import testflows._core.cli.arg.type as argtype
+        from testflows._core.cli.arg.exit import ExitWithError
+
+        times = []
+        for path in (args.old, args.new):
+            with argtype.logfile("r", bufsize=1, encoding="utf-8")(path) as log:
+                times.append(read_times(log))
+        old, new = times
+
+        compared = [name for name in new if name in old]
+        regressions = compare(old, new, args.threshold, args.min_delta)
+
+        if args.all:
+            for name in compared:
+                print(f"{name} {old[name]:.3f}s -> {new[name]:.3f}s")
+
+        for name, base, value in regressions:
+            change = f"+{(value / base - 1) * 100:.0f}%" if base else "+inf%"
+            print(f"regression: {name} {base:.3f}s -> {value:.3f}s ({change})")
+
+        if regressions:
+            raise ExitWithError(f"{len(regressions)} of {len(compared)} documents and sections regressed")
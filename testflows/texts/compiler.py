@@ -0,0 +1,424 @@
+# Copyright 2021 Katteli Inc.
+# TestFlows.com Open-Source Software Testing Framework (http://testflows.com)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import re
+import ast
+import bisect
+import inspect
+
+from collections import namedtuple
+from linecache import cache as code_cache
+
+#: document chunk, `lineno` is the first line of the chunk in the source document
+Chunk = namedtuple("Chunk", "rule_name lineno text")
+
+#: document block, either the header, the intro (level 0, no name)
+#: or a section that starts with a heading chunk
+Block = namedtuple("Block", "level name chunks")
+
+#: name of the section hook called by the generated code at each heading
+section_hook = "__section__"
+
+#: name of the chunk hook called by the generated code at the start
+#: of each chunk with the chunk's line number when profiling
+chunk_hook = "__chunk__"
+
+#: compiler flags that allow top level `await` in code blocks and f-string expressions
+flags = ast.PyCF_ALLOW_TOP_LEVEL_AWAIT
+
+#: group of consecutive independent sibling sections where each unit
+#: is the list of blocks of one section including its subsections
+Group = namedtuple("Group", "level units")
+
+#: heading marker of an independent section
+independent_marker_re = re.compile(r"[ \t]*<!--[ \t]*independent[ \t]*-->[ \t]*\Z")
+
+#: document header line that marks all sections as independent
+independent_header_re = re.compile(r"^independent:[ \t]*(true|yes)[ \t]*$", re.MULTILINE | re.IGNORECASE)
+
+#: document header line that releases the names created in each section when the section ends
+scoped_header_re = re.compile(r"^scoped:[ \t]*(true|yes)[ \t]*$", re.MULTILINE | re.IGNORECASE)
+
+# text that can't be used inside `fr"""..."""` without changing its meaning
+# or breaking the generated code must go through the f-string path
+# so that the errors are the same as if it was compiled as f-string
+not_literal_re = re.compile(r'[{}\r\0]|"""|["\\]\Z')
+
+
+def is_literal(text):
+    """Return True if text does not contain any f-string
+    expressions and can be emitted directly as a constant.
+
+    :param text: chunk text
+    """
+    return not_literal_re.search(text) is None
+
+
+def chunk_line(chunk, lineno):
+    """Return the line of the chunk that is the closest to the specified line.
+    Syntax errors of the text are reported at the line of the closing
+    quotes that follows the last line of the text.
+
+    :param chunk: chunk
+    :param lineno: line number in the source document
+    """
+    return min(max(lineno, chunk.lineno), chunk.lineno + max(len(chunk.text.splitlines()), 1) - 1)
+
+
+def section_name(block):
+    """Return section name of the block without the independent marker.
+    """
+    return independent_marker_re.sub("", block.name)
+
+
+def is_independent(block):
+    """Return True if block is a section marked as independent.
+    """
+    return block.name is not None and independent_marker_re.search(block.name) is not None
+
+
+def document_header(blocks):
+    """Return text of the document header or an empty string
+    if the document does not have a header.
+    """
+    if not blocks or blocks[0].name is not None or blocks[0].chunks[0].rule_name != "header_sep":
+        return ""
+    return "".join(chunk.text for chunk in blocks[0].chunks)
+
+
+def is_independent_document(blocks):
+    """Return True if document header marks all sections as independent.
+    """
+    return independent_header_re.search(document_header(blocks)) is not None
+
+
+def is_scoped_document(blocks):
+    """Return True if document header marks names created
+    in each section as local to the section.
+    """
+    return scoped_header_re.search(document_header(blocks)) is not None
+
+
+def schedule(blocks, independent=False):
+    """Split blocks into segments where each segment is either
+    a list of blocks that must run in order or a group
+    of two or more consecutive independent sibling sections.
+
+    :param blocks: list of document blocks
+    :param independent: all sections are independent, default: False
+    """
+    segments = []
+    sequential = []
+    i = 0
+
+    while i < len(blocks):
+        level = blocks[i].level
+        units = []
+        j = i
+        while (j < len(blocks) and blocks[j].name is not None and blocks[j].level == level
+                and (independent or is_independent(blocks[j]))):
+            end = j + 1
+            while end < len(blocks) and blocks[end].level > level:
+                end += 1
+            units.append(blocks[j:end])
+            j = end
+
+        if len(units) > 1:
+            if sequential:
+                segments.append(sequential)
+                sequential = []
+            segments.append(Group(level, units))
+            i = j
+        else:
+            sequential.append(blocks[i])
+            i += 1
+
+    if sequential:
+        segments.append(sequential)
+
+    return segments
+
+
+class Program:
+    """Compiled executable document.
+
+    All chunks of the document are compiled into one code object
+    where each chunk occupies the same lines as in the source
+    document and therefore line numbers reported in the tracebacks
+    are the line numbers of the source document.
+
+    :param filename: virtual file name of the generated code
+    :param blocks: list of document blocks
+    :param source: generated Python source code
+    :param code: compiled code object
+    """
+    def __init__(self, filename, blocks, source, code):
+        self.filename = filename
+        self.blocks = blocks
+        self.source = source
+        self.code = code
+        #: True if code uses top level `await` and returns a coroutine when evaluated
+        self.coroutine = code is not None and bool(code.co_flags & inspect.CO_COROUTINE)
+        self.chunks = [chunk for block in blocks for chunk in block.chunks]
+        self.linenos = [chunk.lineno for chunk in self.chunks]
+        #: syntax error of the chunk that follows the last chunk of the program
+        #: that is raised once the program has run
+        self.error = None
+
+    def register(self):
+        """Register generated source code in the line cache
+        so that it is shown in the tracebacks.
+        """
+        lines = ["\n"] * (self.linenos[0] - 1 if self.linenos else 0) + [line + "\n" for line in self.source.split("\n")]
+        code_cache[self.filename] = (len(self.source), None, lines, self.filename)
+
+    def chunk_at(self, lineno):
+        """Return chunk that contains the specified line.
+
+        :param lineno: line number in the source document
+        """
+        index = bisect.bisect_right(self.linenos, lineno) - 1
+        return self.chunks[max(index, 0)]
+
+    def numbered_text(self, lineno, chunk=None):
+        """Return text of the chunk that contains the specified line
+        with each line numbered and the specified line marked.
+
+        :param lineno: line number in the source document
+        :param chunk: chunk to show, default: chunk that contains the line
+        """
+        chunk = chunk or self.chunk_at(lineno)
+        split_lines = chunk.text.splitlines()
+        line_offset = chunk.lineno - 1
+        lineno = chunk_line(chunk, lineno)
+
+        line_fmt = "  %" + str(len(str(len(split_lines) + line_offset))) + "d|  %s"
+        line_at_fmt = "  %" + str(len(str(len(split_lines) + line_offset))) + "d|> %s"
+
+        return "\n".join(
+            [line_fmt % (n + line_offset,l) if n + line_offset != lineno else line_at_fmt % (n + line_offset,l) for n, l in enumerate(
+                split_lines, 1)])
+
+
+class Generator:
+    """Python source code generator that keeps
+    line numbers of the source document.
+
+    :param profile: call chunk hook at the start of each chunk, default: False
+    """
+    def __init__(self, profile=False):
+        self.source = []
+        self.dirty = False
+        self.profile = profile
+
+    def statement(self, code):
+        """Add statement to the current line.
+        """
+        if self.dirty:
+            self.source.append("; ")
+        self.source.append(code)
+        self.dirty = True
+
+    def newlines(self, count):
+        """Add new lines.
+        """
+        if count:
+            self.source.append("\n" * count)
+            self.dirty = False
+
+    def heading(self, block):
+        """Add section hook call for the block heading.
+        """
+        self.statement(f"{section_hook}({block.level!r}, {section_name(block)!r})")
+
+    def chunk(self, chunk):
+        """Add code for the chunk.
+        """
+        if chunk.rule_name == "exec_code":
+            lines = chunk.text.split("\n")
+            # skip opening and closing code fence lines
+            code = lines[1:-2] if chunk.text.endswith("\n") else lines[1:-1]
+            self.newlines(1)
+            if code:
+                self.source.append("\n".join(code))
+                self.newlines(1)
+            if chunk.text.endswith("\n"):
+                self.newlines(1)
+
+        elif is_literal(chunk.text):
+            self.statement(f'text({chunk.text!r}, dedent=False, end="")')
+            self.newlines(chunk.text.count("\n"))
+
+        else:
+            self.statement(f'text(fr"""{chunk.text}""", dedent=False, end="")')
+
+    def generate(self, blocks):
+        """Generate source code for the blocks.
+        """
+        for block in blocks:
+            for i, chunk in enumerate(block.chunks):
+                if self.profile:
+                    self.statement(f"{chunk_hook}({chunk.lineno!r})")
+                if i == 0 and block.name is not None:
+                    self.heading(block)
+                self.chunk(chunk)
+        return "".join(self.source)
+
+
+def chunk_source(block, chunk, profile=False):
+    """Return generated source code for a single chunk
+    padded to start at the chunk's line number.
+    """
+    generator = Generator(profile=profile)
+    generator.newlines(chunk.lineno - 1)
+    if profile:
+        generator.statement(f"{chunk_hook}({chunk.lineno!r})")
+    if block.name is not None and block.chunks[0] is chunk:
+        generator.heading(block)
+    generator.chunk(chunk)
+    return "".join(generator.source)
+
+
+def compile_chunk(filename, block, chunk, profile=False):
+    """Compile a single chunk and return its code object.
+    If the chunk could not be compiled then the chunk is set
+    as the `chunk` attribute of the raised syntax error.
+
+    :param filename: virtual file name
+    :param block: block of the chunk
+    :param chunk: chunk
+    :param profile: generated code calls chunk hook, default: False
+    """
+    try:
+        return compile(chunk_source(block, chunk, profile=profile), filename, "exec", flags, dont_inherit=True)
+    except SyntaxError as e:
+        e.chunk = chunk
+        raise
+
+
+def check(program_filename, blocks, tree, profile=False):
+    """Check that each top level statement of the generated
+    code does not cross chunk boundaries and if it does or if the
+    generated code could not be compiled then compile each chunk on its own
+    to raise the same syntax error as if each chunk was compiled separately.
+
+    :param program_filename: virtual file name
+    :param blocks: document blocks
+    :param tree: AST of the generated code or None
+    :param profile: generated code calls chunk hook, default: False
+    """
+    if tree is not None:
+        chunks = [chunk for block in blocks for chunk in block.chunks]
+        linenos = [chunk.lineno for chunk in chunks]
+        for statement in tree.body:
+            chunk = chunks[bisect.bisect_right(linenos, statement.lineno) - 1]
+            if statement.end_lineno > chunk.lineno + chunk.text.count("\n"):
+                break
+        else:
+            return
+
+    for block in blocks:
+        for chunk in block.chunks:
+            compile_chunk(program_filename, block, chunk, profile=profile)
+
+
+def parse(source_data, engine="peg"):
+    """Parse document and return its blocks or None
+    if document could not be parsed.
+
+    :param source_data: source document
+    :param engine: parser engine either 'peg' or 'scanner', default: 'peg'
+    """
+    if engine == "scanner":
+        from testflows.texts.scanner import scan
+
+        return list(scan(source_data))
+
+    from testflows.texts.peg import Parser, Visitor, visit_parse_tree
+
+    tree = Parser().parse(source_data)
+
+    if tree is None:
+        return None
+
+    visitor = Visitor(source_data)
+    visit_parse_tree(tree, visitor)
+
+    return visitor.blocks
+
+
+def compile_document(blocks, filename, register=True, profile=False):
+    """Compile document blocks into a program.
+
+    The blocks do not have to start at the beginning of the document
+    as the line numbers of the generated code are moved to the line
+    of the first block.
+
+    :param blocks: list of document blocks
+    :param filename: virtual file name for the generated code
+    :param register: register generated code in the line cache, default: True
+    :param profile: call chunk hook at the start of each chunk, default: False
+    """
+    source = Generator(profile=profile).generate(blocks)
+    line_offset = blocks[0].chunks[0].lineno - 1 if blocks else 0
+
+    try:
+        tree = compile(source, filename, "exec", ast.PyCF_ONLY_AST | flags, dont_inherit=True)
+    except SyntaxError as e:
+        check(filename, blocks, None, profile=profile)
+        if e.lineno is not None:
+            e.lineno += line_offset
+        if getattr(e, "end_lineno", None) is not None:
+            e.end_lineno += line_offset
+        raise
+
+    ast.increment_lineno(tree, line_offset)
+    check(filename, blocks, tree, profile=profile)
+
+    program = Program(filename, blocks, source, compile(tree, filename, "exec", flags, dont_inherit=True))
+    if register:
+        program.register()
+
+    return program
+
+
+def compile_until_error(blocks, filename, error, register=True, profile=False):
+    """Compile the chunks of the document blocks that come before the chunk
+    that has failed to compile into a program that has the syntax error
+    as its `error` so that the text before the error is still written.
+    A block is left out if its first chunk has failed.
+
+    :param blocks: list of document blocks
+    :param filename: virtual file name for the generated code
+    :param error: syntax error raised by `compile_document()`
+    :param register: register generated code in the line cache, default: True
+    :param profile: call chunk hook at the start of each chunk, default: False
+    """
+    chunk = getattr(error, "chunk", None)
+    if chunk is None:
+        raise error
+
+    before = []
+    for block in blocks:
+        index = next((i for i, block_chunk in enumerate(block.chunks) if block_chunk is chunk), None)
+        if index is None:
+            before.append(block)
+            continue
+        if index:
+            before.append(Block(block.level, block.name, block.chunks[:index]))
+        break
+
+    program = compile_document(before, filename, register=register, profile=profile)
+    program.error = error
+    return program
@@ -12,6 +12,8 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import os
+
 from testflows.core import *
 from testflows._core.test import TestDecorator
 from testflows._core.testtype import TestSubType
@@ -71,3 +73,27 @@ class TextSection(TestDecorator):
 class TextParagraph(TestDecorator):
     type = Paragraph
     subtype = None
+
+def export(*names):
+    """Keep names in the document namespace when the section
+    that has created them ends if the document uses `scoped: true`
+    in its header.
+
+    :param names: names
+    """
+    exports = getattr(current().context, "exports", None)
+    if exports is not None:
+        exports.update(names)
+    return names
+
+def depends(*paths):
+    """Declare files that the document depends on
+    so that the document is run again if any of them changes
+    when `--changed-only` option is used.
+
+    :param paths: file paths
+    """
+    files = getattr(current().context, "depends", None)
+    if files is not None:
+        files.extend(os.path.abspath(path) for path in paths)
+    return paths
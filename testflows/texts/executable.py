@@ -12,24 +12,114 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import io
+import os
 import re
+import sys
+import time
+import asyncio
 import inspect
+import itertools
+import tracemalloc
 
 from textwrap import indent, dedent
-from tempfile import NamedTemporaryFile
-from linecache import cache as code_cache
-from contextlib import ExitStack
-
-from testflows._core.contrib.arpeggio import RegExMatch as _
-from testflows._core.contrib.arpeggio import OneOrMore, ZeroOrMore, EOF, Optional, Not
-from testflows._core.contrib.arpeggio import ParserPython as PEGParser
-from testflows._core.contrib.arpeggio import PTNodeVisitor, visit_parse_tree
+from importlib import import_module
+from contextlib import ExitStack, contextmanager
+
 from testflows._core.exceptions import exception as get_exception
 
-from testflows.texts import *
+# names available to the documents
+from testflows.texts import __author__, __version__, __license__
+from testflows.connect import Shell
+from testflows.asserts import error, errors
+from testflows.texts.core import *
+from testflows.texts.shells import ShellPool, lease_shell
+from testflows.texts.memo import MemoCache, cached
+from testflows.texts.streams import stream_text
+from testflows.texts.compiler import Chunk, Block, Program, Group, section_hook, chunk_hook, compile_document
+from testflows.texts.compiler import compile_until_error
+from testflows.texts.compiler import schedule, section_name, is_independent_document, is_scoped_document, parse
+from testflows.texts import cache as document_cache
+from testflows.texts.scanner import scan, scan_stream
+
+# module attribute is shadowed by the standard `asyncio` module
+testflows_asyncio = import_module("testflows._core.parallel.asyncio")
 
 DummySection = NullStep
 
+
+def output_position(file):
+    """Return number of characters written into the document
+    output file or None if it is not known.
+
+    :param file: output file
+    """
+    try:
+        return file.tell()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def report_section(start_time, blocks, output, memory=None, test=None):
+    """Report section time, the number of document blocks,
+    the size of the output and the peak memory of the section.
+
+    :param start_time: time when the section was started
+    :param blocks: number of document blocks of the section
+    :param output: output position when the section was started or None
+    :param memory: peak memory allocated by the section in bytes or None
+    :param test: section test, default: current test
+    """
+    test = test or current()
+    metric("section time", round(time.perf_counter() - start_time, 3), "s", test=test)
+    metric("section blocks", blocks, "blocks", test=test)
+    if output is not None:
+        end = output_position(getattr(test.context, "file", None))
+        if end is not None:
+            metric("section output", end - output, "characters", test=test)
+    if memory is not None:
+        metric("section memory peak", memory, "bytes", test=test)
+
+
+class TextBatch:
+    """Text log messages that are written into the test log
+    as one message for each test. It is used as the `test` argument
+    of `text()` and writes out the collected text when the text
+    is added by another test or when the collected text reaches the size.
+
+    :param size: maximum size of the collected text in characters, default: 64 KiB
+    """
+    def __init__(self, size=1 << 16):
+        self.size = size
+        self.test = None
+        self.messages = []
+        self.collected = 0
+        # `text()` logs the text using `test.io.output.text()`
+        self.io = self.output = self
+
+    def text(self, message):
+        """Add text log message of the current test.
+
+        :param message: text
+        """
+        test = current()
+        if test is not self.test:
+            self.flush()
+            self.test = test
+        self.messages.append(message)
+        self.collected += len(message)
+        if self.collected >= self.size:
+            self.flush()
+
+    def flush(self):
+        """Write collected text into the test log.
+        """
+        if self.messages:
+            self.test.io.output.text("".join(self.messages))
+            self.messages = []
+            self.collected = 0
+
+
 class TestStack(ExitStack):
     def push_context(self, cm):
         return super(TestStack, self).enter_context(cm)
@@ -42,172 +132,521 @@ class TestStack(ExitStack):
         cb(None, None, None)
 
 
-class Visitor(PTNodeVisitor):
-    def __init__(self, stack, source_data, *args, **kwargs):
+class EventLoop:
+    """Event loop of the document that runs the code
+    that uses top level `await` so that tasks can span code blocks.
+
+    While the document is running, the loop is the current event loop
+    and the main event loop of the test framework so that sections
+    can be started by the code running inside the loop. Any tasks
+    that are still pending at the end of the document are cancelled.
+    """
+    def __enter__(self):
+        self.loop = asyncio.new_event_loop()
+        self.main_event_loop = testflows_asyncio.main_event_loop
+        testflows_asyncio.main_event_loop = self.loop
+        asyncio.set_event_loop(self.loop)
+        return self.loop
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        try:
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            # not available before Python 3.9
+            if hasattr(self.loop, "shutdown_default_executor"):
+                self.loop.run_until_complete(self.loop.shutdown_default_executor())
+        finally:
+            testflows_asyncio.main_event_loop = self.main_event_loop
+            asyncio.set_event_loop(self.main_event_loop)
+            self.loop.close()
+
+
+class Resume(BaseException):
+    """Raised by the snapshot callback to abandon the current program
+    and continue execution with the program for the rest of the document.
+
+    :param program: program for the document blocks starting at `start`
+    :param start: index of the first block of the program in the document
+    """
+    def __init__(self, program, start):
+        self.program = program
+        self.start = start
+        super(Resume, self).__init__(program, start)
+
+
+class Runner:
+    """Executable document program runner.
+
+    :param stack: test stack
+    :param program: compiled program
+    :param snapshot: optional callback called with the index of the
+        section block before the section is started
+    :param profiler: optional profiler
+    :param independent: all sections of the document are independent,
+        default: determined by the document header
+    :param loop: event loop of the document
+    :param namespace: initial document namespace that is copied, default: None
+    :param scoped: names created in a section are removed when the section ends
+        unless they are exported, default: determined by the document header
+    :param light: only headings of the sections that have code blocks are run
+        as section tests and text log messages are batched, default: False
+    """
+    def __init__(self, stack, program, snapshot=None, profiler=None, independent=None, loop=None,
+            namespace=None, scoped=None, light=False):
         self.stack = stack
-        self.source_data = source_data
+        self.program = program
         self.globals = globals()
-        self.locals = {}
+        self.locals = dict(namespace or {})
         self.current_level = 0
-        super(Visitor, self).__init__(*args, **kwargs)
-
-    def visit_header(self, node, children):
-        self.process(node)
+        self.snapshot = snapshot
+        self.profiler = profiler
+        self.independent = independent
+        self.loop = loop
+        self.sections = None
+        self.resumed = False
+        self.entered = False
+        #: number of document blocks that were run
+        self.blocks = 0
+        self.scoped = scoped
+        #: names that are kept when the section that has created them ends
+        self.exports = set()
+        #: report peak memory of each section when memory allocations are traced
+        self.memory = tracemalloc.is_tracing() and profiler is None
+        #: [memory at the start, peak memory] of each open section
+        self.peaks = []
+        self.light = light
+        self.batch = TextBatch()
+
+    def load(self, program, start=0):
+        """Load program that starts at the specified document block.
+        """
+        self.program = program
+        if self.profiler is not None:
+            self.profiler.load(program)
+        self.sections = iter([(start + i, block) for i, block in enumerate(program.blocks) if block.name is not None])
+        self.blocks += sum(len(block.chunks) for block in program.blocks if block.name is None)
+
+    def section(self, section_level, name):
+        """Section hook that is called by the program at each heading.
+        """
+        assert self.current_level >= 0, "current level is invalid"
 
-    def execute(visitor, node):
-        visitor.locals["self"] = current()
+        index, block = next(self.sections)
+        if self.snapshot is not None:
+            # resumed program starts right where the snapshot was taken
+            if not self.resumed:
+                self.snapshot(index)
+            self.resumed = False
+
+        # independent section is entered by the runner of its group
+        if self.entered:
+            self.entered = False
+            self.blocks += len(block.chunks)
+            self.locals["self"] = current()
+            return
+
+        self.level(section_level - 1)
+
+        if self.light and not any(chunk.rule_name == "exec_code" for chunk in block.chunks):
+            # heading without code is only a part of the text of the current test
+            self.stack.push_context(DummySection())
+        else:
+            section = Section(name, context=SharedContext(current().context))
+            self.stack.push_context(self.measured(section, self.blocks))
 
-        position = node.position
-        lines = node.flat_str()
+        self.blocks += len(block.chunks)
+        self.current_level = section_level
+        self.locals["self"] = current()
 
-        if node.rule_name == "exec_code":
-            exec_lines = "\n".join(lines.strip().splitlines()[1:-1])
-        else:
-            if lines.endswith('"'):
-                end = lines.rsplit('"')[-1]
-                exec_lines = fr'''text(fr"""{lines}""", dedent=False, end='{end}')'''
-            else:
-                exec_lines = f'text(fr"""{lines}""", dedent=False, end="")'
-
-        with NamedTemporaryFile("w+", suffix=".py") as code_file:
-            code_file.write(exec_lines)
-            code_file.seek(0)
-            code_file.flush()
-            visitor.locals["__file__"] = code_file.name
-
-            source_code = code_file.read()
-            source_name = code_file.name
-    
-            code_cache[source_name] = (
-                len(source_code), None,
-                [line+'\n' for line in source_code.splitlines()], source_name
-            )
+    @contextmanager
+    def measured(self, section, blocks):
+        """Run section and report its metrics when it ends
+        including its subsections.
 
+        :param section: section
+        :param blocks: number of document blocks that were run before the section
+        """
+        with section as test:
+            start_time = time.perf_counter()
+            output = output_position(getattr(test.context, "file", None))
+            names = set(self.locals) if self.scoped else None
+            if self.memory:
+                memory = self.trace_peak()
+                self.peaks.append([memory, memory])
             try:
-                exec(compile(source_code, source_name, 'exec'),
-                        visitor.globals, visitor.locals)   
-            except Exception as e:
-                exc_tb = e.__traceback__
-                syntax_error = isinstance(e, SyntaxError)
+                yield test
+            finally:
+                self.batch.flush()
+                if names is not None:
+                    self.release(names)
+                memory = None
+                if self.memory:
+                    self.trace_peak()
+                    start, peak = self.peaks.pop()
+                    memory = peak - start
+                report_section(start_time, self.blocks - blocks, output, memory=memory, test=test)
+
+    def trace_peak(self):
+        """Update peak memory of the open sections with the peak
+        of the traced memory since the last call and return the size
+        of the traced memory.
+        """
+        memory, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for section_peak in self.peaks:
+            section_peak[1] = max(section_peak[1], peak)
+        return memory
 
-                if syntax_error:
-                    tb_lineno = e.lineno
-                else:
-                    exc_tb = exc_tb.tb_next
-                    tb_lineno = exc_tb.tb_lineno
-        
-                split_lines = lines.splitlines()
+    def release(self, names):
+        """Remove names that were created since the section has started
+        from the document namespace unless they are exported or are modules.
 
-                code_offset = 0
-                if node.rule_name == "exec_code":
-                    code_offset = 1
-                line_offset = visitor.source_data[:position].count("\n")
+        :param names: names that existed when the section has started
+        """
+        for name, value in list(self.locals.items()):
+            if name not in names and name not in self.exports and not inspect.ismodule(value):
+                del self.locals[name]
 
-                line_fmt = "  %" + str(len(str(len(split_lines) + line_offset))) + "d|  %s"
-                line_at_fmt = "  %" + str(len(str(len(split_lines) + line_offset))) + "d|> %s"
+    def level(self, level):
+        """Close or open sections so that the current section level
+        is the specified level.
+        """
+        if level > self.current_level:
+            for i in range(level - self.current_level):
+                self.stack.push_context(DummySection())
+        else:
+            for i in range(self.current_level - level):
+                self.stack.pop_context()
+        self.current_level = level
 
-                numbered_lines = "\n".join(
-                    [line_fmt % (n + line_offset,l) if n != tb_lineno + code_offset else line_at_fmt % (n + line_offset,l) for n, l in enumerate(
-                        split_lines, 1)])
+    def setup(self, filename):
+        """Setup document namespace.
+        """
+        self.locals["self"] = current()
+        self.locals["__file__"] = filename
+        self.locals[section_hook] = self.section
+        current().context.exports = self.exports
+        if self.light:
+            self.locals["text"] = self.text
+        if self.profiler is not None:
+            self.locals[chunk_hook] = self.profiler.chunk
+
+    def text(self, *message, test=None, **kwargs):
+        """Add text to the document where the text log messages are batched
+        unless the test is specified.
+
+        :param message: text
+        :param test: test, default: None
+        :param kwargs: other `text()` arguments
+        """
+        return text(*message, test=self.batch if test is None else test, **kwargs)
 
-                code_exc = type(e)(str(e) + f"\n\n{'Syntax Error' if syntax_error else 'Error'} occured in the following text:\n\n"
-                        + numbered_lines)
+    def run(self):
+        """Run program.
+        """
+        self.setup(self.program.filename)
 
-                code_exc.with_traceback(exc_tb)
-                err(f"{e.__class__.__name__}\n" + get_exception(type(e), code_exc, code_exc.__traceback__))
+        if self.scoped is None:
+            self.scoped = is_scoped_document(self.program.blocks)
 
-    def process(self, node):
-        for child in node:
-            self.execute(child)
+        if self.snapshot is None and self.profiler is None:
+            if self.independent is None:
+                self.independent = is_independent_document(self.program.blocks)
+            segments = schedule(self.program.blocks, self.independent)
+            if any(isinstance(segment, Group) for segment in segments):
+                return self.run_segments(segments)
 
-    def visit_intro(self, node, children):
-        self.process(node)
+        self.load(self.program)
 
-    def visit_section(self, node, children):
-        section_level = node[0].value.count("#")
-        
-        assert self.current_level >= 0, "current level is invalid"
-        
-        section = Section(node.heading.heading_name.value.strip(), context=SharedContext(current().context))
+        while True:
+            try:
+                self.exec(self.program)
+            except Resume as resume:
+                self.load(resume.program, resume.start)
+                self.resumed = True
+                continue
+            except Exception as e:
+                _report_error(self.program, e)
+            break
 
-        if section_level > self.current_level:
-            for i in range(section_level - self.current_level - 1):
-                self.stack.push_context(DummySection())
+    def exec(self, program):
+        """Execute program code. Code that uses top level `await`
+        is run until complete inside the event loop of the document.
+
+        :param program: compiled program
+        """
+        if program.coroutine:
+            self.loop.run_until_complete(eval(program.code, self.globals, self.locals))
         else:
-            for i in range(self.current_level - section_level + 1):
-                self.stack.pop_context()
+            exec(program.code, self.globals, self.locals)
 
-        self.stack.push_context(section)
-        self.current_level = section_level
-        self.process(node)
+    def run_segments(self, segments):
+        """Run program segments where groups of independent
+        sections are run concurrently.
 
+        :param segments: program segments
+        """
+        filename = self.program.filename
+        programs = []
+
+        for i, segment in enumerate(segments):
+            if isinstance(segment, Group):
+                units = [compile_document(unit, filename, register=False) for unit in segment.units]
+                if not any(program.coroutine for program in units):
+                    programs.append(units)
+                    continue
+                # sections that await run in order inside the event loop of the document
+                segments[i] = [block for unit in segment.units for block in unit]
+            programs.append(compile_document(segments[i], filename, register=False))
+
+        for segment, program in zip(segments, programs):
+            if isinstance(segment, Group):
+                self.run_group(segment, program)
+                continue
+
+            self.load(program)
+            try:
+                self.exec(program)
+            except Exception as e:
+                _report_error(program, e)
 
-def Parser():
-    """TestFlows executable document parser.
-    """
-    def line():
-        return _(r"[^\n]*\n")
-    
-    def non_empty_line():
-        return _(r"[^\n]+\n")
+    def run_group(self, group, programs):
+        """Run independent sibling sections concurrently.
 
-    def final_line():
-        return _(r"[^\n]+"), EOF
+        Each section runs as a parallel test on its own thread
+        with a copy of the document namespace and writes into its own buffer.
+        Buffers are written out in the document order
+        once all the sections are done.
 
-    def paragraph():
-        return OneOrMore(Not(exec_code_start), [non_empty_line, final_line])
+        :param group: group of independent sections
+        :param programs: compiled program of each section
+        """
+        self.level(group.level - 1)
+        self.blocks += sum(len(block.chunks) for unit in group.units for block in unit)
+        parent = current()
+        buffers = []
+
+        try:
+            with Pool() as pool:
+                for unit, program in zip(group.units, programs):
+                    buffer = io.StringIO()
+                    buffers.append(buffer)
+                    Section(section_name(unit[0]), context=Context(parent.context),
+                        test=self.unit(program, group.level, buffer), parallel=True, executor=pool)()
+                join(all=True)
+        finally:
+            for buffer in buffers:
+                parent.context.file.write(buffer.getvalue())
+            self.locals["self"] = parent
+
+    def unit(self, program, level, buffer):
+        """Return function that runs independent section program
+        inside the section's test.
+
+        :param program: section program
+        :param level: section level
+        :param buffer: section output buffer
+        """
+        namespace = dict(self.locals)
+        blocks = sum(len(block.chunks) for block in program.blocks)
 
-    def header_sep():
-        return _(r"---[ \t]*\n")
+        def run_unit():
+            current().context.file = buffer
+            start_time = time.perf_counter()
+            try:
+                with TestStack() as stack:
+                    runner = Runner(stack, program, independent=self.independent, scoped=self.scoped,
+                        light=self.light)
+                    runner.locals = namespace
+                    # sections that run concurrently share the traced memory
+                    runner.memory = False
+                    runner.current_level = level
+                    runner.entered = True
+                    try:
+                        runner.run()
+                    finally:
+                        runner.batch.flush()
+            finally:
+                report_section(start_time, blocks, 0)
+
+        return run_unit
+
+    def stream(self, blocks, filename):
+        """Compile and run each block as soon as it is available.
+
+        :param blocks: iterable of document blocks
+        :param filename: source file name
+        """
+        self.setup(filename)
 
-    def header():
-        return header_sep, ZeroOrMore(Not(header_sep), line), header_sep
+        for index, block in enumerate(blocks):
+            if self.scoped is None:
+                self.scoped = is_scoped_document([block])
+            try:
+                program = compile_document([block], filename, register=False, profile=self.profiler is not None)
+            except SyntaxError as e:
+                try:
+                    program = compile_until_error([block], filename, e, register=False,
+                        profile=self.profiler is not None)
+                except SyntaxError:
+                    _report_error(Program(filename, [block], None, None), e)
 
-    def exec_code_start():
-        return _(r"[ \t]?[ \t]?[ \t]?[`~][`~][`~]python:testflows[ \t]*\n")
-    
-    def exec_code_end():
-        return (_(r"[ \t]?[ \t]?[ \t]?[`~][`~][`~][ \t]*"), [_(r"\n"), EOF])
+            self.load(program, index)
+
+            try:
+                self.exec(program)
+            except Exception as e:
+                # generated code is only needed to show the traceback
+                program.register()
+                _report_error(program, e)
 
-    def exec_code():
-        return exec_code_start, ZeroOrMore(Not(exec_code_end), line), exec_code_end
+            if program.error is not None:
+                _report_error(program, program.error)
 
-    def intro():
-        return ZeroOrMore(Not(heading), [exec_code, paragraph, line, final_line])
 
-    def section():
-        return heading, ZeroOrMore(Not(heading), [exec_code, paragraph, line, final_line])
+def _report_error(program, e):
+    """Raise error for an exception that occurred during
+    compilation or execution of the program showing
+    the text of the document where the error has occurred.
 
-    def heading():
-        return [
-            (_(r"\s*#+\s+"), heading_name, _(r"\n?")),
-            (heading_name, _(r"\n?[-=]+\n?"))
-        ]
+    :param program: program or its blocks if compilation has failed
+    :param e: exception
+    """
+    exc_tb = e.__traceback__
+    syntax_error = isinstance(e, SyntaxError)
+
+    if syntax_error:
+        tb_lineno = e.lineno
+    else:
+        # skip frames outside of the program
+        while exc_tb.tb_next is not None and exc_tb.tb_frame.f_code.co_filename != program.filename:
+            exc_tb = exc_tb.tb_next
+        tb_lineno = exc_tb.tb_lineno
 
-    def heading_name():
-        return _(r"[^\n]+")
+    numbered_lines = program.numbered_text(tb_lineno, getattr(e, "chunk", None))
 
-    def document():
-        return Optional(Optional(header), intro, ZeroOrMore(section))
+    code_exc = type(e)(str(e) + f"\n\n{'Syntax Error' if syntax_error else 'Error'} occured in the following text:\n\n"
+            + numbered_lines)
 
-    return PEGParser(document, skipws=False)
+    code_exc.with_traceback(exc_tb)
+    err(f"{e.__class__.__name__}\n" + get_exception(type(e), code_exc, code_exc.__traceback__))
 
 
-def execute(source):
+def execute(source, cache=True, engine="peg", stream=False, profiler=None, namespace=None, light=False):
     """Execute TestFlows Document (*.tfd).
 
     :param source: source file-like object
+    :param cache: use compiled documents cache, default: True
+    :param engine: parser engine either 'peg' or 'scanner', default: 'peg'
+    :param stream: read, compile and run document section by section
+        using the scanner without keeping the whole document in memory,
+        compiled documents cache is not used, default: False
+    :param profiler: profile document execution using the profiler,
+        compiled documents cache is not used, default: None
+    :param namespace: initial document namespace that is copied, default: None
+    :param light: only headings of the sections that have code blocks are run
+        as section tests and text log messages are batched, default: False
+    :return: document namespace
     """
-    parser = Parser()
+    if stream:
+        return execute_stream(source, profiler=profiler, namespace=namespace, light=light)
+
     source_data = source.read()
     
     if not source_data:
         fail(f"source file '{os.path.abspath(source.name)}' is empty")
-    
-    tree = parser.parse(source_data)
 
-    if tree is None:
-        err(f"parsing {os.path.abspath(source.name)} failed")
+    filename = os.path.abspath(source.name) if source.name != "<stdin>" else source.name
+    cache = cache and source.name != "<stdin>" and profiler is None
+
+    program = document_cache.load(filename, source_data) if cache else None
+
+    if program is None:
+        blocks = parse(source_data, engine=engine)
+
+        if blocks is None:
+            err(f"parsing {os.path.abspath(source.name)} failed")
+
+        try:
+            program = compile_document(blocks, filename, profile=profiler is not None)
+        except SyntaxError as e:
+            # text and code before the error are still run
+            try:
+                program = compile_until_error(blocks, filename, e, profile=profiler is not None)
+            except SyntaxError:
+                _report_error(Program(filename, blocks, None, None), e)
+        else:
+            if cache:
+                document_cache.dump(program, source_data)
 
-    with TestStack() as stack:
-        visit_parse_tree(tree, Visitor(stack, source_data))
+    return run_program(program, profiler=profiler, namespace=namespace, light=light)
+
+
+def execute_stream(source, profiler=None, namespace=None, light=False):
+    """Execute TestFlows Document (*.tfd) section by section
+    as it is being read.
+
+    :param source: source file-like object
+    :param profiler: optional profiler
+    :param namespace: initial document namespace that is copied, default: None
+    :param light: only headings of the sections that have code blocks are run
+        as section tests and text log messages are batched, default: False
+    :return: document namespace
+    """
+    filename = os.path.abspath(source.name) if source.name != "<stdin>" else source.name
+    blocks = scan_stream(source)
+
+    first_block = next(blocks, None)
+    if first_block is None:
+        fail(f"source file '{os.path.abspath(source.name)}' is empty")
+
+    runner = None
+    if profiler is not None:
+        profiler.start()
+    try:
+        with TestStack() as stack, EventLoop() as loop:
+            runner = Runner(stack, None, profiler=profiler, loop=loop, namespace=namespace, light=light)
+            runner.stream(itertools.chain([first_block], blocks), filename)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+        if runner is not None:
+            runner.batch.flush()
+            metric("document blocks", runner.blocks, "blocks")
+
+    return runner.locals
+
+
+def run_program(program, snapshot=None, profiler=None, namespace=None, light=False):
+    """Run compiled document program.
+
+    :param program: compiled program
+    :param snapshot: optional section snapshot callback
+    :param profiler: optional profiler
+    :param namespace: initial document namespace that is copied, default: None
+    :param light: only headings of the sections that have code blocks are run
+        as section tests and text log messages are batched, default: False
+    :return: document namespace
+    """
+    runner = None
+    if profiler is not None:
+        profiler.start()
+    try:
+        with TestStack() as stack, EventLoop() as loop:
+            runner = Runner(stack, program, snapshot=snapshot, profiler=profiler, loop=loop,
+                namespace=namespace, light=light)
+            runner.run()
+            if program.error is not None:
+                _report_error(program, program.error)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+        if runner is not None:
+            runner.batch.flush()
+            metric("document blocks", runner.blocks, "blocks")
+
+    return runner.locals
@@ -0,0 +1,197 @@
+# Copyright 2021 Katteli Inc.
+# TestFlows.com Open-Source Software Testing Framework (http://testflows.com)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import sys
+import pickle
+import signal
+import socket
+import struct
+import threading
+import traceback
+
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.reduction import sendfds, recvfds
+
+header = struct.Struct("!Q")
+
+
+def send(sock, obj):
+    """Send pickled object over the socket.
+    """
+    data = pickle.dumps(obj)
+    sock.sendall(header.pack(len(data)) + data)
+
+
+def receive(sock):
+    """Receive pickled object from the socket
+    or return None if the socket was closed.
+    """
+    data = b""
+    while len(data) < header.size:
+        chunk = sock.recv(header.size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    size, = header.unpack(data)
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(min(size - len(data), 1 << 20))
+        if not chunk:
+            raise EOFError("connection closed while receiving data")
+        data += chunk
+    return pickle.loads(data)
+
+
+class ForkServer:
+    """Server process that forks a new worker process for each job.
+
+    The server is forked from the current process when it is started
+    and therefore each worker starts from the state the current process had
+    at that moment. Start the server before any tests or threads are started
+    so that each worker can run its own top level test.
+
+    :param max_workers: maximum number of concurrently running workers
+    :param initializer: optional callable to run in the server process before
+        serving any jobs, its state is inherited by each worker
+    :param initargs: initializer arguments
+    """
+    def __init__(self, max_workers, initializer=None, initargs=()):
+        self.max_workers = max_workers
+        self.initializer = initializer
+        self.initargs = initargs
+        self.pid = None
+        self.sock = None
+        self.lock = threading.Lock()
+        self.executor = None
+
+    def start(self):
+        """Start server process.
+        """
+        parent_sock, server_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+        pid = os.fork()
+
+        if pid == 0:
+            code = 0
+            try:
+                parent_sock.close()
+                self.serve(server_sock)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+
+        server_sock.close()
+        self.pid = pid
+        self.sock = parent_sock
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self
+
+    def serve(self, sock):
+        """Serve jobs in the server process.
+        """
+        if self.initializer is not None:
+            self.initializer(*self.initargs)
+
+        # workers are reaped automatically
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+        while True:
+            try:
+                result_fd, = recvfds(sock, 1)
+            except (EOFError, OSError):
+                return
+
+            job = receive(sock)
+
+            if os.fork() == 0:
+                sock.close()
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                self.work(result_fd, job)
+
+            os.close(result_fd)
+
+    def work(self, result_fd, job):
+        """Run job in the worker process and send back the result.
+        """
+        code = 0
+        try:
+            with socket.socket(fileno=result_fd) as result_sock:
+                fn, args, kwargs = job
+                try:
+                    result = (True, fn(*args, **kwargs))
+                except BaseException as exc:
+                    result = (False, exc)
+                try:
+                    send(result_sock, result)
+                except Exception as exc:
+                    send(result_sock, (False, RuntimeError(f"failed to send job result {result[1]!r}: {exc}")))
+        except BaseException:
+            code = 1
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(code)
+
+    def run(self, fn, args, kwargs):
+        """Run job in a new worker process and wait for its result.
+        """
+        parent_sock, worker_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        with parent_sock:
+            with worker_sock:
+                with self.lock:
+                    sendfds(self.sock, [worker_sock.fileno()])
+                    send(self.sock, (fn, args, kwargs))
+
+            result = receive(parent_sock)
+
+        if result is None:
+            raise RuntimeError("worker process exited unexpectedly")
+
+        success, value = result
+        if not success:
+            raise value
+
+        return value
+
+    def submit(self, fn, *args, **kwargs):
+        """Submit job and return future for its result.
+        """
+        return self.executor.submit(self.run, fn, args, kwargs)
+
+    def shutdown(self):
+        """Shutdown server and wait for all submitted jobs to complete.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+            os.waitpid(self.pid, 0)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.shutdown()
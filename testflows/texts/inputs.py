@@ -0,0 +1,148 @@
+# Copyright 2021 Katteli Inc.
+# TestFlows.com Open-Source Software Testing Framework (http://testflows.com)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import re
+import sys
+import glob
+
+from fnmatch import fnmatch
+from contextlib import nullcontext
+
+#: file name patterns of the documents found inside the input directories
+default_include = ("*.tfd",)
+
+#: glob pattern special characters
+magic_re = re.compile(r"[*?[]")
+
+
+def matches(path, name, patterns):
+    """Return True if the file matches any of the patterns.
+    Patterns that contain '/' are matched against the path and
+    all other patterns against the file name.
+
+    :param path: file path relative to the input directory
+    :param name: file name
+    :param patterns: file name patterns
+    """
+    for pattern in patterns:
+        if fnmatch(path if "/" in pattern else name, pattern):
+            return True
+    return False
+
+
+def walk(directory, include=default_include, exclude=()):
+    """Return iterator over the paths of the files inside the directory
+    and all of its subdirectories that match any of the include patterns
+    and none of the exclude patterns. Directories that match the exclude
+    patterns are skipped. Symbolic links to directories are not followed.
+
+    :param directory: directory
+    :param include: file name patterns of the files, default: `default_include`
+    :param exclude: file and directory name patterns to skip, default: ()
+    """
+    directories = [(directory, "")]
+    while directories:
+        path, relative_path = directories.pop()
+        with os.scandir(path) as entries:
+            for entry in entries:
+                relative_entry = relative_path + entry.name
+                if exclude and matches(relative_entry, entry.name, exclude):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append((entry.path, relative_entry + "/"))
+                elif matches(relative_entry, entry.name, include):
+                    yield entry.path
+
+
+def is_multiple(input):
+    """Return True if the input is a directory or a glob pattern
+    that can match any number of files.
+
+    :param input: input
+    """
+    if input == "-":
+        return False
+    return os.path.isdir(input) or (not os.path.exists(input) and magic_re.search(input) is not None)
+
+
+def common_directory(paths):
+    """Return the common directory of the input file paths
+    that is the directory of the file if there is only one.
+
+    :param paths: input file paths
+    """
+    if len(paths) == 1:
+        return os.path.dirname(paths[0])
+    return os.path.commonpath(paths)
+
+
+def expand(inputs, include=None, exclude=None):
+    """Return list of the input file paths for the inputs
+    that can be files, directories, glob patterns or '-' for stdin.
+    Directories, including the ones matched by the glob patterns, are searched
+    recursively for the files that match the include patterns while
+    files matched by the glob patterns are only checked against the exclude patterns.
+    Paths are in the order of the inputs and the files found for each
+    directory or glob pattern are sorted. Files are not opened.
+
+    :param inputs: inputs
+    :param include: file name patterns of the files inside the directories,
+        default: `default_include`
+    :param exclude: file and directory name patterns to skip, default: None
+    """
+    include = include or default_include
+    exclude = exclude or ()
+    paths = {}
+
+    def add(path):
+        paths.setdefault(os.path.normpath(path), path)
+
+    for input in inputs:
+        if input == "-":
+            paths["-"] = input
+        elif os.path.isdir(input):
+            for path in sorted(walk(input, include, exclude)):
+                add(path)
+        elif os.path.exists(input):
+            add(input)
+        elif magic_re.search(input):
+            found = []
+            for path in glob.glob(input, recursive=True):
+                if os.path.isdir(path):
+                    found.extend(walk(path, include, exclude))
+                elif not matches(path, os.path.basename(path), exclude):
+                    found.append(path)
+            if not found:
+                raise ValueError(f"no input files match '{input}'")
+            for path in sorted(found):
+                add(path)
+        else:
+            raise ValueError(f"input file '{input}' does not exist")
+
+    if not paths:
+        raise ValueError("no input files found")
+
+    return list(paths.values())
+
+
+def open_input(path):
+    """Return context manager of the input file opened for reading
+    where '-' is stdin which is not closed.
+
+    :param path: input file path
+    """
+    if path == "-":
+        return nullcontext(sys.stdin)
+    return open(path, "r", encoding="utf-8")
@@ -0,0 +1,250 @@
+# Copyright 2021 Katteli Inc.
+# TestFlows.com Open-Source Software Testing Framework (http://testflows.com)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import sys
+import json
+import types
+import hashlib
+import builtins
+import sysconfig
+import threading
+import importlib.util
+
+from contextlib import contextmanager
+
+from testflows.texts import __version__
+from testflows.texts.writer import atomic_write
+
+#: paths of the standard library and installed packages
+system_paths = tuple(sorted({os.path.join(os.path.realpath(path), "")
+    for name, path in sysconfig.get_paths().items()
+    if name in ("stdlib", "platstdlib", "purelib", "platlib")}))
+
+
+def file_hash(path):
+    """Return hash of the file content or None
+    if file does not exist.
+
+    :param path: file path
+    """
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as fd:
+            for chunk in iter(lambda: fd.read(1 << 20), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def local_file(module):
+    """Return real path of the source file of the module
+    or None if the module is not local.
+
+    :param module: module
+    """
+    filename = getattr(module, "__file__", None)
+    if not filename or module.__name__.split(".", 1)[0] == "testflows":
+        return None
+
+    filename = os.path.realpath(filename)
+    if filename.startswith(system_paths):
+        return None
+
+    return filename
+
+
+#: names of the modules imported by each module while the imports were recorded
+module_imports = {}
+#: sets of the names of the imported modules of the active recorders
+recorders = []
+recorders_lock = threading.Lock()
+#: original `__import__` function replaced while the imports are recorded
+original_import = None
+
+
+def imported_names(name, globals, fromlist, level):
+    """Return absolute names of the modules imported by the import statement.
+    """
+    if level:
+        globals = globals or {}
+        package = globals.get("__package__") or globals.get("__name__", "").rpartition(".")[0]
+        name = importlib.util.resolve_name("." * level + name, package)
+    # importing a submodule imports its parent packages
+    parts = name.split(".")
+    names = [".".join(parts[:i]) for i in range(1, len(parts) + 1)]
+    # `from package import module` imports submodules
+    for item in fromlist or ():
+        if f"{name}.{item}" in sys.modules:
+            names.append(f"{name}.{item}")
+    return names
+
+
+def recording_import(name, globals=None, locals=None, fromlist=(), level=0):
+    """Import function that records the names of the imported modules.
+    """
+    module = original_import(name, globals, locals, fromlist, level)
+    try:
+        names = imported_names(name, globals, fromlist, level)
+    except Exception:
+        return module
+    importer = (globals or {}).get("__name__")
+    module_imports.setdefault(importer, set()).update(names)
+    for imported in list(recorders):
+        imported.update(names)
+    return module
+
+
+@contextmanager
+def recorded_imports():
+    """Record modules imported inside the context
+    and return set of their names.
+
+    Imports are recorded even if the modules were imported before
+    so that the values imported from the local modules
+    such as `from helper import value` are not missed.
+    """
+    global original_import
+
+    imported = set()
+    with recorders_lock:
+        if not recorders:
+            original_import = builtins.__import__
+            builtins.__import__ = recording_import
+        recorders.append(imported)
+    try:
+        yield imported
+    finally:
+        with recorders_lock:
+            recorders[:] = [recorder for recorder in recorders if recorder is not imported]
+            if not recorders:
+                builtins.__import__ = original_import
+
+
+def local_modules(namespace, imported=()):
+    """Return sorted list of source files of the local modules
+    used by the namespace or imported by the document
+    including modules that they use in turn.
+    Standard library, installed packages and `testflows`
+    modules are not considered local.
+
+    :param namespace: document namespace
+    :param imported: names of the modules imported by the document, default: ()
+    """
+    files = set()
+    seen = set()
+    values = list(namespace.values()) + [sys.modules.get(name) for name in imported]
+
+    while values:
+        value = values.pop()
+        if isinstance(value, types.ModuleType):
+            module = value
+        else:
+            try:
+                module = sys.modules.get(getattr(value, "__module__", None))
+            except Exception:
+                continue
+
+        if module is None or id(module) in seen:
+            continue
+        seen.add(id(module))
+
+        filename = local_file(module)
+        if filename is None:
+            continue
+
+        files.add(filename)
+        values.extend(list(vars(module).values()))
+        values.extend(sys.modules.get(name) for name in module_imports.get(module.__name__, ()))
+
+    return sorted(files)
+
+
+class Manifest:
+    """Build manifest that records for each document the hashes
+    of its source, local modules that it uses, files that it depends on
+    and the output that it has produced.
+
+    :param path: manifest file path
+    """
+    def __init__(self, path):
+        self.path = path
+        self.documents = {}
+
+        try:
+            with open(path, "r", encoding="utf-8") as fd:
+                data = json.load(fd)
+            if data.get("version") == __version__:
+                self.documents = data["documents"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+
+    @staticmethod
+    def key(input, output):
+        return f"{os.path.abspath(input)} -> {os.path.abspath(output)}"
+
+    def unchanged(self, input, output, argv):
+        """Return True if document was run before with the same arguments
+        and none of its inputs nor its output have changed since then.
+
+        :param input: input file path
+        :param output: output file path
+        :param argv: writer program arguments
+        """
+        entry = self.documents.get(self.key(input, output))
+
+        if entry is None or entry["argv"] != argv:
+            return False
+
+        if file_hash(input) != entry["source"] or file_hash(output) != entry["output"]:
+            return False
+
+        for files in (entry["modules"], entry["depends"]):
+            for path, digest in files.items():
+                if file_hash(path) != digest:
+                    return False
+
+        return True
+
+    def discard(self, input, output):
+        """Discard document record.
+        """
+        self.documents.pop(self.key(input, output), None)
+
+    def record(self, input, output, argv, modules, depends):
+        """Record document that has been successfully run.
+
+        :param input: input file path
+        :param output: output file path
+        :param argv: writer program arguments
+        :param modules: local modules used by the document
+        :param depends: files that document depends on
+        """
+        self.documents[self.key(input, output)] = {
+            "source": file_hash(input),
+            "output": file_hash(output),
+            "argv": argv,
+            "modules": {path: file_hash(path) for path in modules},
+            "depends": {os.path.abspath(path): file_hash(path) for path in depends},
+        }
+
+    def save(self):
+        """Atomically save manifest.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        with atomic_write(self.path, encoding="utf-8") as temp_file:
+            json.dump({"version": __version__, "documents": self.documents}, temp_file, indent=2, sort_keys=True)
@@ -0,0 +1,339 @@
+# Copyright 2021 Katteli Inc.
+# TestFlows.com Open-Source Software Testing Framework (http://testflows.com)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import sys
+import time
+import types
+import pickle
+import hashlib
+import functools
+import threading
+
+from testflows._core.funcs import current
+
+from .core import depends
+from .manifest import file_hash, local_file
+from .writer import atomic_write
+
+#: cache entry file suffix
+suffix = ".tfsmemo"
+
+
+def code_hash(code, digest):
+    """Update digest with the hash of the code object
+    that does not depend on its file name or line numbers.
+
+    :param code: code object
+    :param digest: hashlib digest
+    """
+    digest.update(code.co_code)
+    digest.update(repr((code.co_names, code.co_varnames, code.co_freevars)).encode("utf-8"))
+    for const in code.co_consts:
+        digest.update(const_hash(const))
+
+
+def const_hash(const):
+    """Return hash of the code object constant that
+    does not depend on the hash seed of the process.
+
+    The order of the elements of a frozenset depends on the hash seed
+    and therefore the elements are sorted by their own hash.
+
+    :param const: constant
+    """
+    digest = hashlib.sha256(type(const).__name__.encode("utf-8"))
+    if isinstance(const, types.CodeType):
+        code_hash(const, digest)
+    elif isinstance(const, tuple):
+        for item in const:
+            digest.update(const_hash(item))
+    elif isinstance(const, frozenset):
+        for item in sorted(const_hash(item) for item in const):
+            digest.update(item)
+    else:
+        digest.update(repr(const).encode("utf-8"))
+    return digest.digest()
+
+
+def value_hash(value):
+    """Return hash of the argument value that does not
+    depend on the hash seed of the process.
+
+    The elements of sets are sorted by their own hash.
+    Values other than the built-in containers and scalars are pickled.
+
+    :param value: value
+    """
+    value_type = type(value)
+    digest = hashlib.sha256(f"{value_type.__module__}.{value_type.__qualname__}".encode("utf-8"))
+    if value_type in (tuple, list):
+        for item in value:
+            digest.update(value_hash(item))
+    elif value_type in (set, frozenset):
+        for item in sorted(value_hash(item) for item in value):
+            digest.update(item)
+    elif value_type is dict:
+        for key, item in value.items():
+            digest.update(value_hash(key))
+            digest.update(value_hash(item))
+    elif value is None or value_type in (bool, int, float, complex, str, bytes):
+        digest.update(repr(value).encode("utf-8"))
+    else:
+        digest.update(pickle.dumps(value, protocol=4))
+    return digest.digest()
+
+
+def global_names(code):
+    """Return names that the code object and the code objects
+    nested inside it may look up in the globals.
+
+    :param code: code object
+    """
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names.update(global_names(const))
+    return names
+
+
+def function_hash(func, digest, seen=None):
+    """Update digest with the hash of the code of the function,
+    the values of its closure variables and the values of the globals
+    that it references. Functions of the local modules that it
+    references are hashed the same way while modules, classes
+    and the other functions are hashed by their name. Values that
+    can't be pickled are hashed by their type.
+
+    :param func: function
+    :param digest: hashlib digest
+    :param seen: ids of the functions that were already hashed, default: None
+    """
+    seen = set() if seen is None else seen
+    seen.add(id(func))
+    code_hash(func.__code__, digest)
+
+    def reference_hash(value):
+        if isinstance(value, types.FunctionType):
+            digest.update(f"{value.__module__}.{value.__qualname__}".encode("utf-8"))
+            if id(value) not in seen and local_file(sys.modules.get(value.__module__)) is not None:
+                function_hash(value, digest, seen)
+        elif isinstance(value, types.ModuleType):
+            digest.update(value.__name__.encode("utf-8"))
+        elif isinstance(value, (type, types.BuiltinFunctionType)):
+            digest.update(f"{value.__module__}.{value.__qualname__}".encode("utf-8"))
+        else:
+            try:
+                digest.update(value_hash(value))
+            except (pickle.PicklingError, TypeError, AttributeError, RecursionError):
+                digest.update(f"{type(value).__module__}.{type(value).__qualname__}".encode("utf-8"))
+
+    for cell in func.__closure__ or ():
+        try:
+            reference_hash(cell.cell_contents)
+        except ValueError:
+            # closure variable is not assigned yet
+            digest.update(b"empty cell")
+
+    for name in sorted(global_names(func.__code__)):
+        if name in func.__globals__:
+            digest.update(name.encode("utf-8"))
+            reference_hash(func.__globals__[name])
+
+
+class MemoCache:
+    """On disk cache of the results of the functions
+    decorated with `cached` with least recently used entries
+    evicted once the total size of the cache exceeds the maximum size.
+
+    :param directory: cache directory
+    :param max_size: maximum total size of the cache in bytes, default: 1 GiB
+    :param enabled: use cached results, when disabled results are always
+        computed and the cache is refreshed, default: True
+    """
+    def __init__(self, directory, max_size=1 << 30, enabled=True):
+        self.directory = directory
+        self.max_size = max_size
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        #: number of results returned from the cache
+        self.hits = 0
+        #: number of results that were computed
+        self.misses = 0
+
+    def path(self, key):
+        return os.path.join(self.directory, key + suffix)
+
+    def load(self, key, ttl=None):
+        """Return (True, value) if the cache has a fresh entry
+        for the key or (False, None) otherwise.
+
+        :param key: entry key
+        :param ttl: maximum age of the entry in seconds, default: None
+        """
+        if not self.enabled:
+            return False, None
+
+        path = self.path(key)
+        try:
+            with open(path, "rb") as fd:
+                created, value = pickle.load(fd)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, ValueError):
+            return False, None
+
+        if ttl is not None and time.time() - created > ttl:
+            return False, None
+
+        try:
+            # modification time is the last time the entry was used
+            os.utime(path)
+        except OSError:
+            pass
+
+        return True, value
+
+    def store(self, key, value):
+        """Atomically write entry and evict least recently used
+        entries if the cache is over its maximum size. Values
+        that can't be pickled are not stored.
+
+        :param key: entry key
+        :param value: value
+        """
+        try:
+            data = pickle.dumps((time.time(), value), protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        with atomic_write(self.path(key), "wb") as temp_file:
+            temp_file.write(data)
+
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the total
+        size of the cache is not over the maximum size.
+        """
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(suffix):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total -= size
+
+    def key(self, func, args, kwargs, inputs):
+        """Return entry key for the function call.
+
+        :param func: function
+        :param args: positional arguments
+        :param kwargs: keyword arguments
+        :param inputs: input file paths
+        """
+        digest = hashlib.sha256()
+        digest.update(repr((sys.version_info[:2], func.__qualname__)).encode("utf-8"))
+        function_hash(func, digest)
+        try:
+            digest.update(value_hash((func.__defaults__, func.__kwdefaults__, args, sorted(kwargs.items()))))
+        except (pickle.PicklingError, TypeError, AttributeError, RecursionError) as e:
+            raise TypeError(f"arguments of '{func.__qualname__}' can't be used as the cache key: {e}") from None
+        for path in inputs:
+            digest.update(repr((path, file_hash(path))).encode("utf-8"))
+        return digest.hexdigest()
+
+    def call(self, func, args, kwargs, inputs=(), ttl=None):
+        """Return cached result of the function call or call
+        the function and cache its result.
+
+        :param func: function
+        :param args: positional arguments
+        :param kwargs: keyword arguments
+        :param inputs: input file paths, default: ()
+        :param ttl: maximum age of the cached result in seconds, default: None
+        """
+        key = self.key(func, args, kwargs, inputs)
+
+        found, value = self.load(key, ttl)
+        if found:
+            with self.lock:
+                self.hits += 1
+            return value
+
+        value = func(*args, **kwargs)
+        with self.lock:
+            self.misses += 1
+        self.store(key, value)
+        return value
+
+    def stats(self, reset=False):
+        """Return cache statistics.
+
+        :param reset: reset counters, default: False
+        """
+        with self.lock:
+            stats = {"hits": self.hits, "misses": self.misses}
+            if reset:
+                self.hits = self.misses = 0
+            return stats
+
+
+def cached(func=None, ttl=None, inputs=()):
+    """Memoize results of the function on disk using
+    the cache of the document. Results are keyed by the code of the function,
+    the values of its closure variables and of the globals that it references,
+    its arguments and the content of the input files. Functions of the local
+    modules that it calls are keyed the same way while the other functions,
+    classes and modules are keyed by their name only. If the document
+    does not have a cache then the function is always called.
+
+    Input files are also declared as the files that the document
+    depends on, see `depends()`.
+
+    For example:
+        @cached(ttl=3600, inputs=["examples/hello.c"])
+        def build(name):
+            ...
+
+    :param func: function
+    :param ttl: maximum age of the cached result in seconds, default: None
+    :param inputs: input file paths, default: ()
+    """
+    if func is None:
+        return functools.partial(cached, ttl=ttl, inputs=inputs)
+
+    inputs = [os.path.abspath(path) for path in inputs]
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        depends(*inputs)
+        memo_cache = getattr(current().context, "memo_cache", None)
+        if memo_cache is None:
+            return func(*args, **kwargs)
+        return memo_cache.call(func, args, kwargs, inputs=inputs, ttl=ttl)
+
+    return wrapper
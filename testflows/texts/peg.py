@@ -0,0 +1,100 @@
+# Copyright 2021 Katteli Inc.
+# TestFlows.com Open-Source Software Testing Framework (http://testflows.com)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from testflows._core.contrib.arpeggio import RegExMatch as _
+from testflows._core.contrib.arpeggio import OneOrMore, ZeroOrMore, EOF, Optional, Not
+from testflows._core.contrib.arpeggio import ParserPython as PEGParser
+from testflows._core.contrib.arpeggio import PTNodeVisitor, visit_parse_tree
+
+from testflows.texts.compiler import Chunk, Block
+
+
+class Visitor(PTNodeVisitor):
+    """Parse tree visitor that collects document blocks.
+    """
+    def __init__(self, source_data, *args, **kwargs):
+        self.source_data = source_data
+        self.blocks = []
+        self.lineno = 1
+        self.position = 0
+        super(Visitor, self).__init__(*args, **kwargs)
+
+    def chunks(self, node):
+        chunks = []
+        for child in node:
+            self.lineno += self.source_data.count("\n", self.position, child.position)
+            self.position = child.position
+            chunks.append(Chunk(child.rule_name, self.lineno, child.flat_str()))
+        return chunks
+
+    def visit_header(self, node, children):
+        self.blocks.append(Block(0, None, self.chunks(node)))
+
+    def visit_intro(self, node, children):
+        self.blocks.append(Block(0, None, self.chunks(node)))
+
+    def visit_section(self, node, children):
+        self.blocks.append(Block(node[0].value.count("#"),
+            node.heading.heading_name.value.strip(), self.chunks(node)))
+
+
+def Parser():
+    """TestFlows executable document parser.
+    """
+    def line():
+        return _(r"[^\n]*\n")
+    
+    def non_empty_line():
+        return _(r"[^\n]+\n")
+
+    def final_line():
+        return _(r"[^\n]+"), EOF
+
+    def paragraph():
+        return OneOrMore(Not(exec_code_start), [non_empty_line, final_line])
+
+    def header_sep():
+        return _(r"---[ \t]*\n")
+
+    def header():
+        return header_sep, ZeroOrMore(Not(header_sep), line), header_sep
+
+    def exec_code_start():
+        return _(r"[ \t]?[ \t]?[ \t]?[`~][`~][`~]python:testflows[ \t]*\n")
+    
+    def exec_code_end():
+        return (_(r"[ \t]?[ \t]?[ \t]?[`~][`~][`~][ \t]*"), [_(r"\n"), EOF])
+
+    def exec_code():
+        return exec_code_start, ZeroOrMore(Not(exec_code_end), line), exec_code_end
+
+    def intro():
+        return ZeroOrMore(Not(heading), [exec_code, paragraph, line, final_line])
+
+    def section():
+        return heading, ZeroOrMore(Not(heading), [exec_code, paragraph, line, final_line])
+
+    def heading():
+        return [
+            (_(r"\s*#+\s+"), heading_name, _(r"\n?")),
+            (heading_name, _(r"\n?[-=]+\n?"))
+        ]
+
+    def heading_name():
+        return _(r"[^\n]+")
+
+    def document():
+        return Optional(Optional(header), intro, ZeroOrMore(section))
+
+    return PEGParser(document, skipws=False)
@@ -0,0 +1,108 @@
+# Copyright 2021 Katteli Inc.
+# TestFlows.com Open-Source Software Testing Framework (http://testflows.com)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+
+from . import executable
+from .compiler import chunk_source
+
+#: preludes that were run in this process by their path, inherited
+#: by the worker processes forked after the preludes were run
+preludes = {}
+
+
+class Prelude:
+    """Prelude that is run once for a batch of documents
+    with its namespace used as the initial namespace of each document.
+
+    The prelude is either a Python file or an executable document
+    of which only the `python:testflows` code blocks are run. It is run before
+    any document is started outside of any test and therefore it can't add any text.
+    Functions registered using `cleanup()` inside the prelude are called
+    once when the batch ends in the reverse order.
+
+    :param path: prelude file path
+    :param engine: parser engine used for documents, default: 'peg'
+    """
+    def __init__(self, path, engine="peg"):
+        self.path = os.path.abspath(path)
+        self.engine = engine
+        self.namespace = {}
+        self.cleanups = []
+
+    def code(self):
+        """Return list of code objects of the prelude.
+        """
+        with open(self.path, "r", encoding="utf-8") as fd:
+            source_data = fd.read()
+
+        if not self.path.endswith(".tfd"):
+            return [compile(source_data, self.path, "exec")]
+
+        blocks = executable.parse(source_data, engine=self.engine)
+        if blocks is None:
+            raise ValueError(f"parsing {self.path} failed")
+
+        return [compile(chunk_source(block, chunk), self.path, "exec")
+            for block in blocks for chunk in block.chunks if chunk.rule_name == "exec_code"]
+
+    def cleanup(self, func, *args, **kwargs):
+        """Register function to be called when the batch ends.
+
+        :param func: function
+        :param args: positional arguments
+        :param kwargs: keyword arguments
+        """
+        self.cleanups.append((func, args, kwargs))
+
+    def run(self):
+        """Run prelude.
+        """
+        # documents are run with the executable module globals
+        # and therefore so is the prelude
+        self.namespace["cleanup"] = self.cleanup
+        try:
+            for code in self.code():
+                exec(code, vars(executable), self.namespace)
+        finally:
+            if self.namespace.get("cleanup") == self.cleanup:
+                del self.namespace["cleanup"]
+        preludes[self.path] = self
+        return self
+
+    def close(self):
+        """Call cleanup functions in the reverse order
+        raising the first exception if any of them fails.
+        """
+        preludes.pop(self.path, None)
+        exception = None
+        while self.cleanups:
+            func, args, kwargs = self.cleanups.pop()
+            try:
+                func(*args, **kwargs)
+            except BaseException as e:
+                if exception is None:
+                    exception = e
+        if exception is not None:
+            raise exception
+
+    def __enter__(self):
+        try:
+            return self.run()
+        except BaseException:
+            self.close()
+            raise
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.close()
@@ -0,0 +1,215 @@
+# Copyright 2021 Katteli Inc.
+# TestFlows.com Open-Source Software Testing Framework (http://testflows.com)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import json
+import time
+import pstats
+import cProfile
+import tracemalloc
+
+from .writer import atomic_write
+
+#: profile file format version
+version = 1
+
+#: chunk kinds by the rule name
+kinds = {
+    "exec_code": "code",
+    "heading": "heading",
+    "header_sep": "header",
+}
+
+
+def format_size(size):
+    """Return human readable size.
+    """
+    for units in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.0f}{units}" if units == "B" else f"{size:.1f}{units}"
+        size /= 1024
+    return f"{size:.1f}GiB"
+
+
+def functions(profile, count=10):
+    """Return top functions of the profile by cumulative time.
+
+    :param profile: `cProfile.Profile`
+    :param count: number of functions, default: 10
+    """
+    stats = pstats.Stats(profile)
+    entries = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:count]
+    return [
+        {
+            "function": f"{filename}:{lineno}({name})",
+            "calls": calls,
+            "tottime": tottime,
+            "cumtime": cumtime,
+        }
+        for (filename, lineno, name), (calls, primitive_calls, tottime, cumtime, callers) in entries
+    ]
+
+
+class Profiler:
+    """Document profiler that records wall time, CPU time
+    and memory allocations of each executed chunk and section.
+
+    The generated code calls the `chunk` hook at the start of each chunk
+    and each measurement covers everything executed until the next chunk starts.
+    Memory allocations are traced using `tracemalloc`.
+
+    :param filename: source document file name
+    :param cprofile: profile each `python:testflows` code block
+        using `cProfile`, default: False
+    """
+    def __init__(self, filename, cprofile=False):
+        self.filename = filename
+        self.cprofile = cprofile
+        self.chunks = {}
+        self.sections = {}
+        self.chunk_sections = {}
+        self.current = None
+        self.started = None
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.tracemalloc = False
+
+    def load(self, program):
+        """Load chunks and sections of the program.
+
+        :param program: compiled program
+        """
+        for block in program.blocks:
+            section_lineno = block.chunks[0].lineno
+            self.sections.setdefault(section_lineno, {
+                "lineno": section_lineno, "level": block.level, "name": block.name,
+                "wall": 0.0, "cpu": 0.0, "allocated": 0, "peak": 0
+            })
+            for chunk in block.chunks:
+                self.chunk_sections[chunk.lineno] = section_lineno
+                self.chunks.setdefault(chunk.lineno, {
+                    "lineno": chunk.lineno, "kind": kinds.get(chunk.rule_name, "text"),
+                    "lines": chunk.text.count("\n") or 1, "section": block.name,
+                    "executed": False, "wall": 0.0, "cpu": 0.0, "allocated": 0, "peak": 0
+                })
+
+    def start(self):
+        """Start profiling.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.tracemalloc = True
+        self.started = (time.perf_counter(), time.process_time())
+
+    def measure(self):
+        return time.perf_counter(), time.process_time(), tracemalloc.get_traced_memory()
+
+    def chunk(self, lineno):
+        """Chunk hook that is called by the program at the start of each chunk.
+
+        :param lineno: line number of the chunk
+        """
+        self.end_chunk()
+
+        profile = None
+        if self.cprofile and self.chunks[lineno]["kind"] == "code":
+            profile = cProfile.Profile()
+
+        tracemalloc.reset_peak()
+        self.current = (lineno, self.measure(), profile)
+
+        if profile is not None:
+            profile.enable()
+
+    def end_chunk(self):
+        """Record measurements of the current chunk.
+        """
+        if self.current is None:
+            return
+
+        lineno, (wall, cpu, (memory, _)), profile = self.current
+        if profile is not None:
+            profile.disable()
+
+        end_wall, end_cpu, (end_memory, peak) = self.measure()
+        self.current = None
+
+        record = self.chunks[lineno]
+        record["executed"] = True
+        record["wall"] += end_wall - wall
+        record["cpu"] += end_cpu - cpu
+        record["allocated"] += end_memory - memory
+        record["peak"] = max(record["peak"], peak - memory)
+        if profile is not None:
+            record["functions"] = functions(profile)
+
+        section = self.sections[self.chunk_sections[lineno]]
+        section["wall"] += end_wall - wall
+        section["cpu"] += end_cpu - cpu
+        section["allocated"] += end_memory - memory
+        section["peak"] = max(section["peak"], peak - memory)
+
+    def stop(self):
+        """Stop profiling.
+        """
+        self.end_chunk()
+        if self.started is not None:
+            wall, cpu = self.started
+            self.wall += time.perf_counter() - wall
+            self.cpu += time.process_time() - cpu
+            self.started = None
+        if self.tracemalloc:
+            tracemalloc.stop()
+            self.tracemalloc = False
+
+    def data(self):
+        """Return profile data.
+        """
+        return {
+            "version": version,
+            "filename": self.filename,
+            "wall": self.wall,
+            "cpu": self.cpu,
+            "chunks": [chunk for lineno, chunk in sorted(self.chunks.items()) if chunk["executed"]],
+            "sections": [section for lineno, section in sorted(self.sections.items())],
+        }
+
+    def dump(self, path):
+        """Atomically write profile data into a JSON file.
+
+        :param path: profile file path
+        """
+        with atomic_write(path, encoding="utf-8") as temp_file:
+            json.dump(self.data(), temp_file, indent=2)
+
+    def report(self, top=10):
+        """Return report of the slowest chunks.
+
+        :param top: number of chunks, default: 10
+        """
+        chunks = sorted((chunk for chunk in self.chunks.values() if chunk["executed"]),
+            key=lambda chunk: chunk["wall"], reverse=True)[:top]
+
+        lines = [
+            f"top {len(chunks)} slowest blocks (total wall {self.wall:.3f}s, cpu {self.cpu:.3f}s)",
+            f"{'wall':>9} {'cpu':>9} {'alloc':>9} {'peak':>9}  {'kind':<7} location",
+        ]
+        for chunk in chunks:
+            location = f"{self.filename}:{chunk['lineno']}"
+            if chunk["section"] is not None:
+                location += f" ({chunk['section']})"
+            lines.append(f"{chunk['wall']:>8.3f}s {chunk['cpu']:>8.3f}s {format_size(chunk['allocated']):>9}"
+                f" {format_size(chunk['peak']):>9}  {chunk['kind']:<7} {location}")
+
+        return "\n".join(lines)
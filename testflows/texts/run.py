@@ -14,23 +14,263 @@
 # limitations under the License.
 import os
 import sys
+import time
+import tempfile
 import testflows._core.cli.arg.type as argtype
 
 from textwrap import dedent
+from contextlib import nullcontext, contextmanager
 
 from testflows._core.cli.arg.common import epilog
 from testflows._core.cli.arg.common import HelpFormatter
 from testflows._core.cli.arg.handlers.handler import Handler as HandlerBase
-from testflows._core.funcs import current
-from testflows._core.test import NullStep
 
-from .core import Document, Module, err
-from .executable import execute
+from .serve import Handler as serve_handler
+from .compare import Handler as compare_handler
+
+# this module is imported by every `tfs` command to add the `document run` command
+# and therefore the modules needed to run documents are only imported when they are used
+
+
+def close_output(output):
+    """Close document output file and report the size
+    of the output and the number of times it was flushed.
+
+    :param output: document writer or standard output
+    """
+    from .core import metric, note
+    from .writer import DocumentWriter
+
+    if not isinstance(output, DocumentWriter):
+        output.flush()
+        return
+
+    output.close()
+    metric("output bytes", output.bytes, "bytes")
+    metric("output flushes", output.flushes, "flushes")
+    if not output.changed:
+        note(f"output file '{output.name}' has not changed")
+
+
+def report_shells(shell_pool):
+    """Report shell pool statistics of the document
+    if it has leased any shell sessions.
+
+    :param shell_pool: shell pool
+    """
+    from .core import metric
+
+    stats = shell_pool.stats(reset=True)
+    if not (stats["spawned"] or stats["reused"]):
+        return
+    metric("shells spawned", stats["spawned"], "shells")
+    metric("shells reused", stats["reused"], "shells")
+    metric("shell spawn time saved", round(stats["spawn time saved"], 3), "s")
+
+
+def report_cache(memo_cache):
+    """Report memoization cache statistics of the document
+    if it has called any cached functions.
+
+    :param memo_cache: memoization cache
+    """
+    from .core import metric
+
+    stats = memo_cache.stats(reset=True)
+    if not (stats["hits"] or stats["misses"]):
+        return
+    metric("cache hits", stats["hits"], "calls")
+    metric("cache misses", stats["misses"], "calls")
+
+
+@contextmanager
+def trace_memory():
+    """Trace memory allocations while running the documents
+    so that the peak memory of each section is reported.
+    """
+    import tracemalloc
+
+    if tracemalloc.is_tracing():
+        yield
+        return
+
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        tracemalloc.stop()
+
+
+#: names of the functions that set the result of the current test by the name of the result type
+result_functions = {
+    "OK": "ok", "Fail": "fail", "Skip": "skip", "Error": "err", "Null": "null",
+    "XOK": "xok", "XFail": "xfail", "XError": "xerr", "XNull": "xnull",
+}
+
+#: messages of the top level test of a worker that are not forwarded
+#: as the document test is started and ended by the main process
+worker_test_messages = ("PROTOCOL", "VERSION", "TEST", "RESULT", "STOP")
+
+
+def set_result(result_name, message, reason=None, test=None):
+    """Set result of the test.
+
+    :param result_name: name of the result type, for example: 'XFail'
+    :param message: result message
+    :param reason: result reason, default: None
+    :param test: test, default: current test
+    """
+    from . import core
+
+    try:
+        func = getattr(core, result_functions[result_name])
+    except KeyError:
+        raise ValueError(f"invalid result type '{result_name}'") from None
+    func(message, reason=reason, test=test)
+
+
+def forward_log(log, test):
+    """Write the messages of the test log of the document that was run
+    by a worker process into the test log as the messages of the document test
+    so that the sections of the document and all the messages that the document
+    has logged are in the test log.
+
+    :param log: test log of the worker
+    :param test: document test
+    """
+    import json
+    from testflows._core.message import dumps
+
+    top = None
+    with argtype.logfile("r", bufsize=1, encoding="utf-8")(log) as fd:
+        for line in fd:
+            message = json.loads(line)
+            if top is None:
+                # first message is of the top level test
+                top = message
+                offset = len(test.id) - top["test_level"]
+
+            if message["test_id"] == top["test_id"] and message["message_keyword"] in worker_test_messages:
+                continue
+
+            message["test_id"] = test.id_str + message["test_id"][len(top["test_id"]):]
+            message["test_name"] = test.name + message["test_name"][len(top["test_name"]):]
+            if message.get("result_test"):
+                message["result_test"] = test.name + message["result_test"][len(top["test_name"]):]
+            message["test_level"] += offset
+            message["message_level"] += offset
+            test.io.io.write(dumps(message) + "\n")
+
+
+def profile_path(output):
+    """Return profile file path for the document output.
+
+    :param output: output file path or '-' for stdout
+    """
+    if output == "-":
+        return "document.profile.json"
+    return "".join(output.rsplit(".", 1)[:1] + [".profile.json"])
+
+
+def write_profile(profiler, path, top):
+    """Write profile file and report the slowest blocks.
+
+    :param profiler: profiler
+    :param path: profile file path
+    :param top: number of the slowest blocks to report
+    """
+    from .core import note
+
+    profiler.dump(path)
+    note(profiler.report(top) + f"\nprofile written to '{path}'")
+
+
+def run_document(input, output, name, argv, cache, engine, stream, profile, cprofile,
+        shell_pool_size, shell_idle_timeout, memo_cache_dir, memo_cache_size, memo_cache_enabled, prelude=None,
+        light_headings=False):
+    """Run document as a top level test inside a worker process
+    and return the name of the result, its message and reason, the path
+    of the test log of the document that must be removed by the caller,
+    local modules used by the document, files that it depends on and
+    the time it took to run the document.
+
+    :param input: input file path
+    :param output: output file path
+    :param name: document name
+    :param argv: writer program arguments
+    :param cache: use compiled documents cache
+    :param engine: parser engine
+    :param stream: run document section by section as it is being read
+    :param profile: number of the slowest blocks to report when profiling or None
+    :param cprofile: profile each code block using `cProfile`
+    :param shell_pool_size: maximum number of idle shell sessions
+    :param shell_idle_timeout: shell session idle timeout in seconds
+    :param memo_cache_dir: memoization cache directory
+    :param memo_cache_size: maximum size of the memoization cache in bytes
+    :param memo_cache_enabled: use cached results of the cached functions
+    :param prelude: path of the prelude that was run before the worker was forked, default: None
+    :param light_headings: only run headings of the sections that have code blocks as section tests,
+        default: False
+    """
+    from testflows._core.funcs import current
+    from .core import Document
+    from .executable import execute
+    from .manifest import local_modules, recorded_imports
+    from .writer import DocumentWriter
+    from .profiler import Profiler
+    from .shells import ShellPool
+    from .memo import MemoCache
+    from .prelude import preludes
+
+    fd, log = tempfile.mkstemp(prefix="tfs-document-", suffix=".log")
+    os.close(fd)
+
+    sys.argv = argv + ["--output", "quiet", "--log", log]
+    sys.stdout = open(os.devnull, "w")
+
+    test = None
+    namespace = {}
+    imported = set()
+    depends = [prelude] if prelude else []
+    start_time = time.perf_counter()
+    try:
+        with open(input, "r", encoding="utf-8") as source, DocumentWriter(output) as output, \
+                ShellPool(shell_pool_size, shell_idle_timeout) as shell_pool:
+            try:
+                with Document(name) as test:
+                    current().context.file = output
+                    current().context.depends = depends
+                    current().context.shell_pool = shell_pool
+                    current().context.memo_cache = memo_cache = MemoCache(memo_cache_dir, memo_cache_size,
+                        enabled=memo_cache_enabled)
+                    profiler = Profiler(input, cprofile=cprofile) if profile is not None else None
+                    try:
+                        with recorded_imports() as imported:
+                            namespace = execute(source=source, cache=cache, engine=engine, stream=stream,
+                                profiler=profiler, namespace=preludes[prelude].namespace if prelude else None,
+                                light=light_headings)
+                    finally:
+                        close_output(output)
+                        report_shells(shell_pool)
+                        report_cache(memo_cache)
+                        if profiler is not None:
+                            write_profile(profiler, profile_path(output.name), profile)
+            except SystemExit:
+                pass
+    except BaseException:
+        os.unlink(log)
+        raise
+
+    return (type(test.result).__name__, test.result.message, test.result.reason, log,
+        local_modules(namespace, imported), depends, time.perf_counter() - start_time)
 
 
 class Handler(HandlerBase):
     @classmethod
     def add_command(cls, commands):
+        # imported here as the merge command handler is a subclass of this handler
+        from .shard import Handler as merge_handler, shard_type
+
         parser = commands.add_parser("run", help="run executable document", epilog=epilog(),
             description=(dedent("""
             Run executable document.
@@ -70,83 +310,358 @@ class Handler(HandlerBase):
             For example:
                PYTHONPATH=<path/to/module> tfs document run -i <path> -o <path>
 
-            The `--input` can take multiple files and in such case if `--output`
-            is specified it is treated as directory name.
+            The `--input` can take multiple files, directories that are searched
+            recursively for documents and glob patterns, and in such case if `--output`
+            is specified it is treated as directory name. Input files are only opened
+            when their document is run.
 
             For example,
-               tfs document run -i `find $(pwd) -name "*.tfd"` -o . -f 
+               tfs document run -i docs -o . -f 
             or
-               tfs document run -i `find $(pwd) -name "*.tfd"` -o /path/to/output/dir -f 
+               tfs document run -i docs 'examples/**/*.tfd' -o /path/to/output/dir -f --exclude drafts
             
             If input is '-' (stdin) and output is '.' then output file is 'document.md'
             which is created in the current working directory.
             """).strip()),
             formatter_class=HelpFormatter)
 
-        parser.add_argument("-i", "--input", metavar="path", type=argtype.file("r", bufsize=1, encoding="utf-8"),
-                            nargs="+", help="input file, use '-' for stdin, default: stdin", default="-")
+        parser.add_argument("-i", "--input", metavar="path", type=str,
+                            nargs="+", help="input file, directory or glob pattern, use '-' for stdin,\n"
+                                            "default: stdin", default="-")
+        parser.add_argument("--include", metavar="pattern", type=str, nargs="+",
+                            help="file name patterns of the documents inside the input directories,\n"
+                                 "patterns that contain '/' are matched against the path relative to\n"
+                                 "the input directory, default: '*.tfd'", default=None)
+        parser.add_argument("--exclude", metavar="pattern", type=str, nargs="+",
+                            help="file and directory name patterns to skip inside the input directories\n"
+                                 "and glob patterns, patterns that contain '/' are matched against\n"
+                                 "the path relative to the input directory", default=None)
         parser.add_argument("-o", "--output", metavar="path", type=str, nargs="?",
-                            help=('output file or directory if multiple input files are passed,\n'
+                            help=('output file or directory if multiple input files, a directory\n'
+                                  'or a glob pattern are passed,\n'
                                   'default: \'.\' or if input is stdin then \'-\'.\n'
                                   'The \'.\' means to create output file in the same directory as the input\n'
                                   'file having .md extension and the \'-\' means output to stdout.'), default="")
         parser.add_argument("-f", "--force", action="store_true",
                             help="force to override existing output file if it already exists", default=False)
+        parser.add_argument("-j", "--jobs", metavar="N", type=int,
+                            help="number of documents to run in parallel when multiple input files are passed,\n"
+                                 "each document is run in its own worker process, default: 1 or\n"
+                                 "the number of CPUs with '--check'", default=None)
+        parser.add_argument("--parser", dest="engine", metavar="engine", type=str, choices=["peg", "scanner"],
+                            help="document parser engine either 'peg' or 'scanner', default: 'peg'.\n"
+                                 "The 'scanner' is a single pass line oriented scanner that is much faster\n"
+                                 "on large documents and produces the same result as 'peg'", default="peg")
+        parser.add_argument("--no-bytecode-cache", dest="bytecode_cache", action="store_false",
+                            help="do not use or write compiled documents cache stored in the '__pycache__'\n"
+                                 "directory next to each input file", default=True)
+        parser.add_argument("--stream", action="store_true",
+                            help="read, compile and run document section by section writing output as it goes\n"
+                                 "so that memory use is bounded by the largest section instead of the whole\n"
+                                 "document, always uses the 'scanner' parser and no compiled documents cache",
+                            default=False)
+        # `profile` is the destination of the `tfs --profile` option
+        parser.add_argument("--profile", dest="document_profile", metavar="N", type=int, nargs="?", const=10,
+                            help="profile wall time, CPU time and memory allocations of each executed block\n"
+                                 "and section, report N slowest blocks, default: 10, and write the profile\n"
+                                 "into a '.profile.json' file next to the output file", default=None)
+        parser.add_argument("--light-headings", action="store_true",
+                            help="only run the headings of the sections that have 'python:testflows' code blocks\n"
+                                 "as section tests while other headings are only a part of the text,\n"
+                                 "and write the text of each test into the test log in large batches", default=False)
+        parser.add_argument("--section-memory", action="store_true",
+                            help="trace memory allocations and report the peak memory of each section\n"
+                                 "as a metric, documents run slower while memory allocations are traced",
+                            default=False)
+        parser.add_argument("--profile-cprofile", dest="cprofile", action="store_true",
+                            help="when profiling, also profile each 'python:testflows' block using 'cProfile'\n"
+                                 "and add its top functions to the profile file", default=False)
+        parser.add_argument("--shell-pool-size", metavar="N", type=int,
+                            help="maximum number of idle shell sessions kept warm for 'lease_shell()'\n"
+                                 "across the documents of the run, 0 disables pooling, default: 4", default=4)
+        parser.add_argument("--shell-idle-timeout", metavar="seconds", type=float,
+                            help="close pooled shell sessions that were idle for longer than this,\n"
+                                 "default: 300", default=300)
+        parser.add_argument("--no-cache", dest="memo_cache", action="store_false",
+                            help="always call functions decorated with 'cached()' instead of using\n"
+                                 "their cached results, the results are still written into the cache", default=True)
+        parser.add_argument("--cache-dir", metavar="path", type=str,
+                            help="directory of the cache of the results of the 'cached()' functions,\n"
+                                 "default: '.tfs-document-cache' in the current working directory",
+                            default=".tfs-document-cache")
+        parser.add_argument("--cache-size", metavar="MiB", type=int,
+                            help="maximum size of the cache, least recently used results are\n"
+                                 "removed when it is exceeded, default: 1024", default=1024)
+        parser.add_argument("--prelude", metavar="path", type=str,
+                            help="Python file or executable document of which only the 'python:testflows'\n"
+                                 "code blocks are run once before any document is run, its namespace is\n"
+                                 "copied into each document and its cleanups are run once at the end", default=None)
+        parser.add_argument("--check", action="store_true",
+                            help="only parse each document and compile all of its text and code blocks\n"
+                                 "without running it, report every error found in all the documents\n"
+                                 "and exit with an error if there are any, no output files are written",
+                            default=False)
+        parser.add_argument("--changed-only", action="store_true",
+                            help="skip documents that were successfully run before with the same arguments\n"
+                                 "if neither the document nor its output nor any of the local modules\n"
+                                 "or files that it depends on have changed since then", default=False)
+        parser.add_argument("--watch", action="store_true",
+                            help="run document and then keep running it each time it changes\n"
+                                 "resuming from the snapshot taken just before the first\n"
+                                 "changed section, only a single input file is supported, Linux only",
+                            default=False)
+        parser.add_argument("--manifest", metavar="path", type=str,
+                            help="build manifest file used by '--changed-only',\n"
+                                 "default: '.tfs-document-manifest.json' in the current working directory",
+                            default=None)
+
+        parser.add_argument("--shard", metavar="i/n", type=shard_type,
+                            help="only run the documents of the i-th of n shards, shards are balanced\n"
+                                 "using the durations file if it has the durations of the documents or\n"
+                                 "a stable hash of the document names otherwise, every shard must use\n"
+                                 "the same input files and durations file", default=None)
+        parser.add_argument("--durations", metavar="path", type=str,
+                            help="durations file written by 'tfs document merge' used by '--shard',\n"
+                                 "default: '.tfs-document-durations.json' in the current working directory",
+                            default=".tfs-document-durations.json")
 
         parser.set_defaults(func=cls())
 
+        serve_handler.add_command(commands)
+        merge_handler.add_command(commands)
+        compare_handler.add_command(commands)
+
     def handle(self, args):
+        import tracemalloc
+        from testflows._core.funcs import current
+        from .manifest import Manifest
+        from .inputs import expand, is_multiple
+
         if type(args.input) not in (list, tuple):
             args.input = [args.input]
 
-        with Module("documents") if len(args.input) > 1 else NullStep():
+        inputs = args.input
+        args.input = expand(args.input, include=args.include, exclude=args.exclude)
+        # output is a directory for a directory or a glob pattern even if it has matched only one file
+        multiple = len(args.input) > 1 or any(is_multiple(input) for input in inputs)
+
+        if args.check:
+            return self.check_documents(args)
+
+        jobs = (args.jobs or 1) if len(args.input) > 1 and "-" not in args.input else 1
+
+        if args.watch:
+            if not sys.platform.startswith("linux"):
+                raise ValueError("--watch is only supported on Linux")
+            if current():
+                raise ValueError("--watch can't be used inside a running test")
+            if args.stream:
+                raise ValueError("--watch can't be used with --stream")
+            if len(args.input) > 1 or args.input[0] == "-" or args.output == "-":
+                raise ValueError("--watch requires a single input file and an output file")
+
+        if args.shard and "-" in args.input:
+            raise ValueError("--shard can't be used with stdin")
+
+        if args.document_profile is not None and not hasattr(tracemalloc, "reset_peak"):
+            raise ValueError("--profile requires Python 3.9 or later")
+
+        if args.section_memory and not hasattr(tracemalloc, "reset_peak"):
+            raise ValueError("--section-memory requires Python 3.9 or later")
+
+        if args.section_memory and args.document_profile is not None:
+            raise ValueError("--section-memory can't be used with --profile which reports the peak memory of each section")
+
+        manifest = None
+        if args.changed_only or args.manifest:
+            manifest = Manifest(args.manifest or ".tfs-document-manifest.json")
+
+        argv = sys.argv[1:]
+
+        try:
+            self.run_documents(args, jobs, manifest, argv, multiple)
+        finally:
+            if manifest is not None:
+                manifest.save()
+
+    def check_documents(self, args):
+        from testflows._core.cli.arg.exit import ExitWithError
+        from .check import check
+
+        results = check(args.input, engine="scanner" if args.stream else args.engine,
+            jobs=args.jobs or os.cpu_count() or 1)
+
+        errors = [error for path, document_errors in results for error in document_errors]
+        for error in errors:
+            print(error)
+
+        if errors:
+            failed = len([path for path, document_errors in results if document_errors])
+            raise ExitWithError(f"found {len(errors)} errors in {failed} of {len(results)} documents")
+
+    def run_documents(self, args, jobs, manifest, argv, multiple):
+        from testflows._core.funcs import current
+        from testflows._core.test import NullStep
+        from .core import Document, Module, err, skip, metric, TE
+        from .executable import execute
+        from .forkserver import ForkServer
+        from .manifest import local_modules, recorded_imports
+        from .watch import watch
+        from .writer import DocumentWriter
+        from .profiler import Profiler
+        from .shells import ShellPool
+        from .memo import MemoCache
+        from .prelude import Prelude
+        from .shard import Durations, select, duration_metric
+        from .inputs import open_input, common_directory
+
+        shard_documents = None
+        if args.shard:
+            # document names are the same as the names used in the loop below
+            if multiple:
+                commondir = common_directory(args.input)
+                names = [os.path.relpath(path, commondir) for path in args.input]
+            else:
+                names = [os.path.basename(path) for path in args.input]
+            selected = select(names, *args.shard, durations=Durations(args.durations).durations)
+            shard_documents = {path for path, name in zip(args.input, names) if name in selected}
+
+        # with a prelude each document is run by its own worker so that the changes
+        # a document makes to the objects of the prelude are not seen by the other documents
+        isolated = bool(args.prelude) and len(args.input) > 1
+        pooled = (jobs > 1 or isolated) and "-" not in args.input and not current()
+        # without the workers the prelude is run again for each document
+        rerun_prelude = isolated and not pooled
+
+        # workers are forked from the fork server that must be started before any test
+        # and after the prelude is run so that each worker inherits its namespace
+        with Prelude(args.prelude, engine=args.engine) if args.prelude and not rerun_prelude else nullcontext() as prelude, \
+                ForkServer(jobs) if pooled else nullcontext() as pool, \
+                trace_memory() if args.section_memory else nullcontext(), \
+                ShellPool(args.shell_pool_size, args.shell_idle_timeout) as shell_pool, \
+                Module("documents") if multiple else NullStep():
+            memo_cache = MemoCache(os.path.abspath(args.cache_dir), args.cache_size << 20, enabled=args.memo_cache)
             relative_directory = ""
+            documents = []
     
-            for doc in args.input:
+            if multiple:
+                commondir = common_directory(args.input)
+
+            for path in args.input:
+                if shard_documents is not None and path not in shard_documents:
+                    continue
+
                 output = args.output
                 
-                if len(args.input) > 1:
-                    commondir = os.path.commonpath([i.name for i in args.input])
-                    relative_directory, filename = os.path.split(os.path.relpath(doc.name, commondir))
+                if multiple:
+                    relative_directory, filename = os.path.split(os.path.relpath(path, commondir))
 
                 if not output:
-                    if doc.name == "<stdin>":
+                    if path == "-":
                         output = "-"
                     else:
                         output = "."
 
-                elif len(args.input) > 1:
+                elif multiple:
                     directory = os.path.join(output, relative_directory)
                     os.makedirs(directory, exist_ok=True)                  
                     output = os.path.join(directory, "".join(filename.rsplit(".", 1)[:1] + [".md"]))
 
                 if output == ".":
-                    if doc.name == "<stdin>":
+                    if path == "-":
                         output = "document.md"
                     else:
-                        directory, filename = os.path.split(doc.name)
+                        directory, filename = os.path.split(path)
                         output = os.path.join(directory, "".join(filename.rsplit(".", 1)[:1] + [".md"]))
 
-                if output == doc.name:
+                if output == path and path != "-":
                     if current():
                         err("output file '{output}'is the same as input file")
                     else:
                         raise ValueError("output file can't be the same as input file") 
 
+                name = os.path.join(relative_directory, os.path.basename(path) if path != "-" else "document")
+
+                # only documents read from and written to files are tracked in the manifest
+                tracked = manifest is not None and path != "-" and output != "-"
+
+                if tracked:
+                    if args.changed_only and manifest.unchanged(path, output, argv):
+                        with Document(name):
+                            skip("document has not changed")
+                        continue
+                    manifest.discard(path, output)
+
                 if os.path.exists(output) and not args.force:
                     if current():
                         err(f"output file '{output}' already exists")
                     else:
                         raise ValueError(f"output file '{output}' already exists")
 
-                output = argtype.file("w", bufsize=1, encoding="utf-8")(output)
+                if args.watch:
+                    watch(path, output, name, list(sys.argv), engine=args.engine, memo_cache=memo_cache,
+                        namespace=prelude.namespace if prelude else None)
+                    continue
+
+                if pool is not None:
+                    documents.append((name, path if tracked else None, output, pool.submit(run_document,
+                        os.path.abspath(path), os.path.abspath(output), name, list(sys.argv),
+                        args.bytecode_cache, args.engine, args.stream, args.document_profile, args.cprofile,
+                        args.shell_pool_size, args.shell_idle_timeout,
+                        memo_cache.directory, memo_cache.max_size, memo_cache.enabled,
+                        prelude.path if prelude else None, args.light_headings)))
+                    continue
 
-                if output.name == "<stdout>":
+                if output == "-":
+                    output = argtype.file("w", bufsize=1, encoding="utf-8")(output)
                     sys.argv += ["--output", "quiet"]
+                else:
+                    output = DocumentWriter(output)
 
                 try:
-                    with Document(os.path.join(relative_directory, os.path.basename(doc.name) if doc.name != "<stdin>" else "document")):
+                    with Prelude(args.prelude, engine=args.engine) if rerun_prelude else nullcontext(prelude) as document_prelude, \
+                            Document(name), open_input(path) as doc:
+                        start_time = time.perf_counter()
                         current().context.file = output
-                        execute(source=doc)
+                        current().context.depends = depends = [document_prelude.path] if document_prelude else []
+                        current().context.shell_pool = shell_pool
+                        current().context.memo_cache = memo_cache
+                        profiler = Profiler(path, cprofile=args.cprofile) if args.document_profile is not None else None
+                        try:
+                            with recorded_imports() as imported:
+                                namespace = execute(source=doc, cache=args.bytecode_cache, engine=args.engine,
+                                    stream=args.stream, profiler=profiler,
+                                    namespace=document_prelude.namespace if document_prelude else None,
+                                    light=args.light_headings)
+                        finally:
+                            close_output(output)
+                            report_shells(shell_pool)
+                            report_cache(memo_cache)
+                            metric(duration_metric, round(time.perf_counter() - start_time, 3), "s")
+                            if profiler is not None:
+                                write_profile(profiler, profile_path(output.name if isinstance(output, DocumentWriter) else "-"),
+                                    args.document_profile)
+                        if tracked:
+                            manifest.record(path, output.name, argv, local_modules(namespace, imported), depends)
                 finally:
-                    output.flush()
+                    if isinstance(output, DocumentWriter):
+                        output.close()
+                    else:
+                        output.flush()
+
+            # report results in the same order as the input files
+            for name, input, output, future in documents:
+                with Document(name, flags=TE) as test:
+                    try:
+                        result_name, message, reason, log, modules, depends, duration = future.result()
+                    except Exception as e:
+                        err(f"{type(e).__name__}: {e}")
+                    try:
+                        forward_log(log, test)
+                    finally:
+                        os.unlink(log)
+                    metric(duration_metric, round(duration, 3), "s")
+                    if result_name != "OK":
+                        set_result(result_name, message, reason)
+                    if input is not None:
+                        manifest.record(input, output, argv, modules, depends)
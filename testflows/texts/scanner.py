@@ -0,0 +1,286 @@
+# Copyright 2021 Katteli Inc.
+# TestFlows.com Open-Source Software Testing Framework (http://testflows.com)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import re
+
+from testflows.texts.compiler import Chunk, Block
+
+whitespace_re = re.compile(r"\s*")
+heading_prefix_re = re.compile(r"#+\s+")
+setext_underline_re = re.compile(r"\n?[-=]+\n?")
+header_sep_re = re.compile(r"---[ \t]*\n")
+exec_code_start_re = re.compile(r"[ \t]?[ \t]?[ \t]?[`~][`~][`~]python:testflows[ \t]*\n")
+exec_code_end_re = re.compile(r"[ \t]?[ \t]?[ \t]?[`~][`~][`~][ \t]*(?:\n|\Z)")
+
+
+class Scanner:
+    """Single pass line oriented scanner of executable documents
+    that produces the same document blocks as the `Parser()` grammar
+    but without building the parse tree and without backtracking.
+
+    :param source_data: source document
+    :param lineno: line number of the first line, default: 1
+    """
+    def __init__(self, source_data, lineno=1):
+        self.data = source_data
+        self.size = len(source_data)
+        self.pos = 0
+        self.lineno = lineno
+        # end of the last whitespace run used to avoid
+        # rescanning the same blank lines when looking for headings
+        self.whitespace_end = -1
+        # start of the first code block that is not closed
+        # as any code block after it is not closed either
+        self.unclosed_exec_code = self.size
+
+    def line_end(self, pos):
+        """Return position of the end of the line
+        that includes the new line character.
+        """
+        end = self.data.find("\n", pos)
+        return self.size if end < 0 else end + 1
+
+    def chunk(self, rule_name, end):
+        """Return chunk that ends at the specified position
+        and advance the current position.
+        """
+        text = self.data[self.pos:end]
+        chunk = Chunk(rule_name, self.lineno, text)
+        self.lineno += text.count("\n")
+        self.pos = end
+        return chunk
+
+    def heading(self, pos):
+        """Return end position and name of the heading
+        that starts at the specified position or None.
+        """
+        data = self.data
+
+        if pos > self.whitespace_end:
+            self.whitespace_end = whitespace_re.match(data, pos).end()
+
+        match = heading_prefix_re.match(data, self.whitespace_end)
+        if match and match.end() < self.size:
+            end = self.line_end(match.end())
+            return end, data[match.end():end].rstrip("\n")
+
+        if pos < self.size and data[pos] != "\n":
+            end = data.find("\n", pos)
+            if end >= 0:
+                match = setext_underline_re.match(data, end)
+                if match:
+                    return match.end(), data[pos:end]
+
+        return None
+
+    def header_end(self):
+        """Return end position of the header or None.
+        """
+        match = header_sep_re.match(self.data, 0)
+        if not match:
+            return None
+
+        pos = match.end()
+        while True:
+            match = header_sep_re.match(self.data, pos)
+            if match:
+                return match.end()
+            end = self.data.find("\n", pos)
+            if end < 0:
+                return None
+            pos = end + 1
+
+    def header(self):
+        """Return header chunks or None.
+        """
+        if self.header_end() is None:
+            return None
+
+        match = header_sep_re.match(self.data, 0)
+        chunks = [self.chunk("header_sep", match.end())]
+        while not header_sep_re.match(self.data, self.pos):
+            chunks.append(self.chunk("line", self.line_end(self.pos)))
+        chunks.append(self.chunk("header_sep", header_sep_re.match(self.data, self.pos).end()))
+
+        return chunks
+
+    def exec_code(self, pos):
+        """Return end position of the code block that starts
+        at the specified position or None.
+        """
+        data = self.data
+
+        match = exec_code_start_re.match(data, pos)
+        if not match or pos > self.unclosed_exec_code:
+            return None
+
+        start, pos = pos, match.end()
+        while True:
+            match = exec_code_end_re.match(data, pos)
+            if match:
+                return match.end()
+            end = data.find("\n", pos)
+            if end < 0:
+                self.unclosed_exec_code = start
+                return None
+            pos = end + 1
+
+    def paragraph(self, pos):
+        """Return end position of the paragraph that starts
+        at the specified position or None.
+        """
+        data = self.data
+        start = pos
+
+        while pos < self.size and data[pos] != "\n":
+            if exec_code_start_re.match(data, pos):
+                break
+            pos = self.line_end(pos)
+
+        return pos if pos > start else None
+
+    def body(self):
+        """Return chunks of the intro or of the section body.
+        """
+        chunks = []
+
+        while self.pos < self.size and self.heading(self.pos) is None:
+            end = self.exec_code(self.pos)
+            if end is not None:
+                chunks.append(self.chunk("exec_code", end))
+                continue
+
+            end = self.paragraph(self.pos)
+            if end is not None:
+                chunks.append(self.chunk("paragraph", end))
+                continue
+
+            end = self.line_end(self.pos)
+            chunks.append(self.chunk("line" if self.data[end - 1] == "\n" else "final_line", end))
+
+        return chunks
+
+    def scan(self, intro=True):
+        """Scan document and yield blocks as soon
+        as each block is complete.
+
+        :param intro: scan header and intro, default: True,
+            otherwise the data must start with a section
+        """
+        if intro:
+            chunks = self.header()
+            if chunks:
+                yield Block(0, None, chunks)
+
+            chunks = self.body()
+            if chunks:
+                yield Block(0, None, chunks)
+
+        while self.pos < self.size:
+            end, name = self.heading(self.pos)
+            heading = self.chunk("heading", end)
+            yield Block(heading.text.count("#"), name.strip(), [heading] + self.body())
+
+
+class StreamScanner:
+    """Scanner of executable documents that reads the source
+    incrementally and yields each block as soon as the heading
+    of the next section is read. Only the text of the block
+    that is not complete yet is kept in memory.
+
+    The blocks are the same as the ones produced by the `Scanner`
+    for the whole document. A block is only yielded when the heading
+    that follows it is complete and is not inside of a code block
+    that might still be closed further in the document.
+
+    :param source: source file-like object
+    :param read_size: minimum size of each read, default: 64 KiB
+    """
+    def __init__(self, source, read_size=1 << 16):
+        self.source = source
+        self.read_size = read_size
+
+    def complete(self, scanner, found, intro):
+        """Return number of the complete blocks.
+
+        :param scanner: scanner of the current data
+        :param found: list of blocks with their end positions
+        :param intro: data starts with the header and intro
+        """
+        if intro and header_sep_re.match(scanner.data) and scanner.header_end() is None:
+            # header might be closed further in the document
+            return 0
+
+        for i in range(len(found) - 1, 0, -1):
+            block, end = found[i]
+            heading_end = found[i - 1][1] + len(block.chunks[0].text)
+            if block.name is not None and heading_end < scanner.size and found[i - 1][1] < scanner.unclosed_exec_code:
+                return i
+
+        return 0
+
+    def scan(self):
+        """Read and scan document and yield blocks.
+        """
+        data = ""
+        lineno = 1
+        intro = True
+        read_size = self.read_size
+
+        while True:
+            new_data = self.source.read(read_size)
+            data += new_data
+
+            if not new_data:
+                if data:
+                    yield from Scanner(data, lineno).scan(intro)
+                return
+
+            scanner = Scanner(data, lineno)
+            found = []
+            for block in scanner.scan(intro):
+                found.append((block, scanner.pos))
+
+            count = self.complete(scanner, found, intro)
+
+            if not count:
+                # grow reads to rescan the same data only a few times
+                read_size = max(self.read_size, len(data))
+                continue
+
+            for block, end in found[:count]:
+                yield block
+
+            data = data[found[count - 1][1]:]
+            lineno = found[count][0].chunks[0].lineno
+            intro = False
+            read_size = self.read_size
+
+
+def scan(source_data):
+    """Scan executable document and yield document blocks.
+
+    :param source_data: source document
+    """
+    return Scanner(source_data).scan()
+
+
+def scan_stream(source, read_size=1 << 16):
+    """Read and scan executable document incrementally
+    and yield document blocks.
+
+    :param source: source file-like object
+    :param read_size: minimum size of each read, default: 64 KiB
+    """
+    return StreamScanner(source, read_size=read_size).scan()
@@ -0,0 +1,368 @@
+# Copyright 2021 Katteli Inc.
+# TestFlows.com Open-Source Software Testing Framework (http://testflows.com)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import sys
+import stat
+import signal
+import socket
+import struct
+import argparse
+import tempfile
+import traceback
+
+from textwrap import dedent
+from importlib import import_module
+from multiprocessing.reduction import sendfds, recvfds
+
+from testflows._core.cli.arg.common import epilog
+from testflows._core.cli.arg.common import HelpFormatter
+from testflows._core.cli.arg.handlers.handler import Handler as HandlerBase
+
+from .forkserver import send, receive
+
+#: environment variable with the path of the document server socket
+socket_variable = "TFS_DOCUMENT_SERVER"
+
+# this module is imported by the `tfs` command and by the client
+# and therefore the modules needed to run documents are only imported by the server
+
+
+def private_directory():
+    """Return path of the directory inside the temporary directory
+    that only the current user can access which is used for the
+    default socket when `XDG_RUNTIME_DIR` is not set.
+    """
+    return os.path.join(tempfile.gettempdir(), f"tfs-document-{os.getuid()}")
+
+
+def default_socket():
+    """Return default document server socket path.
+    """
+    if os.environ.get(socket_variable):
+        return os.environ[socket_variable]
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        return os.path.join(os.environ["XDG_RUNTIME_DIR"], f"tfs-document-{os.getuid()}.sock")
+    return os.path.join(private_directory(), "document.sock")
+
+
+def make_private_directory(path):
+    """Create directory that only the current user can access
+    or check that the existing directory is such a directory.
+
+    :param path: directory path
+    """
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(f"'{path}' must be a directory owned by the current user "
+            "that other users can't access")
+
+
+def peer_uid(sock):
+    """Return user id of the process connected to the other end
+    of the Unix socket or None if it is not available on this platform.
+
+    :param sock: connected Unix socket
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    pid, uid, gid = struct.unpack("3i", sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED,
+        struct.calcsize("3i")))
+    return uid
+
+
+def run(argv):
+    """Run `tfs document run` command with the arguments
+    in the current process and return its exit code.
+
+    :param argv: command arguments
+    """
+    import testflows._core.init as testflows_init
+    from testflows._core.cli.arg.exit import ExitException
+    from testflows._core.cli.text import danger
+    from .run import Handler
+
+    parser = argparse.ArgumentParser(prog="tfs document")
+    Handler.add_command(parser.add_subparsers())
+
+    try:
+        args, unknown = parser.parse_known_args(["run"] + list(argv))
+        # the rest of the arguments are passed to the document writer program
+        if unknown and unknown[0] == "--":
+            unknown = unknown[1:]
+        sys.argv = ["tfs"] + unknown
+        args.func(args)
+    except SystemExit as exc:
+        if exc.code is None or isinstance(exc.code, int):
+            return exc.code or 0
+        sys.stderr.write(f"{exc.code}\n")
+        return 1
+    except (ExitException, KeyboardInterrupt, Exception) as exc:
+        if not isinstance(exc, (KeyboardInterrupt, BrokenPipeError)):
+            sys.stderr.write(danger("error: " + str(exc).strip()))
+        return exc.exitcode if isinstance(exc, ExitException) else 1
+    finally:
+        # output handlers are otherwise only joined at exit
+        for handler in testflows_init._handlers:
+            handler.join()
+
+    return 0
+
+
+class Server:
+    """Document server that keeps the test framework and the document
+    runtime loaded and runs each request in a worker process
+    forked from it, listening on a Unix socket.
+
+    The client passes its standard input, output and error
+    to the worker so that the output of the document run goes straight
+    to the client, and the worker runs with the working directory and
+    the environment of the client. No test is started in the server itself.
+
+    :param path: socket path
+    :param preload: names of additional modules to import
+        in the server, default: ()
+    """
+    def __init__(self, path, preload=()):
+        self.path = path
+        self.preload = preload
+        self.sock = None
+
+    def start(self):
+        """Load modules and start listening on the socket.
+        """
+        from .executable import parse
+
+        # warm up the parsers and import modules used by the documents
+        for engine in ("peg", "scanner"):
+            parse("# Document\n\n```python:testflows\nx = 1\n```\n\n{x}\n", engine=engine)
+        for name in self.preload:
+            import_module(name)
+
+        if os.path.dirname(os.path.abspath(self.path)) == private_directory():
+            make_private_directory(private_directory())
+
+        if os.path.exists(self.path):
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                    sock.connect(self.path)
+            except ConnectionRefusedError:
+                os.unlink(self.path)
+            else:
+                raise ValueError(f"document server is already running at '{self.path}'")
+
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # only the current user can connect to the server
+        umask = os.umask(0o077)
+        try:
+            self.sock.bind(self.path)
+        finally:
+            os.umask(umask)
+        self.sock.listen()
+        return self
+
+    def serve(self):
+        """Serve requests until interrupted.
+        """
+        # workers are reaped automatically
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+        while True:
+            conn, _ = self.sock.accept()
+
+            # requests of other users are rejected even if they can connect
+            if peer_uid(conn) not in (None, os.getuid()):
+                conn.close()
+                continue
+
+            sys.stdout.flush()
+            sys.stderr.flush()
+
+            if os.fork() == 0:
+                self.sock.close()
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                self.work(conn)
+
+            conn.close()
+
+    def work(self, conn):
+        """Run request in the worker process and send back
+        the exit code. This function never returns.
+
+        :param conn: client connection
+        """
+        code = 1
+        try:
+            fds = recvfds(conn, 3)
+            request = receive(conn)
+            send(conn, ("started", os.getpid()))
+
+            for target, fd in enumerate(fds):
+                os.dup2(fd, target)
+                os.close(fd)
+
+            os.chdir(request["cwd"])
+            os.environ.clear()
+            os.environ.update(request["env"])
+            sys.path[:0] = [os.path.abspath(path) for path in request["env"].get("PYTHONPATH", "").split(os.pathsep)
+                if path]
+
+            code = run(request["argv"])
+            sys.stdout.flush()
+            sys.stderr.flush()
+            send(conn, ("exit", code))
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(code)
+
+    def close(self):
+        """Stop listening and remove the socket.
+        """
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.close()
+
+
+def request(path, argv):
+    """Send request to run the document to the server, wait
+    for it to complete and return the exit code. Interrupting the client
+    interrupts the worker.
+
+    :param path: socket path
+    :param argv: `tfs document run` command arguments
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        # standard streams and environment are only sent to the server of the current user
+        uid = peer_uid(sock)
+        if uid is None:
+            uid = os.stat(path).st_uid
+        if uid != os.getuid():
+            raise PermissionError(f"document server at '{path}' is not run by the current user")
+        sendfds(sock, [0, 1, 2])
+        send(sock, {"argv": list(argv), "cwd": os.getcwd(), "env": dict(os.environ)})
+
+        pid = None
+        while True:
+            try:
+                message = receive(sock)
+            except KeyboardInterrupt:
+                if pid is not None:
+                    os.kill(pid, signal.SIGINT)
+                continue
+            if message is None:
+                sys.stderr.write("error: document server worker exited unexpectedly\n")
+                return 1
+            if message[0] == "started":
+                pid = message[1]
+            elif message[0] == "exit":
+                return message[1]
+
+
+def main(argv=None):
+    """Document server client that runs `tfs document run` command
+    with the arguments using the document server. If the server is not running
+    then the command is run by `tfs` instead.
+
+    :param argv: arguments, default: `sys.argv[1:]`
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    path = default_socket()
+
+    if argv[:1] == ["--socket"]:
+        path, argv = argv[1], argv[2:]
+
+    try:
+        return request(path, argv)
+    except (FileNotFoundError, ConnectionRefusedError):
+        os.execvp("tfs", ["tfs", "document", "run"] + argv)
+    except PermissionError as exc:
+        sys.stderr.write(f"error: {exc}\n")
+        return 1
+
+
+class Handler(HandlerBase):
+    @classmethod
+    def add_command(cls, commands):
+        parser = commands.add_parser("serve", help="run document server", epilog=epilog(),
+            description=(dedent(f"""
+            Run document server that keeps the test framework
+            and the document runtime loaded so that documents start running
+            right away. The server runs until it is interrupted.
+
+            Each request is run in a new worker process forked from the server
+            using the working directory, environment, standard input and output
+            of the client. Run documents using the server with
+
+               python3 -m testflows.texts.serve [--socket <path>] <tfs document run arguments>
+
+            which falls back to 'tfs document run' if the server is not running.
+
+            For example:
+               tfs document serve &
+               python3 -m testflows.texts.serve -i <path> -o <path> -f
+
+            The default socket path can be set using the '{socket_variable}'
+            environment variable.
+            """).strip()),
+            formatter_class=HelpFormatter)
+
+        parser.add_argument("--socket", metavar="path", type=str,
+                            help=f"server socket path, default: '{default_socket()}'", default=None)
+        parser.add_argument("--preload", metavar="module", type=str, nargs="+",
+                            help="additional modules to import in the server, for example,\n"
+                                 "modules used by the documents", default=[])
+
+        parser.set_defaults(func=cls())
+
+    def handle(self, args):
+        path = args.socket or default_socket()
+
+        def terminate(signum, frame):
+            raise SystemExit(0)
+
+        signal.signal(signal.SIGTERM, terminate)
+
+        with Server(path, preload=args.preload) as server:
+            sys.stderr.write(f"document server is listening on '{path}'\n")
+            sys.stderr.flush()
+            try:
+                server.serve()
+            except KeyboardInterrupt:
+                pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
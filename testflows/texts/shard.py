@@ -0,0 +1,235 @@
+# Copyright 2021 Katteli Inc.
+# TestFlows.com Open-Source Software Testing Framework (http://testflows.com)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import json
+import shutil
+import hashlib
+import argparse
+
+from textwrap import dedent
+
+from testflows._core.cli.arg.common import epilog
+from testflows._core.cli.arg.common import HelpFormatter
+
+from .run import Handler as RunHandler, set_result
+from .writer import same_content, atomic_write
+
+#: metric with the time it took to run the document
+duration_metric = "document time"
+
+
+def shard_type(value):
+    """Parse shard specified as 'i/n' where shards
+    are numbered from 1 and return (i, n).
+    """
+    try:
+        index, count = (int(part) for part in value.split("/"))
+        if not 1 <= index <= count:
+            raise ValueError
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid shard '{value}', must be 'i/n' where 1 <= i <= n") from None
+    return index, count
+
+
+def stable_hash(name):
+    """Return hash of the name that is the same in every process.
+    """
+    return int.from_bytes(hashlib.sha256(name.encode("utf-8")).digest()[:8], "big")
+
+
+def select(names, index, count, durations=None):
+    """Return set of document names of the shard.
+
+    Documents with recorded durations are assigned, longest first,
+    to the shard with the least total duration so far while all other documents
+    are assigned using a stable hash of their name and are counted
+    using the average recorded duration. The result only depends
+    on the names and the durations.
+
+    :param names: document names
+    :param index: shard index starting from 1
+    :param count: number of shards
+    :param durations: recorded durations of the documents, default: None
+    """
+    durations = durations or {}
+    known = {name: durations[name] for name in set(names) if name in durations}
+    estimate = sum(known.values()) / len(known) if known else 1.0
+
+    shards = [set() for i in range(count)]
+    totals = [0.0] * count
+
+    for name in sorted(set(names)):
+        if name not in known:
+            shard = stable_hash(name) % count
+            shards[shard].add(name)
+            totals[shard] += estimate
+
+    for name in sorted(known, key=lambda name: (-known[name], name)):
+        shard = min(range(count), key=lambda i: (totals[i], i))
+        shards[shard].add(name)
+        totals[shard] += known[name]
+
+    return shards[index - 1]
+
+
+class Durations:
+    """Recorded durations of the documents in seconds by the document name.
+
+    :param path: durations file path
+    """
+    def __init__(self, path):
+        self.path = path
+        self.durations = {}
+
+        try:
+            with open(path, "r", encoding="utf-8") as fd:
+                self.durations = json.load(fd)["durations"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def save(self):
+        """Atomically save durations.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        with atomic_write(self.path, encoding="utf-8") as temp_file:
+            json.dump({"durations": self.durations}, temp_file, indent=2, sort_keys=True)
+
+
+def read_results(log):
+    """Return list of (name, result, message, reason, metrics, duration)
+    of the documents in the test log of `tfs document run`.
+
+    :param log: open test log file
+    """
+    from testflows._core.name import unclean
+
+    documents = {}
+    for line in log:
+        message = json.loads(line)
+        # only the documents run directly by `tfs document run`
+        if message.get("test_subtype") != "Document" or message["test_level"] > 2:
+            continue
+
+        document = documents.setdefault(message["test_id"], {"metrics": [], "duration": None})
+        keyword = message["message_keyword"]
+
+        if keyword == "TEST":
+            document["name"] = unclean(message["test_name"].rsplit("/", 1)[-1])
+        elif keyword == "METRIC":
+            if message["metric_name"] == duration_metric:
+                document["duration"] = message["metric_value"]
+            else:
+                document["metrics"].append((message["metric_name"], message["metric_value"], message["metric_units"]))
+        elif keyword == "RESULT":
+            document["result"] = message["result_type"]
+            document["message"] = message["result_message"]
+            document["reason"] = message["result_reason"]
+            if document["duration"] is None:
+                document["duration"] = message["message_rtime"]
+
+    return [(document["name"], document["result"], document["message"], document["reason"], document["metrics"],
+        document["duration"]) for document in documents.values() if "result" in document]
+
+
+def merge_tree(source, destination):
+    """Copy files from the source directory into the destination
+    directory failing if a file already exists with a different content.
+
+    :param source: source directory
+    :param destination: destination directory
+    """
+    for directory, dirnames, filenames in os.walk(source):
+        target_directory = os.path.normpath(os.path.join(destination, os.path.relpath(directory, source)))
+        os.makedirs(target_directory, exist_ok=True)
+        for filename in filenames:
+            target = os.path.join(target_directory, filename)
+            if os.path.exists(target):
+                if same_content(target, other_path=os.path.join(directory, filename)):
+                    continue
+                raise ValueError(f"file '{target}' already exists with a different content")
+            shutil.copy2(os.path.join(directory, filename), target)
+
+
+class Handler(RunHandler):
+    # a subclass of the run command handler so that `tfs` passes
+    # the arguments after '--' to the report test program
+    @classmethod
+    def add_command(cls, commands):
+        parser = commands.add_parser("merge", help="merge results of sharded runs", epilog=epilog(),
+            description=(dedent("""
+            Merge the results of the documents that were run
+            using 'tfs document run --shard i/n' into a single report
+            using the test log of each shard, and optionally, merge the output
+            directories of the shards and save the durations of the documents
+            used to balance the shards of the next run.
+
+            Specify '--' at the end of the command line options to pass
+            options to the report program itself.
+
+            For example:
+               tfs document merge --log shard-*/docs.log -i shard-*/build -o build \\
+                   --durations .tfs-document-durations.json -- --log docs.log
+            """).strip()),
+            formatter_class=HelpFormatter)
+
+        parser.add_argument("--log", metavar="path", type=str, nargs="+", required=True,
+                            help="test logs of the shards")
+        parser.add_argument("-i", "--input", metavar="path", type=str, nargs="+",
+                            help="output directories of the shards", default=[])
+        parser.add_argument("-o", "--output", metavar="path", type=str,
+                            help="merged output directory, required if shard output directories are specified",
+                            default=None)
+        parser.add_argument("--durations", metavar="path", type=str,
+                            help="update durations file used by '--shard' with the durations of the documents",
+                            default=None)
+
+        parser.set_defaults(func=cls())
+
+    def handle(self, args):
+        import testflows._core.cli.arg.type as argtype
+        from .core import Document, Module, metric, TE
+
+        if args.input and not args.output:
+            raise ValueError("--output is required to merge output directories")
+
+        documents = {}
+        for path in args.log:
+            with argtype.logfile("r", bufsize=1, encoding="utf-8")(path) as log:
+                for name, result_name, message, reason, metrics, duration in read_results(log):
+                    if name in documents:
+                        raise ValueError(f"document '{name}' is in more than one shard log")
+                    documents[name] = (result_name, message, reason, metrics, duration)
+
+        for directory in args.input:
+            merge_tree(directory, args.output)
+
+        if args.durations:
+            durations = Durations(args.durations)
+            durations.durations.update({name: round(duration, 3)
+                for name, (result_name, message, reason, metrics, duration) in documents.items()
+                if result_name != "Skip" and duration is not None})
+            durations.save()
+
+        with Module("documents"):
+            for name, (result_name, message, reason, metrics, duration) in sorted(documents.items()):
+                with Document(name, flags=TE):
+                    for metric_name, value, units in metrics:
+                        metric(metric_name, value, units)
+                    if duration is not None:
+                        metric(duration_metric, duration, "s")
+                    if result_name != "OK":
+                        set_result(result_name, message, reason)
@@ -0,0 +1,224 @@
+# Copyright 2021 Katteli Inc.
+# TestFlows.com Open-Source Software Testing Framework (http://testflows.com)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import time
+import shlex
+import threading
+
+from contextlib import contextmanager
+
+from testflows.connect import Shell
+from testflows._core.funcs import current
+
+#: command that resets the state of the shell session
+#: when it is returned to the pool, formatted with the initial working directory
+reset_command = ("cd {cwd}; set +o errexit +o nounset +o xtrace +o pipefail; trap - EXIT ERR; "
+    "kill $(jobs -p) 2>/dev/null; wait 2>/dev/null; true")
+
+
+class ShellPool:
+    """Pool of warm `Shell` sessions that are leased by the documents
+    instead of spawning a new shell each time.
+
+    When a session is returned to the pool, its state is reset
+    by changing back to the initial working directory, turning off shell options,
+    removing traps and killing any background jobs. Environment variables
+    and shell functions are kept. Sessions that fail to reset or that
+    were leased when an exception was raised are closed instead.
+
+    :param size: maximum number of idle sessions kept in the pool,
+        0 disables pooling, default: 4
+    :param idle_timeout: close sessions that were idle for longer
+        than this number of seconds, default: 300
+    :param reset: reset command, default: `reset_command`
+    """
+    def __init__(self, size=4, idle_timeout=300, reset=reset_command):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.reset = reset
+        self.cwd = os.getcwd()
+        self.lock = threading.Lock()
+        # idle sessions as (shell, key, returned at) with the most recently returned last
+        self.idle = []
+        #: number of spawned sessions
+        self.spawned = 0
+        #: number of leases that reused a warm session
+        self.reused = 0
+        #: number of sessions that were closed because they failed to reset
+        #: or an exception was raised while they were leased
+        self.discarded = 0
+        #: time spent spawning sessions in seconds
+        self.spawn_time = 0.0
+        # totals used for the average spawn time that are never reset
+        self.total_spawned = 0
+        self.total_spawn_time = 0.0
+
+    def expire(self):
+        """Remove sessions that were idle for too long
+        and return them.
+        """
+        deadline = time.monotonic() - self.idle_timeout
+        expired = [entry for entry in self.idle if entry[2] < deadline]
+        if expired:
+            self.idle = [entry for entry in self.idle if entry[2] >= deadline]
+        return [shell for shell, key, returned in expired]
+
+    def acquire(self, command=None, name=None):
+        """Return warm session for the command or spawn a new one.
+
+        :param command: command to launch shell, default: `Shell.command`
+        :param name: name of the shell in the test log, default: 'bash'
+        """
+        key = tuple(command or Shell.command)
+
+        with self.lock:
+            expired = self.expire()
+            shell = None
+            for i in range(len(self.idle) - 1, -1, -1):
+                if self.idle[i][1] == key:
+                    shell = self.idle.pop(i)[0]
+                    break
+
+        for expired_shell in expired:
+            expired_shell.close()
+
+        test = current()
+
+        if shell is not None and shell.child is not None:
+            shell.name = name if name is not None else Shell.name
+            shell.test = test
+            shell.child.logger(test.message_io(shell.name))
+            with self.lock:
+                self.reused += 1
+            return shell
+
+        shell = Shell(command=list(key), name=name)
+        start_time = time.perf_counter()
+        shell.open(test=test)
+        spawn_time = time.perf_counter() - start_time
+        with self.lock:
+            self.spawned += 1
+            self.spawn_time += spawn_time
+            self.total_spawned += 1
+            self.total_spawn_time += spawn_time
+        return shell
+
+    def release(self, shell):
+        """Reset session state and return it to the pool
+        or close it if the pool is full or reset has failed.
+
+        :param shell: shell session
+        """
+        if shell.child is None:
+            return
+
+        if self.size < 1:
+            shell.close()
+            return
+
+        try:
+            if self.reset:
+                command = shell(self.reset.format(cwd=shlex.quote(self.cwd)), name="reset")
+                if command.exitcode != 0:
+                    raise RuntimeError(f"shell reset failed with exit code {command.exitcode}")
+        except Exception:
+            self.discard(shell)
+            return
+
+        with self.lock:
+            expired = self.expire()
+            if len(self.idle) >= self.size:
+                expired.append(self.idle.pop(0)[0])
+            self.idle.append((shell, tuple(shell.command), time.monotonic()))
+
+        for expired_shell in expired:
+            expired_shell.close()
+
+    def discard(self, shell):
+        """Close session instead of returning it to the pool.
+
+        :param shell: shell session
+        """
+        with self.lock:
+            self.discarded += 1
+        shell.close()
+
+    @contextmanager
+    def lease(self, command=None, name=None):
+        """Lease shell session for the duration of the `with` block.
+
+        :param command: command to launch shell, default: `Shell.command`
+        :param name: name of the shell in the test log, default: 'bash'
+        """
+        shell = self.acquire(command=command, name=name)
+        try:
+            yield shell
+        except BaseException:
+            self.discard(shell)
+            raise
+        self.release(shell)
+
+    def stats(self, reset=False):
+        """Return pool statistics where the spawn time saved
+        is estimated using the average spawn time.
+
+        :param reset: reset counters, default: False
+        """
+        with self.lock:
+            average_spawn_time = self.total_spawn_time / self.total_spawned if self.total_spawned else 0.0
+            stats = {
+                "spawned": self.spawned,
+                "reused": self.reused,
+                "discarded": self.discarded,
+                "idle": len(self.idle),
+                "spawn time": self.spawn_time,
+                "spawn time saved": self.reused * average_spawn_time,
+            }
+            if reset:
+                self.spawned = self.reused = self.discarded = 0
+                self.spawn_time = 0.0
+            return stats
+
+    def close(self):
+        """Close all idle sessions.
+        """
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for shell, key, returned in idle:
+            shell.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.close()
+
+
+def lease_shell(command=None, name=None):
+    """Lease shell session from the shell pool of the document.
+    If the document does not have a shell pool then a new shell
+    is spawned and closed when the `with` block ends.
+
+    For example:
+        with lease_shell() as bash:
+            bash("ls -la")
+
+    :param command: command to launch shell, default: `Shell.command`
+    :param name: name of the shell in the test log, default: 'bash'
+    """
+    pool = getattr(current().context, "shell_pool", None)
+    if pool is None:
+        pool = ShellPool(size=0)
+    return pool.lease(command=command, name=name)
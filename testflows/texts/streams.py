@@ -0,0 +1,169 @@
+# Copyright 2021 Katteli Inc.
+# TestFlows.com Open-Source Software Testing Framework (http://testflows.com)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import codecs
+
+from collections import deque
+
+from testflows._core.funcs import current
+
+#: size of the chunks read from files and pipes
+chunk_size = 1 << 16
+
+#: line that replaces the lines omitted by the truncation
+omitted_marker = "... {count} lines omitted ...\n"
+
+
+def read(file, size=chunk_size):
+    """Return iterator over the chunks read from the file
+    returning data as soon as it is available if the file supports it.
+
+    :param file: file object
+    :param size: chunk size, default: `chunk_size`
+    """
+    read = getattr(file, "read1", file.read)
+    while True:
+        data = read(size)
+        if not data:
+            return
+        yield data
+
+
+def chunks(source, encoding="utf-8", size=chunk_size):
+    """Return iterator over the text chunks of the source which can be
+    a string, a file object, a `subprocess.Popen` object with the output piped
+    or an iterable of strings. Bytes are decoded using the encoding.
+
+    :param source: source
+    :param encoding: encoding of bytes, default: 'utf-8'
+    :param size: chunk size used to read files, default: `chunk_size`
+    """
+    process = None
+    if hasattr(source, "stdout") and hasattr(source, "wait"):
+        process, source = source, source.stdout
+        if source is None:
+            raise ValueError("process output must be piped using 'stdout=subprocess.PIPE'")
+
+    if isinstance(source, (str, bytes)):
+        source = (source,)
+    elif hasattr(source, "read"):
+        source = read(source, size)
+
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    try:
+        for chunk in source:
+            if isinstance(chunk, (bytes, bytearray)):
+                chunk = decoder.decode(chunk)
+            if chunk:
+                yield chunk
+        chunk = decoder.decode(b"", final=True)
+        if chunk:
+            yield chunk
+    finally:
+        if process is not None:
+            process.stdout.close()
+            process.wait()
+
+
+def lines(chunks):
+    """Return iterator over the lines of the text chunks
+    where each line keeps its line ending.
+
+    :param chunks: text chunks
+    """
+    partial = []
+    for chunk in chunks:
+        split = chunk.split("\n")
+        if len(split) > 1:
+            partial.append(split[0])
+            yield "".join(partial) + "\n"
+            partial = []
+            for line in split[1:-1]:
+                yield line + "\n"
+        if split[-1]:
+            partial.append(split[-1])
+    if partial:
+        yield "".join(partial)
+
+
+def stream_text(source, head=None, tail=None, start="", end="\n", marker=omitted_marker,
+        encoding="utf-8", log=False, file=None, test=None):
+    """Copy text from the source straight into the document output
+    chunk by chunk without reading it all into memory. The source can be a string,
+    a file object, a `subprocess.Popen` object with the output piped or an iterable of
+    strings or bytes.
+
+    If `head` or `tail` is set then only the first `head` and the last `tail`
+    lines are written and the rest are replaced by the marker. Only the last `tail`
+    lines are kept in memory. Unlike `text()`, the text is not added
+    to the test log unless `log` is set as logging large outputs is slow.
+
+    For example:
+        with open("build.log") as log:
+            stream_text(log, head=20, tail=20, start="```\\n", end="```\\n")
+
+    :param source: source
+    :param head: number of the first lines to write, default: None
+    :param tail: number of the last lines to write, default: None
+    :param start: text written before the source text, default: ''
+    :param end: text written after the source text, default: '\\n'
+    :param marker: line that replaces the omitted lines formatted with the `count`,
+        default: `omitted_marker`
+    :param encoding: encoding of bytes, default: 'utf-8'
+    :param log: also add the text to the test log, default: False
+    :param file: output file, default: output file of the document
+    :param test: test, default: current test
+    """
+    if test is None:
+        test = current()
+
+    if file is None:
+        file = getattr(current().context, "file", None)
+
+    def write(text):
+        if not text:
+            return
+        if file:
+            file.write(text)
+        if log:
+            test.io.output.text(text)
+
+    write(start)
+
+    if head is None and tail is None:
+        for chunk in chunks(source, encoding=encoding):
+            write(chunk)
+
+    else:
+        first = []
+        last = deque(maxlen=tail or 0)
+        omitted = 0
+
+        for line in lines(chunks(source, encoding=encoding)):
+            if len(first) < (head or 0):
+                first.append(line)
+                if len(first) == head:
+                    write("".join(first))
+                continue
+            if len(last) == last.maxlen:
+                omitted += 1
+            last.append(line)
+
+        if len(first) < (head or 0):
+            write("".join(first))
+        if omitted:
+            write(marker.format(count=omitted))
+        write("".join(last))
+
+    write(end)
@@ -0,0 +1,295 @@
+# Copyright 2021 Katteli Inc.
+# TestFlows.com Open-Source Software Testing Framework (http://testflows.com)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import io
+import os
+import sys
+import time
+import signal
+import socket
+import tempfile
+import threading
+import traceback
+
+from multiprocessing.dummy import Pool
+from multiprocessing.reduction import sendfds, recvfds
+
+import testflows.settings as settings
+import testflows._core.init as testflows_init
+
+from testflows._core.io import LogWriter, ProtectedFile
+from testflows._core.compress import compress
+from testflows._core.funcs import current
+
+from .core import Document
+from .compiler import compile_document
+from .executable import Resume, parse, run_program
+from .forkserver import send, receive
+from .writer import DocumentWriter
+
+
+def restart_log(prefix):
+    """Restart test log in a process forked from a snapshot.
+
+    Threads are not inherited by the forked process and therefore
+    the log writer and the output handler are restarted using a new log file
+    that starts with the messages logged before the snapshot was taken.
+
+    :param prefix: log data at the time the snapshot was taken
+    :return: new log file path
+    """
+    fd, log = tempfile.mkstemp(prefix="tfs-document-", suffix=".log")
+    with os.fdopen(fd, "wb") as log_file:
+        log_file.write(prefix)
+
+    settings.write_logfile = settings.read_logfile = log
+
+    writer = LogWriter.instance
+    writer.fd = ProtectedFile(open(log, "ab", buffering=0))
+    writer.lock = threading.Lock()
+    writer.cancel = False
+    writer.pool = Pool(1)
+    writer.pool.apply_async(writer.flush, (), dict(sleep=writer.auto_flush_interval, force=True))
+
+    testflows_init._handlers[:] = []
+    testflows_init.start_output_handler()
+
+    return log
+
+
+class Snapshots:
+    """Section snapshots callback.
+
+    Before each section is started the running process is forked and
+    the forked child is kept as the snapshot of the document state at the
+    section boundary. The socket of each snapshot is sent to the watcher
+    which can later ask the snapshot to resume execution
+    with the new program for the rest of the document.
+
+    :param control: control socket connected to the watcher
+    :param log: test log file path
+    """
+    def __init__(self, control, log):
+        self.control = control
+        self.log = log
+        self.log_fd = os.open(log, os.O_RDONLY)
+
+    def __call__(self, index):
+        writer = LogWriter.instance
+
+        # snapshot must have all the messages that were logged so far
+        with writer.lock:
+            if writer.buffer:
+                writer.fd.write(compress(b"".join(writer.buffer)))
+                del writer.buffer[:]
+            size = os.fstat(self.log_fd).st_size
+
+            sys.stdout.flush()
+            sys.stderr.flush()
+
+            watcher_sock, snapshot_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+            pid = os.fork()
+
+        if pid == 0:
+            watcher_sock.close()
+            self.wait(snapshot_sock, os.pread(self.log_fd, size, 0))
+
+        snapshot_sock.close()
+        send(self.control, ("snapshot", index))
+        sendfds(self.control, [watcher_sock.fileno()])
+        watcher_sock.close()
+
+    def wait(self, sock, log_prefix):
+        """Wait in the snapshot process for the requests to resume
+        and fork a new process for each one. Exits when the socket is closed.
+        """
+        request = None
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+            while True:
+                request = receive(sock)
+                if request is None or os.fork() == 0:
+                    break
+        except BaseException:
+            traceback.print_exc()
+            request = None
+
+        if request is None:
+            os._exit(0)
+
+        sock.close()
+        signal.signal(signal.SIGINT, testflows_init.sigint_handler)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        self.resume(log_prefix, *request)
+
+    def resume(self, log_prefix, blocks, filename, start):
+        """Resume document execution in the process forked from the snapshot.
+        """
+        os.close(self.log_fd)
+        self.log = restart_log(log_prefix)
+        self.log_fd = os.open(self.log, os.O_RDONLY)
+        raise Resume(compile_document(blocks, filename), start)
+
+
+def run_watched(control, program, output, name, argv, memo_cache=None, namespace=None):
+    """Run document program as the top level test inside a process
+    forked by the watcher, write its output and send back
+    the result. This function never returns.
+
+    :param control: control socket connected to the watcher
+    :param program: compiled program
+    :param output: output file path
+    :param name: document name
+    :param argv: writer program arguments
+    :param memo_cache: memoization cache, default: None
+    :param namespace: initial document namespace, default: None
+    """
+    fd, log = tempfile.mkstemp(prefix="tfs-document-", suffix=".log")
+    os.close(fd)
+
+    sys.argv = argv + ["--log", log]
+    snapshots = None
+    buffer = io.StringIO()
+    test = None
+    code = 0
+
+    try:
+        try:
+            with Document(name) as test:
+                current().context.file = buffer
+                current().context.memo_cache = memo_cache
+                snapshots = Snapshots(control, log)
+                run_program(program, snapshot=snapshots, namespace=namespace)
+        except SystemExit:
+            pass
+        # processes resumed from the snapshots end up here as well
+        for handler in testflows_init._handlers:
+            handler.join()
+        with DocumentWriter(output) as writer:
+            writer.write(buffer.getvalue())
+        send(control, ("done", type(test.result).__name__ if test else "Error"))
+    except BaseException:
+        traceback.print_exc()
+        send(control, ("done", "Error"))
+        code = 1
+    finally:
+        try:
+            os.unlink(snapshots.log if snapshots else log)
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def changed_block(previous, blocks):
+    """Return index of the first block that has changed.
+    """
+    for index, (previous_block, block) in enumerate(zip(previous, blocks)):
+        if previous_block != block:
+            return index
+    return min(len(previous), len(blocks))
+
+
+def watch(input, output, name, argv, engine="peg", interval=0.2, memo_cache=None, namespace=None):
+    """Run document and then watch it for changes and run it again
+    each time it changes resuming execution from the snapshot
+    taken just before the first changed section. Runs until interrupted.
+
+    :param input: input file path
+    :param output: output file path
+    :param name: document name
+    :param argv: writer program arguments
+    :param engine: parser engine, default: 'peg'
+    :param interval: polling interval in seconds, default: 0.2
+    :param memo_cache: memoization cache, default: None
+    :param namespace: initial document namespace, default: None
+    """
+    filename = os.path.abspath(input)
+    control, worker_control = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    snapshots = {}
+    previous = []
+    stat = None
+
+    def discard(keep):
+        for index in [index for index in snapshots if index not in keep]:
+            snapshots.pop(index).close()
+
+    try:
+        while True:
+            try:
+                st = os.stat(filename)
+                new_stat = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                new_stat = None
+
+            if new_stat is None or new_stat == stat:
+                time.sleep(interval)
+                continue
+            stat = new_stat
+
+            with open(filename, "r", encoding="utf-8") as source:
+                blocks = parse(source.read(), engine=engine)
+
+            if blocks is None:
+                sys.stderr.write(f"error: parsing {filename} failed\n")
+                continue
+
+            if blocks == previous:
+                continue
+
+            try:
+                program = compile_document(blocks, filename)
+            except SyntaxError as e:
+                sys.stderr.write("".join(traceback.format_exception_only(type(e), e)))
+                continue
+
+            changed = changed_block(previous, blocks)
+            previous = blocks
+            # deleting the trailing sections makes the changed block the end of the document
+            start = max([index for index in snapshots if index <= changed and index < len(blocks)], default=None)
+
+            if start is None:
+                discard(keep=())
+                sys.stdout.flush()
+                sys.stderr.flush()
+                pid = os.fork()
+                if pid == 0:
+                    control.close()
+                    run_watched(worker_control, program, output, name, argv, memo_cache=memo_cache,
+                        namespace=namespace)
+            else:
+                discard(keep=[index for index in snapshots if index <= start])
+                pid = None
+                sys.stderr.write(f"resuming from section '{blocks[start].name}'\n")
+                send(snapshots[start], (blocks[start:], filename, start))
+
+            while True:
+                message = receive(control)
+                if message[0] == "done":
+                    break
+                index = message[1]
+                fd, = recvfds(control, 1)
+                snapshots[index] = socket.socket(fileno=fd)
+
+            if pid is not None:
+                os.waitpid(pid, 0)
+
+    except KeyboardInterrupt:
+        pass
+    finally:
+        discard(keep=())
+        control.close()
+        worker_control.close()
@@ -0,0 +1,209 @@
+# Copyright 2021 Katteli Inc.
+# TestFlows.com Open-Source Software Testing Framework (http://testflows.com)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import tempfile
+
+from contextlib import contextmanager
+
+
+def same_content(path, data=None, other_path=None):
+    """Return True if the file has exactly the same content
+    as the data or as the other file.
+
+    :param path: file path
+    :param data: data bytes
+    :param other_path: other file path
+    """
+    try:
+        size = os.path.getsize(path)
+        if data is not None:
+            if size != len(data):
+                return False
+            with open(path, "rb") as fd:
+                return fd.read() == data
+
+        if size != os.path.getsize(other_path):
+            return False
+        with open(path, "rb") as fd, open(other_path, "rb") as other_fd:
+            while True:
+                chunk = fd.read(1 << 20)
+                if chunk != other_fd.read(1 << 20):
+                    return False
+                if not chunk:
+                    return True
+    except OSError:
+        return False
+
+
+def file_mode(path):
+    """Return permissions of the file or if it does not exist
+    the permissions that `open()` would create it with
+    using the umask of the process.
+
+    :param path: file path
+    """
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except OSError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+@contextmanager
+def atomic_write(path, mode="w", encoding=None):
+    """Return context manager of the temporary file next to the file
+    that is atomically renamed to the file when the context manager exits
+    or removed if an exception is raised. The file keeps its permissions
+    or if it is new it gets the same permissions as if it was created using `open()`.
+
+    For example:
+        with atomic_write("durations.json", encoding="utf-8") as fd:
+            json.dump(durations, fd)
+
+    :param path: file path
+    :param mode: file mode, either 'w' or 'wb', default: 'w'
+    :param encoding: encoding of the text file, default: None
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as temp_file:
+            yield temp_file
+        os.chmod(temp_path, file_mode(path))
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class DocumentWriter:
+    """Buffered document output file writer.
+
+    Output is collected in memory and written out in large chunks
+    into a temporary file next to the output file only when the buffer
+    is full or the writer is closed. On close, the temporary file is
+    atomically renamed to the output file unless the output file
+    already has exactly the same content in which case it is left untouched.
+
+    :param path: output file path
+    :param encoding: encoding, default: 'utf-8'
+    :param buffer_size: size of the buffer in characters, default: 1 MiB
+    """
+    def __init__(self, path, encoding="utf-8", buffer_size=1 << 20):
+        self.name = path
+        self.encoding = encoding
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.buffered = 0
+        self.temp_file = None
+        self.temp_path = None
+        #: number of characters written
+        self.written = 0
+        #: number of bytes of the output
+        self.bytes = 0
+        #: number of writes of the buffered output into the file
+        self.flushes = 0
+        #: True if output file was changed, set on close
+        self.changed = None
+        self.closed = False
+
+    def write(self, data):
+        """Write data into the buffer.
+
+        :param data: string
+        """
+        self.buffer.append(data)
+        self.buffered += len(data)
+        self.written += len(data)
+        if self.buffered >= self.buffer_size:
+            self.write_buffer()
+        return len(data)
+
+    def tell(self):
+        """Return number of characters written.
+        """
+        return self.written
+
+    def flush(self):
+        """Do nothing as buffered data is only written
+        when the buffer is full or the writer is closed.
+        """
+        pass
+
+    def write_buffer(self, data=None):
+        """Write buffered data into the temporary file.
+
+        :param data: encoded buffered data, default: encode the buffer
+        """
+        if data is None:
+            data = "".join(self.buffer).encode(self.encoding)
+        del self.buffer[:]
+        self.buffered = 0
+
+        if self.temp_file is None:
+            directory = os.path.dirname(os.path.abspath(self.name))
+            fd, self.temp_path = tempfile.mkstemp(dir=directory,
+                prefix=os.path.basename(self.name) + ".", suffix=".tmp")
+            self.temp_file = os.fdopen(fd, "wb", buffering=0)
+
+        self.temp_file.write(data)
+        self.bytes += len(data)
+        self.flushes += 1
+
+    def close(self):
+        """Write out the output file if its content has changed.
+        """
+        if self.closed:
+            return
+        self.closed = True
+
+        try:
+            spilled = self.temp_file is not None
+
+            if not spilled:
+                data = "".join(self.buffer).encode(self.encoding)
+                if same_content(self.name, data=data):
+                    self.bytes = len(data)
+                    self.changed = False
+                    return
+                self.write_buffer(data)
+
+            elif self.buffer:
+                self.write_buffer()
+
+            self.temp_file.close()
+
+            if spilled and same_content(self.name, other_path=self.temp_path):
+                self.changed = False
+                os.unlink(self.temp_path)
+                return
+
+            os.chmod(self.temp_path, file_mode(self.name))
+            os.replace(self.temp_path, self.name)
+            self.changed = True
+
+        except BaseException:
+            if self.temp_file is not None:
+                self.temp_file.close()
+            if self.temp_path is not None and os.path.exists(self.temp_path):
+                os.unlink(self.temp_path)
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.close()
@@ -0,0 +1,114 @@
+import os
+import marshal
+import tempfile
+
+from testflows.core import *
+from testflows.asserts import error
+from testflows.texts import cache
+from testflows.texts.compiler import compile_document
+from testflows.texts.executable import parse
+
+source_data = "# A\n\n```python:testflows\nx = 1\n```\n\nvalue {x}\n"
+
+def dump(filename, source_data=source_data):
+    """Compile the document and write it into the cache.
+    """
+    program = compile_document(parse(source_data), filename)
+    cache.dump(program, source_data)
+    return program
+
+@TestScenario
+def hit(self):
+    """Check that the compiled document is loaded from the cache.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "doc.tfd")
+
+        with When("I write the compiled document into the cache"):
+            program = dump(filename)
+
+        with Then("the cache file should be next to the document"):
+            assert os.path.exists(cache.cache_path(filename)), error()
+            assert os.path.dirname(cache.cache_path(filename)) == os.path.join(directory, "__pycache__"), error()
+
+        with And("the same program should be loaded from the cache"):
+            cached = cache.load(filename, source_data)
+            assert cached is not None, error()
+            assert cached.source == program.source, error()
+            assert cached.code == program.code, error()
+            assert cached.blocks == program.blocks, error()
+
+@TestScenario
+def invalidation(self):
+    """Check that the cached document is not used if the source,
+    the path of the document or the cache format version have changed.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "doc.tfd")
+        dump(filename)
+
+        with Scenario("source change"):
+            assert cache.load(filename, source_data.replace("x = 1", "x = 2")) is None, error()
+
+        with Scenario("path change"):
+            other = os.path.join(directory, "other.tfd")
+            os.rename(cache.cache_path(filename), cache.cache_path(other))
+            try:
+                assert cache.load(other, source_data) is None, error()
+            finally:
+                os.rename(cache.cache_path(other), cache.cache_path(filename))
+
+        with Scenario("format version change"):
+            format_version = cache.FORMAT_VERSION
+            cache.FORMAT_VERSION += 1
+            try:
+                assert cache.load(filename, source_data) is None, error()
+            finally:
+                cache.FORMAT_VERSION = format_version
+
+        with Then("the cache should still be used when nothing has changed"):
+            assert cache.load(filename, source_data) is not None, error()
+
+@TestScenario
+def corrupt(self):
+    """Check that corrupt or truncated cache files are ignored
+    and replaced on the next write.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "doc.tfd")
+        dump(filename)
+        path = cache.cache_path(filename)
+
+        with open(path, "rb") as fd:
+            data = fd.read()
+
+        for name, corrupt_data in (
+                ("empty", b""),
+                ("truncated magic", data[:2]),
+                ("wrong magic", b"XXXX" + data[4:]),
+                ("truncated", data[:len(data) // 2]),
+                ("truncated by one byte", data[:-1]),
+                ("garbage", cache.MAGIC + b"\xff" * 64),
+                ("wrong layout", cache.MAGIC + marshal.dumps((1, 2)))):
+            with Scenario(name):
+                with open(path, "wb") as fd:
+                    fd.write(corrupt_data)
+
+                with Then("the cache file should be ignored"):
+                    assert cache.load(filename, source_data) is None, error()
+
+        with When("I write the compiled document into the cache again"):
+            dump(filename)
+
+        with Then("it should be loaded from the cache"):
+            assert cache.load(filename, source_data) is not None, error()
+
+@TestFeature
+def compiled_cache(self):
+    """Check compiled documents cache.
+    """
+    for scenario in loads(current_module(), Scenario):
+        scenario()
+
+if main():
+    compiled_cache()
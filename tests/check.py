@@ -0,0 +1,61 @@
+import os
+import tempfile
+
+from testflows.core import *
+from testflows.asserts import error
+from testflows.texts.check import check_document
+
+@TestOutline
+def document_errors(self, source_data, expected):
+    """Check errors reported by `--check` for the document.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "document.tfd")
+        with open(path, "w", encoding="utf-8") as fd:
+            fd.write(source_data)
+
+        with When("I check the document"):
+            errors = check_document(path)
+
+        with Then("the errors should show the text of the chunk with the error"):
+            assert [error_message.replace(path, "document.tfd") for error_message in errors] == expected, error()
+
+@TestScenario
+def error_excerpts(self):
+    """Check that each error shows the line of the error
+    and the text of the chunk that has failed to compile.
+    """
+    with Scenario("no errors"):
+        document_errors(source_data="# Heading\n\ntext {{braces}} and {1 + 1}\n", expected=[])
+
+    with Scenario("unescaped brace"):
+        document_errors(source_data="# Heading\n\nbad {x\nmore text\n\nnext paragraph\n",
+            expected=["document.tfd:4: SyntaxError: f-string: expecting '}'\n\n  3|  bad {x\n  4|> more text\n"])
+
+    with Scenario("trailing quote"):
+        document_errors(source_data="# Heading\n\nsay \"hello\"",
+            expected=["document.tfd:3: SyntaxError: unterminated string literal (detected at line 3)\n\n"
+                "  3|> say \"hello\"\n"])
+
+    with Scenario("unclosed block"):
+        document_errors(source_data="# Heading\n\n```python:testflows\nif True:\n```\n\nafter\n",
+            expected=["document.tfd:5: IndentationError: expected an indented block after 'if' statement on line 4\n\n"
+                "  3|  ```python:testflows\n  4|  if True:\n  5|> ```\n"])
+
+    with Scenario("all errors of the document"):
+        document_errors(source_data="bad {x\n\n# Heading\n\n```python:testflows\nf(\n```\n",
+            expected=[
+                "document.tfd:1: SyntaxError: f-string: expecting '}'\n\n  1|> bad {x\n",
+                "document.tfd:6: SyntaxError: '(' was never closed\n\n"
+                    "  5|  ```python:testflows\n  6|> f(\n  7|  ```\n"
+            ])
+
+@TestFeature
+def check(self):
+    """Check checking documents without running them.
+    """
+    for scenario in loads(current_module(), Scenario):
+        scenario()
+
+if main():
+    check()
@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+
+import testflows._core.cli.arg.type as argtype
+
+from testflows.core import *
+from testflows.asserts import error
+from testflows.texts.compare import read_times, compare
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+source_data = ("```python:testflows\nimport json, time\nwith open(\"delays.json\") as fd:\n"
+    "    delays = json.load(fd)\n```\n\n"
+    "# Fast\n\ntext\n\n"
+    "# Slow\n\n```python:testflows\ntime.sleep(delays[\"slow\"])\n```\n\n"
+    "# Notes\n\n```python:testflows\ntime.sleep(delays[\"first notes\"])\n```\n\n"
+    "# Notes\n\n```python:testflows\ntime.sleep(delays[\"second notes\"])\n```\n")
+
+def tfs(directory, *args):
+    """Run `tfs` command inside the directory and return the completed process.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([package_dir, os.environ.get("PYTHONPATH", "")]))
+    return subprocess.run([sys.executable, shutil.which("tfs"), *args], cwd=directory, env=env,
+        capture_output=True, text=True)
+
+def run_log(directory, log, slow=0, first_notes=0, second_notes=0):
+    """Run the document with the delays of the sections in seconds
+    writing its test log and return the times of the log.
+    """
+    with open(os.path.join(directory, "delays.json"), "w", encoding="utf-8") as fd:
+        json.dump({"slow": slow, "first notes": first_notes, "second notes": second_notes}, fd)
+    process = tfs(directory, "document", "run", "-i", "doc.tfd", "-o", "doc.md", "-f",
+        "--", "--log", log, "--output", "quiet")
+    assert process.returncode == 0, error(process.stderr)
+    with argtype.logfile("r", bufsize=1, encoding="utf-8")(os.path.join(directory, log)) as fd:
+        return read_times(fd)
+
+@TestScenario
+def regressions(self):
+    """Check that a section is a regression only if it became slower
+    by more than both the threshold and the minimum delta.
+    """
+    old = {"/doc.tfd": 1.0, "/doc.tfd/A": 1.0, "/doc.tfd/B": 0.01, "/doc.tfd/C": 0.0, "/doc.tfd/D": 1.0}
+    new = {"/doc.tfd": 1.5, "/doc.tfd/A": 1.05, "/doc.tfd/B": 0.05, "/doc.tfd/C": 0.5, "/doc.tfd/E": 5.0}
+
+    with Scenario("default threshold and minimum delta"):
+        assert compare(old, new, threshold=0.1, min_delta=0.01) == [
+            ("/doc.tfd", 1.0, 1.5), ("/doc.tfd/C", 0.0, 0.5), ("/doc.tfd/B", 0.01, 0.05)], error()
+
+    with Scenario("slowdown below the threshold"):
+        assert compare(old, new, threshold=0.6, min_delta=0.01) == [
+            ("/doc.tfd/C", 0.0, 0.5), ("/doc.tfd/B", 0.01, 0.05)], error()
+
+    with Scenario("slowdown below the minimum delta"):
+        assert compare(old, new, threshold=0.1, min_delta=0.1) == [
+            ("/doc.tfd", 1.0, 1.5), ("/doc.tfd/C", 0.0, 0.5)], error()
+
+    with Scenario("sections only in one of the logs are ignored"):
+        names = [name for name, base, value in compare(old, new, threshold=0, min_delta=0)]
+        assert "/doc.tfd/D" not in names and "/doc.tfd/E" not in names, error()
+
+@TestScenario
+def logs(self):
+    """Check comparing the test logs of two runs of the document.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "doc.tfd"), "w", encoding="utf-8") as fd:
+            fd.write(source_data)
+
+        with Given("I run the document"):
+            old = run_log(directory, "old.log", slow=0.1, first_notes=0.1, second_notes=0.3)
+
+        with And("I run the document again with the slow sections"):
+            new = run_log(directory, "new.log", slow=0.4, first_notes=0.4, second_notes=0.3)
+
+        with Then("the times of the sections with the same name should all be read"):
+            assert set(old) == {"/doc.tfd", "/doc.tfd/Fast", "/doc.tfd/Slow", "/doc.tfd/Notes",
+                "/doc.tfd/Notes #2"}, error()
+            assert old["/doc.tfd/Notes"] < 0.3 <= old["/doc.tfd/Notes #2"], error()
+            assert set(new) == set(old), error()
+
+        with When("I compare the logs"):
+            process = tfs(directory, "document", "compare", "old.log", "new.log", "--min-delta", "0.2")
+
+        with Then("the slower sections should be regressions"):
+            assert process.returncode != 0, error()
+            regressions = sorted(line.split()[1] for line in process.stdout.splitlines()
+                if line.startswith("regression:"))
+            assert regressions == ["/doc.tfd", "/doc.tfd/Notes", "/doc.tfd/Slow"], error(process.stdout)
+
+        with When("I compare the logs with the threshold that allows the slowdown"):
+            process = tfs(directory, "document", "compare", "old.log", "new.log", "--threshold", "1000")
+
+        with Then("there should be no regressions"):
+            assert process.returncode == 0, error(process.stdout + process.stderr)
+            assert "regression:" not in process.stdout, error()
+
+        with When("I compare the logs with the minimum delta that allows the slowdown"):
+            process = tfs(directory, "document", "compare", "old.log", "new.log", "--min-delta", "10")
+
+        with Then("there should be no regressions"):
+            assert process.returncode == 0, error(process.stdout + process.stderr)
+
+        with When("I compare the log with itself"):
+            process = tfs(directory, "document", "compare", "old.log", "old.log", "--all")
+
+        with Then("there should be no regressions"):
+            assert process.returncode == 0, error(process.stdout + process.stderr)
+            assert "/doc.tfd/Notes #2 " in process.stdout, error()
+
+@TestFeature
+def document_compare(self):
+    """Check comparing document run times of two runs.
+    """
+    for scenario in loads(current_module(), Scenario):
+        scenario()
+
+if main():
+    document_compare()
@@ -0,0 +1,220 @@
+import asyncio
+import traceback
+
+from testflows.core import *
+from testflows.asserts import error
+from testflows.texts.compiler import Program, Group, parse, compile_document, is_literal, schedule, section_name
+
+def namespace(output):
+    """Return namespace that runs the program
+    adding the text to the output list.
+    """
+    return {"text": lambda text, dedent, end: output.append(text), "__section__": lambda level, name: None}
+
+def run(source_data):
+    """Compile and run document returning its
+    output or the message of the syntax error.
+    """
+    output = []
+    try:
+        program = compile_document(parse(source_data), "document.tfd", register=False)
+    except SyntaxError as e:
+        return f"SyntaxError: {e.msg}"
+    exec(program.code, namespace(output))
+    return "".join(output)
+
+def run_fstring(text):
+    """Run text as the f-string that the chunks of the text were
+    compiled into before the literal text was emitted as a constant
+    returning its output or the message of the syntax error.
+    """
+    output = []
+    try:
+        code = compile(f'text(fr"""{text}""", dedent=False, end="")', "document.tfd", "exec")
+    except SyntaxError as e:
+        return f"SyntaxError: {e.msg}"
+    exec(code, namespace(output))
+    return "".join(output)
+
+def syntax_error(source_data):
+    """Compile document and return the syntax error
+    and the program of the document blocks.
+    """
+    blocks = parse(source_data)
+    try:
+        compile_document(blocks, "document.tfd", register=False)
+    except SyntaxError as e:
+        return e, Program("document.tfd", blocks, None, None)
+    fail("document was compiled without errors")
+
+@TestOutline
+def error_excerpt(self, source_data, excerpt):
+    """Check text of the document shown for the syntax error.
+    """
+    with When("I compile the document"):
+        e, program = syntax_error(source_data)
+
+    with Then("the excerpt should be the text of the chunk with the error"):
+        assert program.numbered_text(e.lineno, getattr(e, "chunk", None)) == excerpt, error()
+
+@TestScenario
+def error_excerpts(self):
+    """Check that syntax errors show the text of the chunk that has failed
+    to compile with the line of the error marked.
+    """
+    with Scenario("unescaped brace in a paragraph"):
+        error_excerpt(source_data="# Heading\n\nbad {x\n\nnext paragraph\n", excerpt="  3|> bad {x")
+
+    with Scenario("unescaped brace in a multi line paragraph"):
+        error_excerpt(source_data="# Heading\n\nbad {x\nmore text\n\nnext paragraph\n",
+            excerpt="  3|  bad {x\n  4|> more text")
+
+    with Scenario("trailing quote"):
+        error_excerpt(source_data="# Heading\n\nsay \"hello\"", excerpt="  3|> say \"hello\"")
+
+    with Scenario("unclosed code block"):
+        error_excerpt(source_data="# Heading\n\n```python:testflows\nf(1,\n```\n\nafter\n",
+            excerpt="  3|  ```python:testflows\n  4|> f(1,\n  5|  ```")
+
+@TestScenario
+def traceback_lines(self):
+    """Check that tracebacks have the line numbers and the lines
+    of the source document for the errors in the code blocks and the text.
+    """
+    source_data = ("Intro {1 + 1}\n\n# Heading\n\n```python:testflows\nx = 1\nraise ValueError(x)\n```\n\n"
+        "## Subheading\n\ntext\nvalue {1 / 0}\n")
+    blocks = parse(source_data)
+
+    for name, start in (("whole document", 0), ("document that starts at a section", 1)):
+        with Scenario(name):
+            with When("I compile the document"):
+                program = compile_document(blocks[start:], f"traceback-{start}.tfd")
+
+            with Then("the error in the code block should be at its line in the document"):
+                try:
+                    exec(program.code, namespace([]))
+                except ValueError as e:
+                    frame = traceback.extract_tb(e.__traceback__)[-1]
+                    assert (frame.lineno, frame.line) == (7, "raise ValueError(x)"), error()
+                else:
+                    fail("error was not raised")
+
+            with And("the error in the text should be at its line in the document"):
+                program = compile_document(blocks[start:][-1:], f"traceback-{start}-text.tfd")
+                try:
+                    exec(program.code, namespace([]))
+                except ZeroDivisionError as e:
+                    frame = traceback.extract_tb(e.__traceback__)[-1]
+                    assert frame.lineno == 13, error()
+                else:
+                    fail("error was not raised")
+
+@TestScenario
+def literal_text(self):
+    """Check that only the text that has the same meaning inside `fr\"\"\"...\"\"\"`
+    is emitted as a constant and that the output or the error of the text
+    is the same as when it is compiled as f-string.
+    """
+    texts = {
+        "plain text": ("plain text", True),
+        "escape sequence": ("path\\n", True),
+        "trailing backslash": ("ends with \\", False),
+        "trailing quote": ('say "hello"', False),
+        "triple quotes": ('a """ b', False),
+        "carriage return": ("a\rb", False),
+        "null character": ("a\0b", False),
+        "braces": ("{1 + 1}", False),
+    }
+
+    for name, (text, literal) in texts.items():
+        with Scenario(name):
+            with Then(f"is literal should be {literal}"):
+                assert is_literal(text) is literal, error()
+
+            with And("the output should be the same as of the f-string"):
+                assert run(text) == run_fstring(text), error()
+
+            with And("the output should be the same when the text is followed by a new line"):
+                assert run(text + "\n") == run_fstring(text + "\n"), error()
+
+@TestScenario
+def top_level_await(self):
+    """Check that top level `await` can be used in the code blocks
+    and the text expressions and that the program returns a coroutine.
+    """
+    source_data = ("```python:testflows\nimport asyncio\n\nasync def value():\n    await asyncio.sleep(0)\n"
+        "    return 1\n\nx = await value()\n```\n\nvalue {x + await value()}\n")
+
+    with When("I compile the document"):
+        program = compile_document(parse(source_data), "document.tfd", register=False)
+
+    with Then("the program should return a coroutine"):
+        assert program.coroutine, error()
+
+    with And("the coroutine should add the text"):
+        output = []
+        asyncio.run(eval(program.code, namespace(output)))
+        assert "".join(output) == "\nvalue 2\n", error()
+
+@TestOutline
+def scheduled(self, source_data, expected, independent=False):
+    """Check that the blocks of the document are split into the expected segments.
+
+    :param source_data: document
+    :param expected: list of the segments where each segment is either a list
+        of the section names of the blocks that run in order, where the text before
+        the first section is None, or a tuple of the level and the lists
+        of the section names of each section of the group
+    """
+    def names(blocks):
+        return [section_name(block) if block.name is not None else None for block in blocks]
+
+    segments = schedule(parse(source_data), independent=independent)
+    segments = [(segment.level, [names(unit) for unit in segment.units]) if isinstance(segment, Group)
+        else names(segment) for segment in segments]
+    assert segments == expected, error()
+
+@TestScenario
+def independent_sections(self):
+    """Check grouping of the independent sections that run concurrently.
+    """
+    with Scenario("consecutive independent sections"):
+        scheduled(source_data="Intro\n\n# A <!-- independent -->\n\n# B <!-- independent -->\n\n# C\n",
+            expected=[[None], (1, [["A"], ["B"]]), ["C"]])
+
+    with Scenario("single independent section"):
+        scheduled(source_data="# A <!-- independent -->\n\n# B\n\n# C <!-- independent -->\n",
+            expected=[["A", "B", "C"]])
+
+    with Scenario("section that is not independent is a barrier"):
+        scheduled(source_data="# A <!-- independent -->\n\n# B <!-- independent -->\n\n# C\n\n"
+            "# D <!-- independent -->\n\n# E <!-- independent -->\n",
+            expected=[(1, [["A"], ["B"]]), ["C"], (1, [["D"], ["E"]])])
+
+    with Scenario("subsections run with their section"):
+        scheduled(source_data="# A <!-- independent -->\n\n## A.1\n\n### A.1.1\n\n## A.2\n\n"
+            "# B <!-- independent -->\n\n## B.1\n",
+            expected=[(1, [["A", "A.1", "A.1.1", "A.2"], ["B", "B.1"]])])
+
+    with Scenario("independent subsections of the single independent section"):
+        scheduled(source_data="# A <!-- independent -->\n\n## B <!-- independent -->\n\n"
+            "## C <!-- independent -->\n",
+            expected=[["A"], (2, [["B"], ["C"]])])
+
+    with Scenario("independent subsections"):
+        scheduled(source_data="# A\n\n## B <!-- independent -->\n\n## C <!-- independent -->\n\n# D\n",
+            expected=[["A"], (2, [["B"], ["C"]]), ["D"]])
+
+    with Scenario("all sections of the document are independent"):
+        scheduled(source_data="Intro\n\n# A\n\n## A.1\n\n# B\n\n# C\n",
+            expected=[[None], (1, [["A", "A.1"], ["B"], ["C"]])], independent=True)
+
+@TestFeature
+def compiler(self):
+    """Check executable document compiler.
+    """
+    for scenario in loads(current_module(), Scenario):
+        scenario()
+
+if main():
+    compiler()
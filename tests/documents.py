@@ -0,0 +1,426 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+
+import testflows._core.cli.arg.type as argtype
+
+from testflows._core.name import unclean
+
+from testflows.core import *
+from testflows.asserts import error
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def tfs(directory, *args):
+    """Run `tfs` command inside the directory and return the completed process.
+    Modules inside the directory can be imported by the documents.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([package_dir, directory, os.environ.get("PYTHONPATH", "")]))
+    return subprocess.run([sys.executable, shutil.which("tfs"), *args], cwd=directory, env=env,
+        capture_output=True, text=True)
+
+def read_log(log):
+    """Read messages of the test log and remove it.
+    """
+    with argtype.logfile("r", bufsize=1, encoding="utf-8")(log) as fd:
+        messages = [json.loads(line) for line in fd]
+    os.unlink(log)
+    return messages
+
+def run_documents(directory, *args):
+    """Run `tfs document run` inside the directory and return
+    the exit code and the messages of its test log.
+    """
+    log = os.path.join(directory, "test.log")
+    process = tfs(directory, "document", "run", *args, "--", "--log", log, "--output", "quiet")
+    return process.returncode, read_log(log)
+
+def results(messages):
+    """Return dictionary of (result, message) of the tests by test name.
+    """
+    return {unclean(message["test_name"]): (message["result_type"], message["result_message"] or "")
+        for message in messages if message["message_keyword"] == "RESULT"}
+
+def write(directory, name, text):
+    """Write file inside the directory.
+    """
+    path = os.path.join(directory, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fd:
+        fd.write(text)
+    return path
+
+def read(directory, name):
+    """Read file inside the directory.
+    """
+    with open(os.path.join(directory, name), encoding="utf-8") as fd:
+        return fd.read()
+
+@TestScenario
+def assert_error(self):
+    """Check that `error()` inside a document is the
+    assertion error message function of `testflows.asserts`.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        write(directory, "doc.tfd", "# Heading\n\n```python:testflows\nx = 1\nassert x == 2, error()\n```\n")
+
+        with When("I run the document"):
+            code, messages = run_documents(directory, "-i", "doc.tfd", "-o", "doc.md")
+
+        with Then("it should fail with the assertion error"):
+            assert code != 0, error()
+            result, message = results(messages)["/doc.tfd/Heading"]
+            assert result == "Error", error()
+            assert message.startswith("AssertionError"), error()
+            assert "Oops! Assertion failed" in message, error()
+
+@TestScenario
+def syntax_error(self):
+    """Check that the text and code before a syntax error
+    are run and written before the error is reported.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        write(directory, "doc.tfd", "Intro\n\n```python:testflows\nfor i in range(2):\n    text(f\"{i}\\n\")\n```\n\n"
+            "# Heading\n\nbefore\n\n```python:testflows\nf(\n```\n\nafter\n")
+
+        with When("I run the document"):
+            code, messages = run_documents(directory, "-i", "doc.tfd", "-o", "doc.md")
+
+        with Then("the section with the error should fail with the syntax error"):
+            assert code != 0, error()
+            result, message = results(messages)["/doc.tfd/Heading"]
+            assert result == "Error", error()
+            assert message.startswith("SyntaxError"), error()
+
+        with And("the output should have the text before the error"):
+            assert read(directory, "doc.md") == "Intro\n\n0\n\n1\n\n\n# Heading\n\nbefore\n\n", error()
+
+@TestScenario
+def jobs_log(self):
+    """Check that the test log of the documents run in parallel
+    has the same tests, results and metrics as when they are run one by one.
+    """
+    def summary(messages):
+        return sorted((unclean(message["test_name"]), message["message_keyword"], message["test_level"],
+            message.get("result_type"), message.get("metric_name"), (message.get("message") or "").replace(directory + os.sep, ""))
+            for message in messages
+            if message["message_keyword"] in ("TEST", "RESULT", "METRIC", "NOTE")
+            and message.get("metric_name") not in ("document time", "section time"))
+
+    with tempfile.TemporaryDirectory() as directory:
+        write(directory, "docs/a.tfd", "# A\n\n```python:testflows\nnote(\"hello\")\n```\n\n## B\n\ntext\n")
+        write(directory, "docs/b.tfd", "# C\n\n```python:testflows\nassert False\n```\n")
+
+        with When("I run the documents one by one"):
+            # the second run has the same output files as the run in parallel
+            for i in range(2):
+                code, messages = run_documents(directory, "-i", "docs", "-o", "out", "-f")
+            assert code != 0, error()
+
+        with And("I run the documents in parallel"):
+            jobs_code, jobs_messages = run_documents(directory, "-i", "docs", "-o", "out", "-f", "-j", "2")
+            assert jobs_code == code, error()
+
+        with Then("the test logs should have the same tests, results and metrics"):
+            assert summary(jobs_messages) == summary(messages), error()
+
+        with And("the sections should be in the test log"):
+            assert results(jobs_messages)["/documents/a.tfd/A/B"][0] == "OK", error()
+            assert results(jobs_messages)["/documents/b.tfd/C"][0] == "Error", error()
+
+@TestScenario
+def prelude_isolation(self):
+    """Check that changes a document makes to the objects created by the prelude
+    are not seen by the other documents when they are run one by one or in parallel.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        write(directory, "prelude.py", "names = []\n")
+        for name in ("a", "b"):
+            write(directory, f"docs/{name}.tfd", f"```python:testflows\nnames.append(\"{name}\")\n```\n\n{{names}}\n")
+
+        with When("I run the documents one by one"):
+            code, messages = run_documents(directory, "-i", "docs", "-o", "out", "--prelude", "prelude.py")
+            assert code == 0, error()
+            outputs = [read(directory, f"out/{name}.md") for name in ("a", "b")]
+
+        with And("I run the documents in parallel"):
+            code, messages = run_documents(directory, "-i", "docs", "-o", "out", "-f", "--prelude", "prelude.py",
+                "-j", "2")
+            assert code == 0, error()
+            jobs_outputs = [read(directory, f"out/{name}.md") for name in ("a", "b")]
+
+        with Then("each document should only see its own changes"):
+            assert outputs == ["\n['a']\n", "\n['b']\n"], error()
+
+        with And("the outputs should be the same"):
+            assert jobs_outputs == outputs, error()
+
+@TestScenario
+def output_directory(self):
+    """Check that the output is a directory when the input is a directory
+    or a glob pattern even if it matches only one document.
+    """
+    for name, input, output, expected in (
+            ("directory", "docs", "out", "out/a.md"),
+            ("glob pattern", "docs/*.tfd", "out", "out/a.md"),
+            ("file", "docs/a.tfd", "a.md", "a.md")):
+        with Scenario(name), tempfile.TemporaryDirectory() as directory:
+            write(directory, "docs/a.tfd", "# A\n\ntext\n")
+
+            with When(f"I run the document with '{input}' input"):
+                code, messages = run_documents(directory, "-i", input, "-o", output)
+                assert code == 0, error()
+
+            with Then(f"the output should be written to '{expected}'"):
+                assert read(directory, expected) == "# A\n\ntext\n", error()
+
+            with And("the test names should be the same as when more documents are run"):
+                test_name = "/a.tfd/A" if output == expected else "/documents/a.tfd/A"
+                assert results(messages)[test_name][0] == "OK", error()
+
+@TestScenario
+def scoped_names(self):
+    """Check that the names created in a section are removed when the section ends
+    in the scoped document unless they are exported.
+    """
+    source_data = ("Intro\n\n```python:testflows\nintro = 1\n```\n\n"
+        "# A\n\n```python:testflows\nimport json\nx = 2\ny = 3\nexport(\"y\")\n```\n\n"
+        "## A.1\n\n```python:testflows\nz = 4\n```\n\n"
+        "# B\n\n```python:testflows\n"
+        "for name in (\"intro\", \"json\", \"x\", \"y\", \"z\"):\n"
+        "    try:\n        eval(name)\n        text(f\"{name} is kept\\n\")\n"
+        "    except NameError:\n        text(f\"{name} is removed\\n\")\n```\n")
+
+    for name, header, expected in (
+            ("scoped", "---\nscoped: true\n---\n\n", ["intro is kept", "json is kept", "x is removed",
+                "y is kept", "z is removed"]),
+            ("not scoped", "", ["intro is kept", "json is kept", "x is kept", "y is kept", "z is kept"])):
+        with Scenario(name), tempfile.TemporaryDirectory() as directory:
+            write(directory, "doc.tfd", header + source_data)
+
+            with When("I run the document"):
+                code, messages = run_documents(directory, "-i", "doc.tfd", "-o", "doc.md")
+                assert code == 0, error()
+
+            with Then("the last section should only see the names that are kept"):
+                output = read(directory, "doc.md")
+                assert [line for line in output.splitlines() if line.endswith(("kept", "removed"))] == expected, error()
+
+@TestScenario
+def section_memory(self):
+    """Check that `--section-memory` reports the peak memory allocated by each section.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        write(directory, "doc.tfd", "---\nscoped: true\n---\n\n"
+            "# Small\n\n```python:testflows\ndata = bytes(1 << 10)\n```\n\n"
+            "# Large\n\n```python:testflows\ndata = bytes(32 << 20)\n```\n\n"
+            "# After\n\ntext\n")
+
+        if sys.version_info < (3, 9):
+            with When("I run the document with --section-memory on Python 3.8"):
+                process = tfs(directory, "document", "run", "-i", "doc.tfd", "-o", "doc.md", "--section-memory")
+
+            with Then("it should fail"):
+                assert process.returncode != 0, error()
+                assert "--section-memory requires Python 3.9 or later" in process.stderr, error()
+            return
+
+        with When("I run the document with --section-memory"):
+            code, messages = run_documents(directory, "-i", "doc.tfd", "-o", "doc.md", "--section-memory")
+            assert code == 0, error()
+
+        with Then("each section should have the section memory peak metric"):
+            peaks = {unclean(message["test_name"]): message["metric_value"] for message in messages
+                if message["message_keyword"] == "METRIC" and message["metric_name"] == "section memory peak"}
+            assert set(peaks) == {"/doc.tfd/Small", "/doc.tfd/Large", "/doc.tfd/After"}, error()
+
+        with And("the peak should be the memory allocated by the section"):
+            assert peaks["/doc.tfd/Large"] >= 32 << 20, error()
+            assert peaks["/doc.tfd/Small"] < 1 << 20, error()
+            assert peaks["/doc.tfd/After"] < 1 << 20, error()
+
+@TestScenario
+def light_headings(self):
+    """Check that `--light-headings` only runs the headings of the sections
+    that have code blocks as section tests and that the output is the same.
+    """
+    source_data = ("Intro {1 + 1}\n\n# Reference\n\nabout\n\n## Plain\n\ntext {{braces}}\n\n"
+        "### Nested plain\n\nmore text\n\n## Code\n\n```python:testflows\nx = 1\n```\n\nvalue {x}\n\n"
+        "### Nested code\n\n```python:testflows\ntext(f\"x is {x}\\n\")\n```\n\n"
+        "# Last\n\nend {x + 1}\n")
+
+    with tempfile.TemporaryDirectory() as directory:
+        write(directory, "doc.tfd", source_data)
+
+        with When("I run the document"):
+            code, messages = run_documents(directory, "-i", "doc.tfd", "-o", "doc.md")
+            assert code == 0, error()
+            output = read(directory, "doc.md")
+
+        with And("I run the document with --light-headings"):
+            code, light_messages = run_documents(directory, "-i", "doc.tfd", "-o", "light.md", "--light-headings")
+            assert code == 0, error()
+
+        with Then("the output should be the same"):
+            assert read(directory, "light.md") == output, error()
+
+        with And("all headings should be section tests without --light-headings"):
+            assert sorted(results(messages)) == ["/doc.tfd", "/doc.tfd/Last", "/doc.tfd/Reference",
+                "/doc.tfd/Reference/Code", "/doc.tfd/Reference/Code/Nested code", "/doc.tfd/Reference/Plain",
+                "/doc.tfd/Reference/Plain/Nested plain"], error()
+
+        with And("only headings of the sections with code should be section tests with --light-headings"):
+            assert sorted(results(light_messages)) == ["/doc.tfd", "/doc.tfd/Code",
+                "/doc.tfd/Code/Nested code"], error()
+
+@TestScenario
+def profile(self):
+    """Check that `--profile` profiles the document and not the `tfs` command.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        write(directory, "doc.tfd", "# A\n\n```python:testflows\nx = 1\n```\n\nvalue {x}\n")
+        log = os.path.join(directory, "test.log")
+
+        with When("I run the document with --profile"):
+            process = tfs(directory, "document", "run", "-i", "doc.tfd", "-o", "doc.md", "--profile", "3",
+                "--", "--log", log, "--output", "quiet")
+
+        if sys.version_info < (3, 9):
+            with Then("it should fail on Python 3.8"):
+                assert process.returncode != 0, error()
+                assert "--profile requires Python 3.9 or later" in process.stderr, error()
+            return
+
+        with Then("the profile of the document should be written"):
+            assert process.returncode == 0, error(process.stderr)
+            messages = read_log(log)
+            assert os.path.exists(os.path.join(directory, "doc.profile.json")), error()
+            assert any("profile written to" in (message.get("message") or "") for message in messages), error()
+
+        with And("the tfs command should not be profiled"):
+            assert "function calls" not in process.stdout, error()
+
+@TestScenario
+def changed_only(self):
+    """Check that with `--changed-only` the document is run again only if its source,
+    its output, the local modules that it imports or the files that it depends on have changed.
+    """
+    source_data = ("# A\n\n```python:testflows\nfrom helper import value\ndepends(\"data.txt\")\n"
+        "with open(\"data.txt\") as fd:\n    data = fd.read().strip()\n```\n\n{value} {data}\n")
+
+    for name, args in (("one by one", ()), ("in parallel", ("-j", "2"))):
+        with Scenario(name), tempfile.TemporaryDirectory() as directory:
+            write(directory, "doc.tfd", source_data)
+            # constant imported from the local module is not a module nor has a module
+            write(directory, "helper.py", "from helper2 import scale\nvalue = 2 * scale\n")
+            write(directory, "helper2.py", "scale = 1\n")
+            write(directory, "data.txt", "data\n")
+
+            def run():
+                code, messages = run_documents(directory, "-i", "doc.tfd", "-o", "doc.md", "-f", "--changed-only",
+                    *args)
+                assert code == 0, error()
+                return results(messages)["/doc.tfd"][0]
+
+            with When("I run the document"):
+                assert run() == "OK", error()
+                assert read(directory, "doc.md").endswith("2 data\n"), error()
+
+            with And("I run the document again"):
+                assert run() == "Skip", error()
+
+            for changed, filename, text, expected in (
+                    ("source", "doc.tfd", source_data.replace("{data}", "{data}!"), "2 data!\n"),
+                    ("module", "helper.py", "from helper2 import scale\nvalue = 3 * scale\n", "3 data!\n"),
+                    ("module imported by the module", "helper2.py", "scale = 10\n", "30 data!\n"),
+                    ("file the document depends on", "data.txt", "new data\n", "30 new data!\n"),
+                    ("output", "doc.md", "changed\n", "30 new data!\n")):
+                with When(f"I change the {changed}"):
+                    write(directory, filename, text)
+
+                with Then("the document should be run again"):
+                    assert run() == "OK", error()
+                    assert read(directory, "doc.md").endswith(expected), error()
+
+                with And("skipped when it is run after that"):
+                    assert run() == "Skip", error()
+
+@TestScenario
+def independent_sections(self):
+    """Check that independent sections run concurrently with their own copy
+    of the document namespace and that their output is in the document order.
+    """
+    source_data = ("```python:testflows\nimport time\nx = \"intro\"\norder = []\n```\n\n"
+        "# A <!-- independent -->\n\n```python:testflows\ntime.sleep(1)\nx = \"a\"\norder.append(\"A\")\n```\n\n"
+        "A {x}\n\n"
+        "# B <!-- independent -->\n\n```python:testflows\nx = \"b\"\norder.append(\"B\")\n```\n\n"
+        "B {x}\n\n"
+        "# After\n\n{x} {order}\n")
+
+    with Scenario("concurrent sections"), tempfile.TemporaryDirectory() as directory:
+        write(directory, "doc.tfd", source_data)
+
+        with When("I run the document"):
+            code, messages = run_documents(directory, "-i", "doc.tfd", "-o", "doc.md")
+            assert code == 0, error()
+
+        with Then("the later section should finish first"):
+            assert read(directory, "doc.md").endswith("['B', 'A']\n"), error()
+
+        with And("the output should be in the document order"):
+            output = read(directory, "doc.md")
+            assert output.index("A a") < output.index("B b") < output.index("# After"), error()
+
+        with And("the names defined by the sections should not be visible outside of them"):
+            assert output.endswith("\nintro ['B', 'A']\n"), error()
+
+        with And("each section should be a test"):
+            assert results(messages)["/doc.tfd/A"][0] == "OK", error()
+            assert results(messages)["/doc.tfd/B"][0] == "OK", error()
+
+    with Scenario("failing section"), tempfile.TemporaryDirectory() as directory:
+        write(directory, "doc.tfd", source_data.replace("order.append(\"B\")\n", "order.append(\"B\")\nassert False\n"))
+
+        with When("I run the document"):
+            code, messages = run_documents(directory, "-i", "doc.tfd", "-o", "doc.md")
+
+        with Then("the failing section should set the result of the document"):
+            assert code != 0, error()
+            assert results(messages)["/doc.tfd/B"][0] == "Error", error()
+            assert results(messages)["/doc.tfd"][0] == "Error", error()
+
+        with And("the output of the other section should be written"):
+            assert "A a" in read(directory, "doc.md"), error()
+
+@TestScenario
+def worker_results(self):
+    """Check that the result of a document run by a worker
+    can be set by the name of any result type.
+    """
+    from testflows._core.objects import Result, OK
+    from testflows.texts.run import set_result, result_functions
+
+    class Test:
+        name = "/document"
+        result = OK(test="/document")
+
+    for result_name in result_functions:
+        with By(f"setting {result_name} result"):
+            try:
+                set_result(result_name, "message", "reason", test=Test)
+            except Result as result:
+                assert type(result).__name__ == result_name, error()
+                assert (result.message, result.reason) == ("message", "reason"), error()
+
+@TestFeature
+def documents(self):
+    """Check running executable documents using `tfs document run`.
+    """
+    for scenario in loads(current_module(), Scenario):
+        scenario()
+
+if main():
+    documents()
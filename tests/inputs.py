@@ -0,0 +1,153 @@
+import os
+import tempfile
+
+from testflows.core import *
+from testflows.asserts import error
+from testflows.texts.inputs import expand, is_multiple
+
+files = [
+    "docs/index.tfd",
+    "docs/guide/intro.tfd",
+    "docs/guide/setup.tfd",
+    "docs/guide/notes.md",
+    "docs/drafts/wip.tfd",
+    "docs/internal/secret.tfd",
+    "examples/a/one.tfd",
+    "examples/b/c/two.tfd",
+    "examples/b/c/two.txt",
+    "top.tfd",
+]
+
+def tree(directory):
+    """Create files of the input tree inside the directory.
+    """
+    for name in files:
+        path = os.path.join(directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fd:
+            fd.write("text\n")
+
+@TestOutline
+def expanded(self, inputs, expected, include=None, exclude=None):
+    """Check input file paths of the inputs.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        tree(directory)
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            with When(f"I expand {inputs}"):
+                paths = expand(inputs, include=include, exclude=exclude)
+        finally:
+            os.chdir(cwd)
+
+        with Then("the paths should be the expected paths in the order of the inputs"):
+            assert [os.path.normpath(path) for path in paths] == [os.path.normpath(path) for path in expected], error()
+
+@TestScenario
+def expand_inputs(self):
+    """Check expanding files, directories and glob patterns into input file paths.
+    """
+    with Scenario("files in the order of the inputs"):
+        expanded(inputs=["top.tfd", "docs/index.tfd"], expected=["top.tfd", "docs/index.tfd"])
+
+    with Scenario("file that does not match the include patterns"):
+        expanded(inputs=["docs/guide/notes.md"], expected=["docs/guide/notes.md"])
+
+    with Scenario("stdin"):
+        expanded(inputs=["-"], expected=["-"])
+
+    with Scenario("directory searched recursively and sorted"):
+        expanded(inputs=["docs"], expected=["docs/drafts/wip.tfd", "docs/guide/intro.tfd", "docs/guide/setup.tfd",
+            "docs/index.tfd", "docs/internal/secret.tfd"])
+
+    with Scenario("include patterns"):
+        expanded(inputs=["docs/guide"], include=["*.md"], expected=["docs/guide/notes.md"])
+
+    with Scenario("exclude file and directory names"):
+        expanded(inputs=["docs"], exclude=["drafts", "setup.tfd"],
+            expected=["docs/guide/intro.tfd", "docs/index.tfd", "docs/internal/secret.tfd"])
+
+    with Scenario("exclude path relative to the input directory"):
+        expanded(inputs=["docs"], exclude=["internal/*", "guide/s*"],
+            expected=["docs/drafts/wip.tfd", "docs/guide/intro.tfd", "docs/index.tfd"])
+
+    with Scenario("glob pattern"):
+        expanded(inputs=["examples/**/*.tfd"], expected=["examples/a/one.tfd", "examples/b/c/two.tfd"])
+
+    with Scenario("glob pattern that matches files that do not match the include patterns"):
+        expanded(inputs=["examples/**/two.*"], expected=["examples/b/c/two.tfd", "examples/b/c/two.txt"])
+
+    with Scenario("glob pattern that matches directories"):
+        expanded(inputs=["examples/*"], expected=["examples/a/one.tfd", "examples/b/c/two.tfd"])
+
+    with Scenario("glob pattern with exclude patterns"):
+        expanded(inputs=["docs/*/*.tfd"], exclude=["wip.tfd"],
+            expected=["docs/guide/intro.tfd", "docs/guide/setup.tfd", "docs/internal/secret.tfd"])
+
+    with Scenario("duplicate files are only kept once"):
+        expanded(inputs=["docs/index.tfd", "docs", "./docs/index.tfd"],
+            expected=["docs/index.tfd", "docs/drafts/wip.tfd", "docs/guide/intro.tfd", "docs/guide/setup.tfd",
+                "docs/internal/secret.tfd"])
+
+@TestScenario
+def symbolic_links(self):
+    """Check that symbolic links to directories are not followed.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        tree(directory)
+        os.symlink(os.path.join(directory, "examples"), os.path.join(directory, "docs", "examples"))
+
+        with When("I expand the directory that has the symbolic link"):
+            paths = expand([os.path.join(directory, "docs")])
+
+        with Then("the files of the linked directory should not be found"):
+            assert [os.path.relpath(path, directory) for path in paths] == ["docs/drafts/wip.tfd",
+                "docs/guide/intro.tfd", "docs/guide/setup.tfd", "docs/index.tfd", "docs/internal/secret.tfd"], error()
+
+@TestScenario
+def invalid_inputs(self):
+    """Check errors for the inputs that do not match any files.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        tree(directory)
+        os.makedirs(os.path.join(directory, "empty"))
+
+        for name, input, include, message in (
+                ("missing file", "missing.tfd", None, "input file"),
+                ("glob pattern that does not match", "*.missing", None, "no input files match"),
+                ("empty directory", "empty", None, "no input files found"),
+                ("directory without documents", "docs/guide", ["*.rst"], "no input files found")):
+            with Scenario(name):
+                try:
+                    expand([os.path.join(directory, input)], include=include)
+                except ValueError as e:
+                    assert message in str(e), error()
+                else:
+                    fail("inputs were accepted")
+
+@TestScenario
+def multiple(self):
+    """Check inputs that can match any number of files.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        tree(directory)
+
+        for name, input, expected in (
+                ("file", "top.tfd", False),
+                ("stdin", "-", False),
+                ("directory", "docs", True),
+                ("glob pattern", "docs/*.tfd", True),
+                ("glob pattern that matches one file", "to?.tfd", True)):
+            with Scenario(name):
+                assert is_multiple(os.path.join(directory, input) if input != "-" else input) is expected, error()
+
+@TestFeature
+def inputs(self):
+    """Check expanding input files, directories and glob patterns.
+    """
+    for scenario in loads(current_module(), Scenario):
+        scenario()
+
+if main():
+    inputs()
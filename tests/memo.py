@@ -0,0 +1,113 @@
+import os
+import sys
+import threading
+import subprocess
+
+from testflows.core import *
+from testflows.asserts import error
+from testflows.texts.memo import MemoCache
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+key_program = """
+import sys
+from testflows.texts.memo import MemoCache
+
+def func(name):
+    if name in {"alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta"}:
+        return (1, frozenset({"x", "y", "z", ("a", frozenset({"b", "c", "d"}))}))
+    return lambda: name in {"one", "two", "three", "four", "five"}
+
+names = {"alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta"}
+
+sys.stdout.write(repr(func.__code__.co_consts) + "\\n")
+sys.stdout.write(MemoCache("cache").key(func, ("alpha",), {}, ()) + "\\n")
+sys.stdout.write(repr(names) + "\\n")
+sys.stdout.write(MemoCache("cache").key(func, (names,), {"names": [frozenset(names)]}, ()) + "\\n")
+"""
+
+def cache_key(hash_seed):
+    """Return repr of the constants of the function, its cache key,
+    repr of the set argument and the cache key of the call with the set arguments
+    computed in a new process that uses the hash seed.
+    """
+    env = dict(os.environ, PYTHONHASHSEED=str(hash_seed),
+        PYTHONPATH=os.pathsep.join([package_dir, os.environ.get("PYTHONPATH", "")]))
+    process = subprocess.run([sys.executable, "-c", key_program], env=env, capture_output=True, text=True)
+    assert process.returncode == 0, error(process.stderr)
+    return process.stdout.splitlines()
+
+@TestScenario
+def hash_seed(self):
+    """Check that the cache key of the function that has set constants
+    is the same in the processes that use different hash seeds.
+    """
+    with When("I compute the cache key in processes with different hash seeds"):
+        keys = [cache_key(hash_seed) for hash_seed in range(1, 6)]
+
+    with Then("the order of the set constants should differ"):
+        assert len({consts for consts, key, names, names_key in keys}) > 1, error()
+
+    with And("the cache keys should be the same"):
+        assert len({key for consts, key, names, names_key in keys}) == 1, error()
+
+    with And("the order of the set arguments should differ"):
+        assert len({names for consts, key, names, names_key in keys}) > 1, error()
+
+    with And("the cache keys of the call with the set arguments should be the same"):
+        assert len({names_key for consts, key, names, names_key in keys}) == 1, error()
+
+@TestScenario
+def references(self):
+    """Check that the cache key of the function changes when
+    the values of the globals or the closure variables that it references change.
+    """
+    memo_cache = MemoCache("cache")
+
+    with Scenario("global"):
+        namespace = {}
+        exec("scale = 2\ndef func(x):\n    return x * scale\n", namespace)
+        key = memo_cache.key(namespace["func"], (1,), {}, ())
+
+        with When("I change the value of the global"):
+            namespace["scale"] = 3
+
+        with Then("the cache key should change"):
+            assert memo_cache.key(namespace["func"], (1,), {}, ()) != key, error()
+
+        with When("I restore the value of the global"):
+            namespace["scale"] = 2
+
+        with Then("the cache key should be the same as before"):
+            assert memo_cache.key(namespace["func"], (1,), {}, ()) == key, error()
+
+    with Scenario("closure variable"):
+        def make(scale):
+            def func(x):
+                return x * scale
+            return func
+
+        with Then("the cache keys of the functions with different closure values should differ"):
+            assert memo_cache.key(make(2), (1,), {}, ()) != memo_cache.key(make(3), (1,), {}, ()), error()
+
+        with And("be the same for the same closure values"):
+            assert memo_cache.key(make(2), (1,), {}, ()) == memo_cache.key(make(2), (1,), {}, ()), error()
+
+    with Scenario("unpicklable global"):
+        namespace = {"lock": threading.Lock()}
+        exec("def func(x):\n    with lock:\n        return x\n", namespace)
+
+        with Then("the cache key should not depend on the value of the global"):
+            key = memo_cache.key(namespace["func"], (1,), {}, ())
+            namespace["lock"] = threading.Lock()
+            assert memo_cache.key(namespace["func"], (1,), {}, ()) == key, error()
+
+@TestFeature
+def memo(self):
+    """Check memoization of function results.
+    """
+    for scenario in loads(current_module(), Scenario):
+        scenario()
+
+if main():
+    memo()
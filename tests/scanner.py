@@ -0,0 +1,41 @@
+import io
+import random
+
+from testflows.core import *
+from testflows.texts.executable import parse
+from testflows.texts.scanner import scan_stream
+
+pieces = [
+    "---\n", "--- \n", "title: document\n", "\n", "\n\n", " \t\n", "\x0c\n",
+    "# Heading\n", "## Heading # with hash\n", "  ### Indented heading\n", "\t# Tab heading\n",
+    "#\n", "#  ", "#  name\n", "#not a heading\n", "Setext heading\n", "===\n", "---\n", "- item\n", "a=\n",
+    "text with {expression}\n", "plain text\n", "last line",
+    "```python:testflows\n", "~~~python:testflows\n", "   ```python:testflows  \n", "```python\n",
+    "x = 1\n", "```\n", "```", "~~~ \n",
+]
+
+@TestScenario
+def same_blocks(self, source_data):
+    """Check that scanner, streaming scanner and PEG parser
+    return the same blocks.
+    """
+    with Then("scanner blocks should match PEG parser blocks"):
+        assert parse(source_data, engine="scanner") == parse(source_data, engine="peg"), error()
+
+    for read_size in (1, 3, 16):
+        with Then(f"streaming scanner blocks should match scanner blocks for read size {read_size}"):
+            blocks = list(scan_stream(io.StringIO(source_data), read_size=read_size))
+            assert blocks == parse(source_data, engine="scanner"), error()
+
+@TestFeature
+def scanner(self, count=500, seed=0):
+    """Check scanner against PEG parser using random documents.
+    """
+    rnd = random.Random(seed)
+
+    for i in range(count):
+        source_data = "".join(rnd.choice(pieces) for _ in range(rnd.randint(1, 30)))
+        Scenario(name=f"document #{i}", test=same_blocks)(source_data=source_data)
+
+if main():
+    scanner()
@@ -0,0 +1,122 @@
+import os
+import socket
+import tempfile
+
+from testflows.core import *
+from testflows.asserts import error
+from testflows.texts.serve import default_socket, private_directory, make_private_directory, peer_uid, request
+
+@TestScenario
+def peer_credentials(self):
+    """Check that the user id of the process on the other end of the socket is returned.
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        skip("peer credentials are not available on this platform")
+
+    left, right = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    with left, right:
+        assert peer_uid(left) == os.getuid(), error()
+
+@TestScenario
+def private_socket_directory(self):
+    """Check that without `XDG_RUNTIME_DIR` the default socket is inside
+    the directory that only the current user can access.
+    """
+    environ = dict(os.environ)
+    try:
+        os.environ.pop("XDG_RUNTIME_DIR", None)
+        os.environ.pop("TFS_DOCUMENT_SERVER", None)
+        with Then("the default socket should be inside the private directory"):
+            assert os.path.dirname(default_socket()) == private_directory(), error()
+    finally:
+        os.environ.clear()
+        os.environ.update(environ)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "private")
+
+        with When("I make the private directory"):
+            make_private_directory(path)
+
+        with Then("only the current user should be able to access it"):
+            assert os.stat(path).st_mode & 0o777 == 0o700, error()
+
+        with When("other users can access the existing directory"):
+            os.chmod(path, 0o755)
+
+        with Then("it should be rejected"):
+            try:
+                make_private_directory(path)
+            except PermissionError:
+                pass
+            else:
+                fail("directory was accepted")
+
+        with When("the existing directory is a symbolic link"):
+            os.chmod(path, 0o700)
+            link = os.path.join(directory, "link")
+            os.symlink(path, link)
+
+        with Then("it should be rejected"):
+            try:
+                make_private_directory(link)
+            except PermissionError:
+                pass
+            else:
+                fail("symbolic link was accepted")
+
+@TestScenario
+def server_of_another_user(self):
+    """Check that the client does not send its request
+    to the server run by another user.
+    """
+    if os.getuid() != 0:
+        skip("running the server as another user requires root")
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chmod(directory, 0o777)
+        path = os.path.join(directory, "document.sock")
+        ready_read, ready_write = os.pipe()
+
+        pid = os.fork()
+        if pid == 0:
+            try:
+                os.setuid(65534)
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                    sock.bind(path)
+                    os.chmod(path, 0o777)
+                    sock.listen()
+                    os.write(ready_write, b"1")
+                    conn, _ = sock.accept()
+                    conn.recv(1)
+            finally:
+                os._exit(0)
+
+        try:
+            os.read(ready_read, 1)
+
+            with When("I send the request to the server"):
+                try:
+                    request(path, ["-i", "doc.tfd"])
+                except PermissionError as e:
+                    exc = e
+                else:
+                    exc = None
+
+            with Then("it should be rejected"):
+                assert exc is not None, error()
+                assert "not run by the current user" in str(exc), error()
+        finally:
+            os.waitpid(pid, 0)
+            os.close(ready_read)
+            os.close(ready_write)
+
+@TestFeature
+def serve(self):
+    """Check document server.
+    """
+    for scenario in loads(current_module(), Scenario):
+        scenario()
+
+if main():
+    serve()
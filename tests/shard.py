@@ -0,0 +1,111 @@
+import os
+import sys
+import random
+import argparse
+import subprocess
+
+from testflows.core import *
+from testflows.asserts import error
+from testflows.texts.shard import select, shard_type
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+names = [os.path.join(f"dir{i % 7}", f"document{i}.tfd") for i in range(200)]
+
+#: recorded durations of every third document
+durations = {name: random.Random(i).uniform(0.1, 60) for i, name in enumerate(names) if i % 3 == 0}
+
+select_program = """
+import sys
+from testflows.texts.shard import select
+
+names, count, durations = eval(sys.argv[1])
+sys.stdout.write(repr([sorted(select(names, index, count, durations)) for index in range(1, count + 1)]))
+"""
+
+def shards(count, durations=None, names=names):
+    """Return list of the shards of the names.
+    """
+    return [select(names, index, count, durations=durations) for index in range(1, count + 1)]
+
+@TestScenario
+def partition(self):
+    """Check that shards are disjoint and together cover every document.
+    """
+    for count in (1, 2, 3, 8, 250):
+        for name, shard_durations in (("without durations", None), ("with durations", durations),
+                ("with all durations", {name: 1.0 + i for i, name in enumerate(names)})):
+            with Scenario(f"{count} shards {name}"):
+                selected = shards(count, shard_durations)
+
+                with Then("the shards should cover every document"):
+                    assert set().union(*selected) == set(names), error()
+
+                with And("the shards should be disjoint"):
+                    assert sum(len(shard) for shard in selected) == len(names), error()
+
+@TestScenario
+def stable(self):
+    """Check that the split only depends on the names and the durations.
+    """
+    with Scenario("input order"):
+        shuffled = list(names)
+        random.Random(1).shuffle(shuffled)
+        for shard_durations in (None, durations):
+            assert shards(4, shard_durations, names=shuffled) == shards(4, shard_durations), error()
+
+    with Scenario("processes with different hash seeds"):
+        for shard_durations in (None, durations):
+            splits = []
+            for hash_seed in (1, 2):
+                env = dict(os.environ, PYTHONHASHSEED=str(hash_seed),
+                    PYTHONPATH=os.pathsep.join([package_dir, os.environ.get("PYTHONPATH", "")]))
+                process = subprocess.run([sys.executable, "-c", select_program, repr((names, 4, shard_durations))],
+                    env=env, capture_output=True, text=True)
+                assert process.returncode == 0, error(process.stderr)
+                splits.append(process.stdout)
+            assert splits[0] == splits[1], error()
+            assert eval(splits[0]) == [sorted(shard) for shard in shards(4, shard_durations)], error()
+
+    with Scenario("new documents do not move the others without durations"):
+        new_names = names + [f"new{i}.tfd" for i in range(20)]
+        for shard, new_shard in zip(shards(4), shards(4, names=new_names)):
+            assert shard <= new_shard, error()
+
+@TestScenario
+def balanced(self):
+    """Check that shards are balanced using the recorded durations.
+    """
+    all_durations = {name: random.Random(i).uniform(0.1, 60) for i, name in enumerate(names)}
+
+    for count in (2, 3, 8):
+        with Scenario(f"{count} shards"):
+            totals = [sum(all_durations[name] for name in shard) for shard in shards(count, all_durations)]
+            assert max(totals) - min(totals) <= max(all_durations.values()), error()
+
+@TestScenario
+def shard_argument(self):
+    """Check parsing of the shard argument.
+    """
+    with Scenario("valid"):
+        for value, expected in (("1/1", (1, 1)), ("2/3", (2, 3)), ("3/3", (3, 3))):
+            assert shard_type(value) == expected, error()
+
+    with Scenario("invalid"):
+        for value in ("0/3", "4/3", "1", "a/b", "1/2/3", "-1/2"):
+            try:
+                shard_type(value)
+            except argparse.ArgumentTypeError:
+                pass
+            else:
+                fail(f"invalid shard '{value}' was accepted")
+
+@TestFeature
+def shard(self):
+    """Check splitting documents into shards.
+    """
+    for scenario in loads(current_module(), Scenario):
+        scenario()
+
+if main():
+    shard()
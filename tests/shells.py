@@ -0,0 +1,147 @@
+import os
+import time
+
+from testflows.core import *
+from testflows.asserts import error
+from testflows.texts.shells import ShellPool
+
+def pid(shell):
+    """Return process id of the shell session.
+    """
+    return shell("echo $$").output.strip()
+
+@TestScenario
+def lease_and_return(self):
+    """Check that the session returned to the pool is reused by the next lease.
+    """
+    with ShellPool() as pool:
+        with When("I lease the session and return it"):
+            with pool.lease() as bash:
+                first = pid(bash)
+
+        with Then("the session should be idle in the pool"):
+            assert pool.stats()["idle"] == 1, error()
+
+        with When("I lease the session again"):
+            with pool.lease() as bash:
+                second = pid(bash)
+
+        with Then("the same session should be reused"):
+            assert second == first, error()
+            stats = pool.stats()
+            assert (stats["spawned"], stats["reused"], stats["discarded"]) == (1, 1, 0), error()
+
+@TestScenario
+def reset(self):
+    """Check that the state of the session is reset between the leases
+    except for the environment variables.
+    """
+    with ShellPool() as pool:
+        with When("I change the state of the session"):
+            with pool.lease() as bash:
+                bash("cd /; export KEEP=kept; set -o errexit -o pipefail; trap 'echo trapped' EXIT; sleep 100 &")
+
+        with And("I lease the session again"):
+            with pool.lease() as bash:
+                cwd = bash("pwd").output.strip()
+                keep = bash("echo $KEEP").output.strip()
+                options = bash("echo $-").output.strip()
+                pipefail = bash("set -o | grep pipefail").output.split()
+                traps = bash("trap -p EXIT").output.strip()
+                jobs = bash("jobs -p").output.strip()
+
+        with Then("the working directory should be the initial directory"):
+            assert cwd == os.getcwd(), error()
+
+        with And("shell options, traps and background jobs should be reset"):
+            assert "e" not in options, error()
+            assert pipefail == ["pipefail", "off"], error()
+            assert traps == "", error()
+            assert jobs == "", error()
+
+        with And("environment variables should be kept"):
+            assert keep == "kept", error()
+
+@TestScenario
+def discard(self):
+    """Check that the session that was leased when an exception was raised
+    or that failed to reset is closed instead of being returned to the pool.
+    """
+    with Scenario("exception"), ShellPool() as pool:
+        with When("an exception is raised while the session is leased"):
+            try:
+                with pool.lease() as bash:
+                    raise RuntimeError("failed")
+            except RuntimeError:
+                pass
+
+        with Then("the session should be closed"):
+            assert bash.child is None, error()
+            assert pool.stats()["discarded"] == 1, error()
+            assert pool.stats()["idle"] == 0, error()
+
+    with Scenario("failed reset"), ShellPool(reset="false") as pool:
+        with When("I lease the session and return it"):
+            with pool.lease() as bash:
+                pid(bash)
+
+        with Then("the session should be closed"):
+            assert bash.child is None, error()
+            assert pool.stats()["discarded"] == 1, error()
+            assert pool.stats()["idle"] == 0, error()
+
+@TestScenario
+def idle_timeout(self):
+    """Check that the sessions that were idle for too long are closed.
+    """
+    with ShellPool(idle_timeout=0.5) as pool:
+        with When("I lease the session and return it"):
+            with pool.lease() as first:
+                first_pid = pid(first)
+
+        with And("the session is idle for longer than the idle timeout"):
+            time.sleep(1)
+
+        with And("I lease the session again"):
+            with pool.lease() as second:
+                second_pid = pid(second)
+
+        with Then("the expired session should be closed and a new one spawned"):
+            assert first.child is None, error()
+            assert second_pid != first_pid, error()
+            assert pool.stats()["spawned"] == 2, error()
+
+@TestScenario
+def max_size(self):
+    """Check that at most the maximum number of idle sessions
+    is kept in the pool closing the least recently returned sessions.
+    """
+    with Scenario("full pool"), ShellPool(size=2) as pool:
+        with When("I return more sessions than the pool size"):
+            with pool.lease() as first, pool.lease() as second, pool.lease() as third:
+                pass
+
+        with Then("only the most recently returned sessions should be kept"):
+            assert pool.stats()["idle"] == 2, error()
+            # the sessions are returned in the reverse order
+            assert first.child is not None and second.child is not None, error()
+            assert third.child is None, error()
+
+    with Scenario("pooling disabled"), ShellPool(size=0) as pool:
+        with When("I lease the session and return it"):
+            with pool.lease() as bash:
+                pid(bash)
+
+        with Then("the session should be closed"):
+            assert bash.child is None, error()
+            assert pool.stats()["idle"] == 0, error()
+
+@TestFeature
+def shells(self):
+    """Check pool of shell sessions.
+    """
+    for scenario in loads(current_module(), Scenario):
+        scenario()
+
+if main():
+    shells()
@@ -0,0 +1,170 @@
+import io
+import os
+import sys
+import subprocess
+
+from testflows.core import *
+from testflows.asserts import error
+from testflows.texts.streams import chunks, lines, stream_text
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+text = "first line\nsecond line\n\nlast line without new line"
+
+def split(text, size):
+    """Return text split into the chunks of the specified size.
+    """
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+def streamed(source, **kwargs):
+    """Return output of the `stream_text()` for the source.
+    """
+    file = io.StringIO()
+    stream_text(source, file=file, **kwargs)
+    return file.getvalue()
+
+@TestScenario
+def chunks_of_sources(self):
+    """Check that text chunks can be read from each kind of the source.
+    """
+    data = "line ✔\n" * 10
+    encoded = data.encode("utf-8")
+
+    sources = {
+        "string": lambda: data,
+        "bytes": lambda: encoded,
+        "binary file": lambda: io.BytesIO(encoded),
+        "text file": lambda: io.StringIO(data),
+        "iterable of strings": lambda: iter(split(data, 3)),
+        # multi byte characters are split between the chunks
+        "iterable of bytes": lambda: iter(split(encoded, 3)),
+    }
+
+    for name, source in sources.items():
+        with Scenario(name):
+            assert "".join(chunks(source(), size=5)) == data, error()
+
+    with Scenario("process"):
+        process = subprocess.Popen([sys.executable, "-c", "print('line ✔\\n' * 9, end='line ✔\\n')"],
+            stdout=subprocess.PIPE)
+        assert "".join(chunks(process)) == data, error()
+        assert process.returncode == 0, error()
+
+    with Scenario("process without piped output"):
+        process = subprocess.Popen([sys.executable, "-c", "pass"])
+        try:
+            chunks(process).__next__()
+        except ValueError as e:
+            assert "stdout=subprocess.PIPE" in str(e), error()
+        else:
+            fail("process without piped output was accepted")
+        finally:
+            process.wait()
+
+@TestScenario
+def lines_of_chunks(self):
+    """Check that lines are the same no matter
+    where the text is split into chunks.
+    """
+    for size in (1, 2, 3, 10, len(text)):
+        with Scenario(f"chunks of {size} characters"):
+            assert list(lines(split(text, size))) == text.splitlines(keepends=True), error()
+
+    with Scenario("empty chunks"):
+        assert list(lines(["", "a\n", "", "b", ""])) == ["a\n", "b"], error()
+
+@TestOutline
+def truncated(self, head, tail, expected):
+    """Check text written when only the first `head`
+    and the last `tail` lines are kept.
+    """
+    source_data = "".join(f"{i}\n" for i in range(1, 11))
+
+    with When(f"I stream ten lines with head={head} and tail={tail}"):
+        output = streamed(split(source_data, 3), head=head, tail=tail, start="```\n", end="```\n")
+
+    with Then("the output should have the kept lines and the marker"):
+        assert output == f"```\n{expected}```\n", error()
+
+@TestScenario
+def head_and_tail(self):
+    """Check head and tail truncation.
+    """
+    with Scenario("no truncation"):
+        truncated(head=None, tail=None, expected="".join(f"{i}\n" for i in range(1, 11)))
+
+    with Scenario("head"):
+        truncated(head=2, tail=None, expected="1\n2\n... 8 lines omitted ...\n")
+
+    with Scenario("tail"):
+        truncated(head=None, tail=2, expected="... 8 lines omitted ...\n9\n10\n")
+
+    with Scenario("head and tail"):
+        truncated(head=2, tail=3, expected="1\n2\n... 5 lines omitted ...\n8\n9\n10\n")
+
+    with Scenario("head and tail cover all lines"):
+        truncated(head=4, tail=6, expected="".join(f"{i}\n" for i in range(1, 11)))
+
+    with Scenario("head and tail longer than the text"):
+        truncated(head=20, tail=20, expected="".join(f"{i}\n" for i in range(1, 11)))
+
+stream_program = """
+import sys
+import tracemalloc
+from testflows.texts.streams import stream_text
+
+line = "x" * 99 + "\\n"
+size = 0
+
+def source():
+    for i in range(100000):
+        yield line
+
+class File:
+    def write(self, data):
+        global size
+        size += len(data)
+
+tracemalloc.start()
+stream_text(source(), file=File(), test=object(), **eval(sys.argv[1]))
+sys.stdout.write(repr((size, tracemalloc.get_traced_memory()[1])))
+"""
+
+@TestScenario
+def streamed_output(self):
+    """Check that large output is streamed without being read
+    into memory and that only the last `tail` lines are kept.
+    """
+    count, line_size = 100000, 100
+
+    def marker_size(kept):
+        return len(f"... {count - kept} lines omitted ...\n")
+
+    for name, kwargs, expected_size in (
+            ("no truncation", {}, count * line_size + 1),
+            ("tail", dict(tail=5), marker_size(5) + 5 * line_size + 1),
+            ("head and tail", dict(head=5, tail=5), marker_size(10) + 10 * line_size + 1)):
+        with Scenario(name):
+            with When(f"I stream {count} lines in a new process that traces memory allocations"):
+                # allocations of the test log threads of this process would be traced as well
+                process = subprocess.run([sys.executable, "-c", stream_program, repr(kwargs)],
+                    env=dict(os.environ, PYTHONPATH=os.pathsep.join([package_dir, os.environ.get("PYTHONPATH", "")])),
+                    capture_output=True, text=True)
+                assert process.returncode == 0, error(process.stderr)
+                size, peak = eval(process.stdout)
+
+            with Then("all the output should be written"):
+                assert size == expected_size, error()
+
+            with And("the peak memory should not depend on the size of the output"):
+                assert peak < 1 << 20, error()
+
+@TestFeature
+def streams(self):
+    """Check streaming text into the document output.
+    """
+    for scenario in loads(current_module(), Scenario):
+        scenario()
+
+if main():
+    streams()
@@ -0,0 +1,119 @@
+import os
+import sys
+import time
+import shutil
+import signal
+import tempfile
+import subprocess
+
+from testflows.core import *
+from testflows.asserts import error
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#: sections start with the blank line that separates them from the previous section
+#: so that deleting the trailing sections does not change the sections before them
+sections = {
+    "A": "# A\n\n```python:testflows\nx = 1\n```\n\nA {x}\n",
+    "B": "\n# B\n\n```python:testflows\nx += 1\n```\n\nB {x}\n",
+    "C": "\n# C\n\nC {x + 1}\n",
+}
+
+def write(path, text):
+    """Write file.
+    """
+    with open(path, "w", encoding="utf-8") as fd:
+        fd.write(text)
+
+def wait_for_output(path, expected, process, timeout=30):
+    """Wait until the output file has the expected content.
+    """
+    text = None
+    start_time = time.time()
+    while time.time() - start_time < timeout:
+        assert process.poll() is None, error("watcher has exited")
+        try:
+            with open(path, encoding="utf-8") as fd:
+                text = fd.read()
+        except OSError:
+            text = None
+        if text == expected:
+            return text
+        time.sleep(0.1)
+    assert text == expected, error()
+
+@TestOutline
+def watched(self, edits, resumed=None):
+    """Check that the output of the watched document is updated after each edit.
+
+    :param edits: list of (document text, expected output)
+    :param resumed: name of the section the execution is expected to be resumed from, default: None
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "doc.tfd")
+        output = os.path.join(directory, "doc.md")
+        write(path, edits[0][0])
+
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([package_dir, os.environ.get("PYTHONPATH", "")]))
+        process = subprocess.Popen([sys.executable, shutil.which("tfs"), "document", "run", "-i", path, "-o", output,
+            "-f", "--watch", "--", "--log", os.path.join(directory, "test.log"), "--output", "quiet"],
+            cwd=directory, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        try:
+            for i, (source_data, expected) in enumerate(edits):
+                if i:
+                    with When(f"I make edit {i}"):
+                        write(path, source_data)
+
+                with Then("the output should be updated"):
+                    wait_for_output(output, expected, process)
+        finally:
+            process.send_signal(signal.SIGINT)
+            try:
+                stderr = process.communicate(timeout=30)[1]
+            except subprocess.TimeoutExpired:
+                process.kill()
+                stderr = process.communicate()[1]
+
+        with And("the watcher should not report any errors"):
+            assert "error" not in stderr.lower(), error(stderr)
+
+        if resumed is not None:
+            with And(f"the execution should be resumed from section '{resumed}'"):
+                assert f"resuming from section '{resumed}'" in stderr, error(stderr)
+
+@TestScenario
+def edits(self):
+    """Check watching the document for changes.
+    """
+    if not sys.platform.startswith("linux"):
+        skip("--watch is only supported on Linux")
+
+    full = sections["A"] + sections["B"] + sections["C"]
+    full_output = "# A\n\n\nA 1\n\n# B\n\n\nB 2\n\n# C\n\nC 3\n"
+
+    with Scenario("edit the last section"):
+        watched(edits=[(full, full_output),
+            (full.replace("C {x + 1}", "C {x + 2}"), full_output.replace("C 3", "C 4"))])
+
+    with Scenario("edit the middle section"):
+        watched(edits=[(full, full_output),
+            (full.replace("x += 1", "x += 2"), full_output.replace("B 2", "B 3").replace("C 3", "C 4"))], resumed="B")
+
+    with Scenario("delete the trailing section"):
+        watched(edits=[(full, full_output),
+            (sections["A"] + sections["B"], "# A\n\n\nA 1\n\n# B\n\n\nB 2\n"),
+            (sections["A"], "# A\n\n\nA 1\n")], resumed="B")
+
+    with Scenario("add the trailing section back"):
+        watched(edits=[(full, full_output), (sections["A"] + sections["B"], "# A\n\n\nA 1\n\n# B\n\n\nB 2\n"),
+            (full, full_output)])
+
+@TestFeature
+def watch(self):
+    """Check running documents with `--watch`.
+    """
+    for scenario in loads(current_module(), Scenario):
+        scenario()
+
+if main():
+    watch()
@@ -0,0 +1,188 @@
+import os
+import tempfile
+
+from testflows.core import *
+from testflows.asserts import error
+from testflows.texts.writer import DocumentWriter, atomic_write
+from testflows.texts.manifest import Manifest
+from testflows.texts.shard import Durations
+
+#: buffer sizes of the writer that keeps the output in memory and that spills it into the temporary file
+buffer_sizes = {"buffered": 1 << 20, "spilled": 4}
+
+def write_old(directory, text="old content\n"):
+    """Write old output file that was modified an hour ago
+    and return its path and stat.
+    """
+    path = os.path.join(directory, "document.md")
+    with open(path, "w", encoding="utf-8") as fd:
+        fd.write(text)
+    os.chmod(path, 0o640)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns - 3600 * 10**9, stat.st_mtime_ns - 3600 * 10**9))
+    return path, os.stat(path)
+
+def read(path):
+    """Read file.
+    """
+    with open(path, encoding="utf-8") as fd:
+        return fd.read()
+
+@TestScenario
+def unchanged(self):
+    """Check that the output file that has the same content is left untouched.
+    """
+    for name, buffer_size in buffer_sizes.items():
+        with Scenario(name), tempfile.TemporaryDirectory() as directory:
+            path, stat = write_old(directory)
+
+            with When("I write the same content"):
+                with DocumentWriter(path, buffer_size=buffer_size) as writer:
+                    writer.write("old ")
+                    writer.write("content\n")
+
+            with Then("the output file should not be changed"):
+                assert writer.changed is False, error()
+                assert writer.bytes == len("old content\n"), error()
+                new_stat = os.stat(path)
+                assert (new_stat.st_ino, new_stat.st_mtime_ns) == (stat.st_ino, stat.st_mtime_ns), error()
+
+            with And("no temporary files should be left"):
+                assert os.listdir(directory) == ["document.md"], error()
+
+@TestScenario
+def changed(self):
+    """Check that the output file that has different content is replaced
+    and keeps its permissions.
+    """
+    for name, buffer_size in buffer_sizes.items():
+        with Scenario(name), tempfile.TemporaryDirectory() as directory:
+            path, stat = write_old(directory)
+
+            with When("I write new content"):
+                with DocumentWriter(path, buffer_size=buffer_size) as writer:
+                    writer.write("new ")
+                    writer.write("content\n")
+
+            with Then("the output file should be replaced"):
+                assert writer.changed is True, error()
+                assert read(path) == "new content\n", error()
+                new_stat = os.stat(path)
+                assert new_stat.st_mtime_ns > stat.st_mtime_ns, error()
+
+            with And("it should keep its permissions"):
+                assert new_stat.st_mode & 0o7777 == 0o640, error()
+
+            with And("no temporary files should be left"):
+                assert os.listdir(directory) == ["document.md"], error()
+
+@TestScenario
+def new_file(self):
+    """Check that the new output file is created with the permissions
+    that the process umask allows.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "document.md")
+        umask = os.umask(0o027)
+        try:
+            with When("I write the output"):
+                with DocumentWriter(path) as writer:
+                    writer.write("content\n")
+        finally:
+            os.umask(umask)
+
+        with Then("the output file should be created with the umask applied"):
+            assert writer.changed is True, error()
+            assert read(path) == "content\n", error()
+            assert os.stat(path).st_mode & 0o7777 == 0o640, error()
+
+@TestScenario
+def failed(self):
+    """Check that the output file is left in place
+    if writing the output fails.
+    """
+    for name, buffer_size in buffer_sizes.items():
+        with Scenario(name), tempfile.TemporaryDirectory() as directory:
+            path, stat = write_old(directory)
+
+            with When("I write the output that can't be encoded"):
+                try:
+                    with DocumentWriter(path, encoding="ascii", buffer_size=buffer_size) as writer:
+                        writer.write("new content\n")
+                        writer.write("café\n")
+                except UnicodeEncodeError:
+                    pass
+                else:
+                    fail("writing the output did not fail")
+
+            with Then("the old output file should be left in place"):
+                assert read(path) == "old content\n", error()
+                new_stat = os.stat(path)
+                assert (new_stat.st_ino, new_stat.st_mtime_ns) == (stat.st_ino, stat.st_mtime_ns), error()
+
+            with And("no temporary files should be left"):
+                assert os.listdir(directory) == ["document.md"], error()
+
+@TestScenario
+def atomic_files(self):
+    """Check that files written atomically keep the permissions of the existing file
+    or get the permissions that the process umask allows if they are new.
+    """
+    with Scenario("existing file"), tempfile.TemporaryDirectory() as directory:
+        path, stat = write_old(directory)
+
+        with When("I write the file"):
+            with atomic_write(path, encoding="utf-8") as fd:
+                fd.write("new content\n")
+
+        with Then("the file should be replaced and keep its permissions"):
+            assert read(path) == "new content\n", error()
+            assert os.stat(path).st_mode & 0o7777 == 0o640, error()
+            assert os.listdir(directory) == ["document.md"], error()
+
+    def write_new(path):
+        with atomic_write(path, "wb") as fd:
+            fd.write(b"data")
+
+    for name, save in (
+            ("new file", write_new),
+            ("manifest", lambda path: Manifest(path).save()),
+            ("durations", lambda path: Durations(path).save())):
+        for umask in (0o022, 0o077):
+            with Scenario(f"{name} with {umask:03o} umask"), tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "file.json")
+                previous_umask = os.umask(umask)
+                try:
+                    with When("I write the file"):
+                        save(path)
+                finally:
+                    os.umask(previous_umask)
+
+                with Then("the file should have the permissions that the umask allows"):
+                    assert os.stat(path).st_mode & 0o7777 == 0o666 & ~umask, error()
+                    assert os.listdir(directory) == ["file.json"], error()
+
+    with Scenario("failed write"), tempfile.TemporaryDirectory() as directory:
+        path, stat = write_old(directory)
+
+        with When("writing the file fails"):
+            try:
+                with atomic_write(path, encoding="utf-8") as fd:
+                    fd.write("new content\n")
+                    raise RuntimeError("failed")
+            except RuntimeError:
+                pass
+
+        with Then("the old file should be left in place"):
+            assert read(path) == "old content\n", error()
+            assert os.listdir(directory) == ["document.md"], error()
+
+@TestFeature
+def writer(self):
+    """Check buffered document output writer.
+    """
+    for scenario in loads(current_module(), Scenario):
+        scenario()
+
+if main():
+    writer()